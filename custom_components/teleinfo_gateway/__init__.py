@@ -1,20 +1,45 @@
 
 from __future__ import annotations
-import asyncio, logging, contextlib, json
-from typing import Dict, Any
+import asyncio, logging, contextlib, json, time, codecs, hashlib, importlib, zlib
+from typing import TYPE_CHECKING, Dict, Any, Tuple, Callable, List, NamedTuple, Mapping
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.const import Platform
-from homeassistant.exceptions import ConfigEntryNotReady
+# The engine below also runs without Home Assistant (cli.py): HA is only imported
+# for type checking here, and inside the entry setup functions
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
 
 from .const import (
     DOMAIN, PLATFORMS,
-    DEFAULT_DECODE, DEFAULT_TIMEOUT,
+    DEFAULT_DECODE, DEFAULT_TIMEOUT, DEFAULT_TIC_MODE, PROBE_WINDOW, RECONNECT_MIN, RECONNECT_MAX,
     EVT_RAW, EVT_FRAME,
     OPT_MQTT_ENABLE, OPT_MQTT_TOPIC_LINE, OPT_MQTT_TOPIC_JSON, OPT_MQTT_TOPIC_FIELDS,
     OPT_MQTT_TOPIC_INVALID, OPT_MQTT_TOPIC_DERIVED, OPT_HA_DISCOVERY, OPT_HA_DISCOVERY_PREFIX,
-    OPT_HA_DEVICE_NAME, OPT_INCLUDE_WH,
+    OPT_HA_DEVICE_NAME, OPT_INCLUDE_WH, OPT_MQTT_QUEUE_SIZE, OPT_MQTT_QUEUE_POLICY,
+    DEFAULT_MQTT_QUEUE_SIZE, POLICY_COALESCE,
+    OPT_DEDUP_GROUPS, OPT_DEDUP_HEARTBEAT, DEDUP_GROUPS, DEDUP_FIELDS, DEDUP_DERIVED, DEFAULT_DEDUP_HEARTBEAT,
+    OPT_FIRE_EVENTS, OPT_WATCHDOG, DEFAULT_WATCHDOG, OPT_MULTI_METER, DATA_PUBLISHER,
+    OPT_METRICS, OPT_ANALYTICS, OPT_JSON_NUMERIC, OPT_RAW_MODE, OPT_RAW_COMPRESS, OPT_RAW_EVERY, RAW_PER_LINE, RAW_BLOCK,
+    OPT_HISTORY, SERVICE_BACKFILL, SERVICE_SNAPSHOT, OPT_STATISTICS, OPT_PRICES, OPT_INTEGRITY_POLICY, OPT_PARSE_MODE, PARSE_INLINE, PARSE_THREAD, DATA_DISCOVERY, DISCOVERY_CONCURRENCY, STORAGE_VERSION,
+)
+from .publisher import MqttPublisher, ha_mqtt_sender
+from .labels import DISCOVERY_LABELS, ENTITY_LABELS
+from .replay import SOURCE_SERIAL, create_replay_connection
+from .metrics import SessionMetrics
+from .analytics import MeterAnalytics, COST_SCALE
+from .tariff import ptec_period, parse_prices
+from .frame_json import encode_frame, encode_invalid
+from .history import HistoryStore, FLUSH_INTERVAL
+from .statistics import EnergyStatistics, FLUSH_INTERVAL as STATISTICS_INTERVAL
+from .worker import ParseWorker
+from .frame import Frame, frame_layout, intern_value
+from .integrity import (
+    POLICY_FLAG, POLICY_KEEP_LAST, POLICY_DROP, REJECT_ETX_WITHOUT_STX, REJECT_TRUNCATED, REJECT_CHECKSUM,
+    REJECT_ADCO_MISMATCH, REJECT_UNKNOWN_METER, REJECT_DROPPED, MeterIntegrity, AdcoGuard, apply_keep_last, new_counters,
+)
+from .tic import (
+    MODE_AUTO, MODE_STANDARD, BAUD_HISTORIC, BAUD_STANDARD,
+    parse_std_line, parse_std_bytes, parse_hist_bytes, horodate_iso, detect_mode,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -33,6 +58,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     timeout = conf.get("timeout", DEFAULT_TIMEOUT)
     decode = conf.get("decode", DEFAULT_DECODE)
     relaxed = set(conf.get("relaxed_labels", []))
+    tic_mode = conf.get("tic_mode", DEFAULT_TIC_MODE)
+    source = conf.get("source", SOURCE_SERIAL)
+    replay_realtime = conf.get("replay_realtime", True)
 
     # MQTT mirror & discovery options
     mqtt_enable = opts.get(OPT_MQTT_ENABLE, True)
@@ -40,26 +68,64 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     disc_prefix = opts.get(OPT_HA_DISCOVERY_PREFIX, "homeassistant")
     device_name = opts.get(OPT_HA_DEVICE_NAME, "")
     include_wh = opts.get(OPT_INCLUDE_WH, False)
+    fire_events = opts.get(OPT_FIRE_EVENTS, False)
+    watchdog = opts.get(OPT_WATCHDOG, DEFAULT_WATCHDOG)
+    multi_meter = opts.get(OPT_MULTI_METER, False)
+    metrics = opts.get(OPT_METRICS, False)
+    analytics = opts.get(OPT_ANALYTICS, False)
+    prices = parse_prices(opts.get(OPT_PRICES, ""))
+    raw_mode = opts.get(OPT_RAW_MODE, RAW_PER_LINE)
+    raw_compress = opts.get(OPT_RAW_COMPRESS, False)
+    raw_every = opts.get(OPT_RAW_EVERY, 1)
+    json_numeric = opts.get(OPT_JSON_NUMERIC, False)
+    parse_mode = opts.get(OPT_PARSE_MODE, PARSE_INLINE)
+    integrity_policy = opts.get(OPT_INTEGRITY_POLICY, POLICY_FLAG)
+
+    # Local frame history: loaded before the platforms so sensors restore instantly
+    history = None
+    if opts.get(OPT_HISTORY, False):
+        history = HistoryStore(_history_dir(hass, entry))
+        await history.async_load()
+    statistics = EnergyStatistics(hass) if opts.get(OPT_STATISTICS, False) else None
 
     topic_line = opts.get(OPT_MQTT_TOPIC_LINE, "teleinfo/line")
     topic_json = opts.get(OPT_MQTT_TOPIC_JSON, "teleinfo/json")
     topic_fields = opts.get(OPT_MQTT_TOPIC_FIELDS, "teleinfo/fields")
     topic_invalid = opts.get(OPT_MQTT_TOPIC_INVALID, "teleinfo/invalid")
     topic_derived = opts.get(OPT_MQTT_TOPIC_DERIVED, "teleinfo/derived")
+    queue_size = opts.get(OPT_MQTT_QUEUE_SIZE, DEFAULT_MQTT_QUEUE_SIZE)
+    queue_policy = opts.get(OPT_MQTT_QUEUE_POLICY, POLICY_COALESCE)
+    dedup_groups = set(opts.get(OPT_DEDUP_GROUPS, DEDUP_GROUPS))
+    dedup_heartbeat = opts.get(OPT_DEDUP_HEARTBEAT, DEFAULT_DEDUP_HEARTBEAT)
+
+    # Hashes of the retained discovery configs already on the broker, shared by all entries
+    cache = hass.data.get(DATA_DISCOVERY)
+    if cache is None:
+        from homeassistant.helpers.storage import Store
+        store = Store(hass, STORAGE_VERSION, DATA_DISCOVERY)
+        cache = hass.data[DATA_DISCOVERY] = (store, await store.async_load() or {})
+    store, discovery_hashes = cache
 
-    # Import here to avoid blocking HA startup if pyserial not installed yet
-    import serial_asyncio
-    from serial import EIGHTBITS, SEVENBITS, PARITY_NONE, PARITY_EVEN, STOPBITS_ONE, STOPBITS_TWO
+    # One publisher for every port; the first entry set up sizes its queue
+    publisher = hass.data.get(DATA_PUBLISHER)
+    if publisher is None:
+        publisher = hass.data[DATA_PUBLISHER] = MqttPublisher(
+            ha_mqtt_sender(hass), max_batches=queue_size, policy=queue_policy
+        )
 
-    bits = EIGHTBITS if bytesize == 8 else SEVENBITS
-    par = PARITY_NONE if str(parity).upper() == "N" else PARITY_EVEN
-    stop = STOPBITS_ONE if stopbits == 1 else STOPBITS_TWO
+    # pyserial's constants are these plain values; it is only imported when the port opens
+    bits = 8 if bytesize == 8 else 7
+    par = "N" if str(parity).upper() == "N" else "E"
+    stop = 1 if stopbits == 1 else 2
 
     session = TeleinfoSession(
         hass=hass,
         port=port, baud=baud, bits=bits, parity=par, stopbits=stop,
-        timeout=timeout, decode=decode, relaxed_labels=relaxed,
+        timeout=timeout, decode=decode, relaxed_labels=relaxed, tic_mode=tic_mode, watchdog=watchdog,
+        source=source, replay_realtime=replay_realtime,
         mqtt_enable=mqtt_enable,
+        raw_mode=raw_mode, raw_compress=raw_compress, raw_every=raw_every, json_numeric=json_numeric,
+        parse_mode=parse_mode, integrity_policy=integrity_policy,
         topic_line=topic_line,
         topic_json=topic_json,
         topic_fields=topic_fields,
@@ -69,16 +135,39 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         ha_discovery_prefix=disc_prefix,
         ha_device_name=device_name,
         include_wh=include_wh,
+        dedup_groups=dedup_groups,
+        dedup_heartbeat=dedup_heartbeat,
+        multi_meter=multi_meter,
+        metrics=SessionMetrics() if metrics else None,
+        analytics=analytics,
+        prices=prices,
+        history=history,
+        statistics=statistics,
+        discovery_hashes=discovery_hashes,
+        on_discovery_change=lambda: store.async_delay_save(lambda: discovery_hashes, 10),
+        publisher=publisher,
     )
 
-    try:
-        await session.start()
-    except Exception as e:
-        raise ConfigEntryNotReady(f"Serial open failed on {port}: {e}")
+    # The port opens in the background (retried with backoff): HA startup is not held by it
+    await session.start(background=True)
 
     hass.data[DOMAIN][entry.entry_id] = session
 
-    await hass.config_entries.async_forward_entry_setups(entry, [Platform.SENSOR])
+    if not hass.services.has_service(DOMAIN, SERVICE_BACKFILL):
+        _register_services(hass)
+
+    if fire_events:
+        entry.async_on_unload(session.async_subscribe(
+            lambda frame: hass.bus.async_fire(EVT_FRAME, {"frame": frame.as_dict()})
+        ))
+
+    # Snapshot requests on <topic_json>/get and HA's birth message, once HA's MQTT client is up
+    if mqtt_enable or ha_disc:
+        entry.async_create_background_task(
+            hass, _subscribe_mqtt(hass, entry, session), f"{DOMAIN} MQTT subscriptions"
+        )
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     # Clean stop
     entry.async_on_unload(session.stop)
@@ -88,13 +177,85 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     return True
 
+async def _subscribe_mqtt(hass: HomeAssistant, entry: ConfigEntry, session: TeleinfoSession):
+    try:
+        from homeassistant.components import mqtt
+    except ImportError:
+        return
+    from homeassistant.core import callback
+    if not await mqtt.async_wait_for_mqtt_client(hass):
+        _LOGGER.warning("MQTT unavailable: no snapshot requests on %s", session.snapshot_request_topic)
+        return
+    if session.mqtt_enable:
+        entry.async_on_unload(await mqtt.async_subscribe(
+            hass, session.snapshot_request_topic, callback(lambda msg: session.answer_snapshot(msg.payload))
+        ))
+    if session.ha_discovery:
+        # HA or the broker restarted (retained configs possibly gone): announce everything again
+        @callback
+        def _on_ha_status(msg):
+            if msg.payload == "online":
+                session.republish_discovery()
+        entry.async_on_unload(await mqtt.async_subscribe(
+            hass, f"{session.ha_discovery_prefix}/status", _on_ha_status
+        ))
+
+def _history_dir(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    return hass.config.path(".storage", f"{DOMAIN}_history", entry.entry_id)
+
+def _register_services(hass: HomeAssistant):
+    import voluptuous as vol
+    from homeassistant.helpers import config_validation as cv
+    from homeassistant.core import SupportsResponse, callback
+    from homeassistant.util import dt as dt_util
+
+    async def _backfill(call):
+        # Republish the local history of a time range to <topic_json>/backfill
+        start = int(dt_util.as_timestamp(call.data["start"]))
+        end = int(dt_util.as_timestamp(call.data["end"])) if "end" in call.data else int(time.time())
+        minute = call.data["resolution"] == "minute"
+        entry_id = call.data.get("entry_id")
+        for eid, session in list(hass.data.get(DOMAIN, {}).items()):
+            if (entry_id is None or eid == entry_id) and session.history is not None:
+                n = await session.async_backfill(start, end, minute)
+                _LOGGER.info("Téléinfo backfill on %s: %s messages", session.port, n)
+
+    hass.services.async_register(DOMAIN, SERVICE_BACKFILL, _backfill, schema=vol.Schema({
+        vol.Optional("entry_id"): str,
+        vol.Required("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("resolution", default="minute"): vol.In(["raw", "minute"]),
+    }))
+
+    @callback
+    def _snapshot(call):
+        # Last-frame snapshot of each entry (or of entry_id), as the service response
+        entry_id = call.data.get("entry_id")
+        return {"entries": {
+            eid: session.snapshot()
+            for eid, session in hass.data.get(DOMAIN, {}).items()
+            if entry_id is None or eid == entry_id
+        }}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SNAPSHOT, _snapshot, schema=vol.Schema({vol.Optional("entry_id"): str}),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    import shutil
+    await hass.async_add_executor_job(shutil.rmtree, _history_dir(hass, entry), True)
+
 async def _reload_on_update(hass: HomeAssistant, entry: ConfigEntry) -> None:
     await hass.config_entries.async_reload(entry.entry_id)
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    if unload_ok := await hass.config_entries.async_unload_platforms(entry, [Platform.SENSOR]):
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         session: TeleinfoSession = hass.data[DOMAIN].pop(entry.entry_id)
         await session.async_close()
+        publisher = hass.data.get(DATA_PUBLISHER)
+        if publisher is not None and not publisher.users:
+            hass.data.pop(DATA_PUBLISHER)
     return unload_ok
 
 # -----------------------------
@@ -103,12 +264,32 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 STX = 0x02
 ETX = 0x03
 LF  = 0x0A
+_STX_B = bytes([STX])
+_ETX_B = bytes([ETX])
+_LF_B = bytes([LF])
+# Labels identifying a meter (historic / standard mode)
+_ADCO_LABELS = ("ADCO", "ADSC")
+
+class MeterTopics(NamedTuple):
+    line: str
+    json: str
+    fields: str
+    invalid: str
+    derived: str
 
 class TeleinfoSession:
-    def __init__(self, hass: HomeAssistant, *, port: str, baud: int, bits, parity, stopbits,
-                 timeout: float, decode: str, relaxed_labels: set,
+    def __init__(self, hass: HomeAssistant | None, *, port: str, baud: int, bits, parity, stopbits,
+                 timeout: float, decode: str, relaxed_labels: set, tic_mode: str, watchdog: float,
                  mqtt_enable: bool, topic_line: str, topic_json: str, topic_fields: str, topic_invalid: str, topic_derived: str,
-                 ha_discovery: bool, ha_discovery_prefix: str, ha_device_name: str, include_wh: bool):
+                 ha_discovery: bool, ha_discovery_prefix: str, ha_device_name: str, include_wh: bool,
+                 dedup_groups: set, dedup_heartbeat: float, publisher: MqttPublisher,
+                 multi_meter: bool = False, source: str = SOURCE_SERIAL, replay_realtime: bool = True,
+                 raw_mode: str = RAW_PER_LINE, raw_compress: bool = False, raw_every: int = 1,
+                 json_numeric: bool = False, parse_mode: str = PARSE_INLINE, integrity_policy: str = POLICY_FLAG,
+                 metrics: SessionMetrics | None = None, analytics: bool = False, prices: Mapping[str, float] | None = None,
+                 history: HistoryStore | None = None,
+                 statistics: EnergyStatistics | None = None, discovery_hashes: Dict[str, str] | None = None,
+                 on_discovery_change: Callable[[], None] | None = None):
         self.hass = hass
         self.port = port
         self.baud = baud
@@ -116,43 +297,283 @@ class TeleinfoSession:
         self.parity = parity
         self.stopbits = stopbits
         self.timeout = timeout
+        # serial, or a replayed capture / synthetic frames (port is then the capture path)
+        self.source = source
+        self.replay_realtime = replay_realtime
         self.decode = decode
+        # Bytes-level fast path is only result-identical for latin-1
+        try:
+            self._fast = codecs.lookup(decode).name == "iso8859-1"
+        except LookupError:
+            self._fast = False
         self.relaxed_labels = relaxed_labels
+        self.tic_mode = tic_mode
+        # Active parsing mode; None until auto-detection settles
+        self.mode = None if tic_mode == MODE_AUTO else tic_mode
+        self.frames_valid = 0
         self.transport = None
         self.protocol = None
         self._task = None
-        self._ha_discovery_done = False
+        # Link supervision
+        self.watchdog = watchdog
+        self._lost = asyncio.Event()
+        self._opened_ts = 0.0
+        self._outage_start = None
+        self.last_frame_ts = None
+        self.last_recovery = None
+        self.reconnects = 0
         self.mqtt_enable = mqtt_enable
+        # Raw mirror on topic_line: one message per line, or one per frame (block/raw), every Nth frame
+        self.raw_per_line = raw_mode == RAW_PER_LINE
+        self.raw_mode = raw_mode
+        self.raw_compress = raw_compress
+        self.raw_every = max(1, raw_every)
+        # topic_json: integer labels as JSON numbers instead of strings
+        self.json_numeric = json_numeric
+        # inline, or a parse worker thread per link (see worker.py)
+        self.parse_mode = parse_mode
+        # Frame integrity: policy for rejected fields, and rejection counters per reason
+        self.integrity_policy = integrity_policy
+        self.rejections = new_counters()
+        # Plausibility state per meter (None key unless multi_meter) and ADCO changes on
+        # single-meter links; kept across reconnects, used by the parse stage of the open link
+        self.integrity: Dict[str | None, MeterIntegrity] = {}
+        self.adco_guard = None if multi_meter else AdcoGuard()
         self.topic_line = topic_line
         self.topic_json = topic_json
         self.topic_fields = topic_fields
         self.topic_invalid = topic_invalid
         self.topic_derived = topic_derived
+        self.multi_meter = multi_meter
+        self._topics = MeterTopics(topic_line, topic_json, topic_fields, topic_invalid, topic_derived)
+        self._meter_topics: Dict[str, MeterTopics] = {}
+        # Meters (ADCO/ADSC) seen on this port, and the labels already announced to HA per meter
+        self.meters: set = set()
+        self._discovered: Dict[str, set] = {}
+        # Labels whose configs are being published, per meter: announced once accepted
+        self._discovery_pending: Dict[str, set] = {}
+        # Retained config topic -> payload hash, persisted by the caller on change
+        self.discovery_hashes = {} if discovery_hashes is None else discovery_hashes
+        self._on_discovery_change = on_discovery_change
+        self._discovery_tasks: set = set()
         self.ha_discovery = ha_discovery
         self.ha_discovery_prefix = ha_discovery_prefix
         self.ha_device_name = ha_device_name
         self.include_wh = include_wh
+        self.publisher = publisher
+        # Raw lines and invalid-line reports are streams: never coalesced by topic
+        publisher.streams.update((topic_line, topic_invalid))
+        self._acquired = False
+        # Runtime counters/histograms, None when disabled
+        self.metrics = metrics
+        # Derived analytics per meter (ADCO, None until known), None when disabled
+        self.analytics: Dict[str | None, MeterAnalytics] | None = {} if analytics else None
+        # EUR/kWh per period key for the daily costs (analytics), empty when not configured
+        self.prices = prices or {}
+        # Local frame history, None when disabled
+        self.history = history
+        self._history_task = None
+        # Hourly recorder statistics of the energy indexes, None when disabled
+        self.statistics = statistics
+        self._statistics_task = None
+        self.dedup_fields = DEDUP_FIELDS in dedup_groups
+        self.dedup_derived = DEDUP_DERIVED in dedup_groups
+        self.dedup_heartbeat = dedup_heartbeat
+        # Last published payload and publish time, keyed by topic
+        self._last_pub: Dict[str, Tuple[str, float]] = {}
+        # Last valid frame per meter for snapshot(): (version, wall time, accepted fields);
+        # the version grows with every stored frame of the session
+        self._last_valid: Dict[str | None, Tuple[int, float, Dict[str, str]]] = {}
+        self.snapshot_version = 0
+        # MQTT snapshot requests, answered on <topic_json>/snapshot[/<id>]
+        self.snapshot_request_topic = f"{topic_json}/get"
+        # In-process frame consumers (entities, optional bus bridge)
+        self._subscribers: List[Callable[[Frame], None]] = []
 
-    async def start(self):
-        import serial_asyncio
+    async def start(self, background: bool = False):
+        # background: the supervisor opens the port, so a slow or missing port does not hold the caller
+        if not background:
+            await self._open(self.baud)
+        self.publisher.acquire()
+        self._acquired = True
+        self._task = asyncio.get_running_loop().create_task(self._supervise())
+        if self.history is not None:
+            self._history_task = asyncio.get_running_loop().create_task(self._flush_history())
+        if self.statistics is not None:
+            self._statistics_task = asyncio.get_running_loop().create_task(self._flush_statistics())
+
+    async def _open(self, baud: int):
         loop = asyncio.get_running_loop()
-        self.transport, self.protocol = await serial_asyncio.create_serial_connection(
-            loop, lambda: _TeleinfoProto(self), self.port, baudrate=self.baud,
-            bytesize=self.bits, parity=self.parity, stopbits=self.stopbits,
-            timeout=self.timeout
-        )
+        if self.source != SOURCE_SERIAL:
+            self.transport, self.protocol = await create_replay_connection(
+                loop, lambda: _TeleinfoProto(self), self.source, self.port, baud=baud,
+                bits_per_char=1 + self.bits + (self.parity != "N") + self.stopbits,
+                realtime=self.replay_realtime,
+            )
+        else:
+            # Imported off the loop, once (pyserial is slow to import)
+            serial_asyncio = await loop.run_in_executor(None, importlib.import_module, "serial_asyncio")
+            self.transport, self.protocol = await serial_asyncio.create_serial_connection(
+                loop, lambda: _TeleinfoProto(self), self.port, baudrate=baud,
+                bytesize=self.bits, parity=self.parity, stopbits=self.stopbits,
+                timeout=self.timeout
+            )
+        self._opened_ts = time.monotonic()
+        self._lost.clear()
 
-    async def async_close(self):
+    async def _supervise(self):
+        # Reopen the port on transport loss or frame silence (watchdog). In auto mode,
+        # silence before the first valid frame alternates the 1200/9600 baud rates.
+        bauds = [self.baud] + [b for b in (BAUD_HISTORIC, BAUD_STANDARD) if b != self.baud]
+        if self.transport is None:
+            await self._reconnect(initial=True)
+        while True:
+            probing = self.tic_mode == MODE_AUTO and not self.frames_valid
+            limit = PROBE_WINDOW if probing else self.watchdog
+            if self._lost.is_set():
+                _LOGGER.warning("Téléinfo serial connection lost on %s, reconnecting", self.port)
+            elif not limit:
+                await self._lost.wait()
+                continue
+            else:
+                idle = time.monotonic() - max(self.last_frame_ts or 0.0, self._opened_ts)
+                if idle < limit:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._lost.wait(), limit - idle)
+                    continue
+                if probing:
+                    self.baud = bauds[(bauds.index(self.baud) + 1) % len(bauds)]
+                    _LOGGER.info("No valid Téléinfo frame on %s, retrying at %s baud", self.port, self.baud)
+                else:
+                    _LOGGER.warning("No valid Téléinfo frame on %s for %ss, reconnecting", self.port, limit)
+            if self.frames_valid and self._outage_start is None:
+                self._outage_start = time.monotonic()
+                self._set_available(False)
+            await self._reconnect()
+
+    async def _reconnect(self, initial: bool = False):
         if self.transport:
             self.transport.close()
+        delay = 0.0 if initial else RECONNECT_MIN
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._open(self.baud)
+                break
+            except Exception as e:
+                delay = min(max(delay * 2, RECONNECT_MIN), RECONNECT_MAX)
+                _LOGGER.warning("Serial %s failed on %s: %s (retry in %.0fs)", "open" if initial else "reopen", self.port, e, delay)
+        if not initial:
+            self.reconnects += 1
+
+    def _connection_lost(self, protocol):
+        # Ignore late callbacks from a transport we already replaced
+        if protocol is self.protocol:
+            self._lost.set()
+
+    def topics(self, adco: str | None = None) -> MeterTopics:
+        # Per-meter namespace ("teleinfo/fields/<ADCO>/PAPP") when multi_meter is on
+        if not self.multi_meter or not adco:
+            return self._topics
+        t = self._meter_topics.get(adco)
+        if t is None:
+            t = self._meter_topics[adco] = MeterTopics(*(f"{base}/{adco}" for base in self._topics))
+            self.publisher.streams.update((t.line, t.invalid))
+        return t
+
+    def _frame_ok(self, now: float, adco: str | None = None):
+        if adco:
+            self.meters.add(adco)
+        self.frames_valid += 1
+        self.last_frame_ts = now
+        if self._outage_start is not None:
+            self.last_recovery = round(now - self._outage_start, 1)
+            self._outage_start = None
+            _LOGGER.info("Téléinfo on %s recovered after %ss", self.port, self.last_recovery)
+            self._set_available(True)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.frames_valid) and self._outage_start is None
+
+    def _set_available(self, online: bool):
+        # Availability of the MQTT discovery entities: the port's topic (the one a
+        # last will can cover) and, with multi_meter, each meter's own
+        if self.ha_discovery:
+            payload = "online" if online else "offline"
+            topics = {f"{self.topics(adco).derived}/ha_avail" for adco in {None} | self.meters}
+            self.publisher.publish_batch((topic, payload, True) for topic in sorted(topics))
+
+    def publish_availability(self):
+        # Current availability again, e.g. once an MQTT client reconnected after its will
+        # was published; nothing before the first frame
+        if self.frames_valid:
+            self._set_available(self.available)
+
+    def link_stats(self) -> Dict[str, Any]:
+        return {
+            "port": self.port,
+            "source": self.source,
+            "parse_mode": self.parse_mode,
+            "baud": self.baud,
+            "mode": self.mode,
+            "connected": self.transport is not None and not self._lost.is_set(),
+            "frames_valid": self.frames_valid,
+            "last_frame_age": round(time.monotonic() - self.last_frame_ts, 1) if self.last_frame_ts else None,
+            "reconnects": self.reconnects,
+            "last_recovery_s": self.last_recovery,
+            "meters": sorted(self.meters),
+            "integrity_policy": self.integrity_policy,
+            "rejections": dict(self.rejections),
+            "statistics_imported": self.statistics.imported if self.statistics is not None else None,
+        }
+
+    async def async_close(self):
         if self._task:
             self._task.cancel()
-            with contextlib.suppress(Exception):
+            with contextlib.suppress(BaseException):
                 await self._task
+            self._task = None
+        for task in tuple(self._discovery_tasks):
+            task.cancel()
+            with contextlib.suppress(BaseException):
+                await task
+        if self.transport:
+            self.transport.close()
+        if self._acquired:
+            self._acquired = False
+            await self.publisher.async_release()
+        task, self._statistics_task = self._statistics_task, None
+        if task:
+            task.cancel()
+            with contextlib.suppress(BaseException):
+                await task
+        task, self._history_task = self._history_task, None
+        if task:
+            task.cancel()
+            with contextlib.suppress(BaseException):
+                await task
+            await self.history.async_close()
 
     def stop(self):
         asyncio.create_task(self.async_close())
 
+    def async_subscribe(self, cb: Callable[[Frame], None]) -> Callable[[], None]:
+        # cb(frame) is called on the event loop for every parsed frame (read-only Mapping,
+        # see frame.py); returns an unsubscribe
+        self._subscribers.append(cb)
+        def _unsub():
+            with contextlib.suppress(ValueError):
+                self._subscribers.remove(cb)
+        return _unsub
+
+    def dispatch_frame(self, frame: Frame):
+        for cb in tuple(self._subscribers):
+            try:
+                cb(frame)
+            except Exception:
+                _LOGGER.exception("Error in Téléinfo frame subscriber %s", cb)
+
     # ------------- helpers -------------
     @staticmethod
     def _tic_checksum_ok(label: str, value: str, chk_char: str) -> bool:
@@ -162,11 +583,48 @@ class TeleinfoSession:
         calc = (total & 0x3F) + 0x20
         return len(chk_char) == 1 and ord(chk_char) == calc
 
+    def parse_line(self, s: str):
+        # (label, value, horodate, chk, ok) in the active mode
+        mode = self.mode
+        if mode == MODE_STANDARD or (mode is None and "\t" in s):
+            res = parse_std_line(s)
+            if res[4] or mode == MODE_STANDARD:
+                return res
+        label, value, chk, ok = self.parse_tic_line(s)
+        return (label, value, None, chk, ok)
+
+    def parse_line_bytes(self, b: bytes):
+        # Same result as parse_line(decoded b), without decoding the whole line
+        if not self._fast:
+            return self.parse_line(self.decode_line(b))
+        mode = self.mode
+        if mode == MODE_STANDARD or (mode is None and 9 in b):
+            res = parse_std_bytes(b)
+            if res[4] or mode == MODE_STANDARD:
+                return res
+        res = parse_hist_bytes(b)
+        if res is None:
+            label, value, chk, ok = self.parse_tic_line(b.decode("latin-1"))
+            return (label, value, None, chk, ok)
+        return res
+
+    def decode_line(self, b: bytes) -> str:
+        try:
+            return str(b, self.decode, "ignore")
+        except Exception:
+            return ""
+
+    # Reference implementation for historic lines; parse_hist_bytes must match it
     def parse_tic_line(self, s: str):
         raw = s
         s = s.strip("\r\n")
         if not s:
             return (None, None, None, False)
+        # The checksum can be SP itself ("PTEC HP..  "), which split() would swallow
+        if len(s) >= 4 and s[-2:] == "  ":
+            label, _, value = s[:-2].partition(" ")
+            if label and value and self._tic_checksum_ok(label, value, " "):
+                return (label, value, " ", True)
         parts = s.split()
         if len(parts) < 2:
             return (None, None, None, False)
@@ -194,182 +652,607 @@ class TeleinfoSession:
         else:
             return (label, parts[1], "", False)
 
-    @staticmethod
-    def ptec_friendly(code: str):
-        c = (code or "").strip().upper()
-        tempo = {
-            "HCJB": ("Heures Creuses (Tempo Bleu)",  "HC_BLEU",  "mdi:weather-night"),
-            "HPJB": ("Heures Pleines (Tempo Bleu)", "HP_BLEU",  "mdi:white-balance-sunny"),
-            "HCJW": ("Heures Creuses (Tempo Blanc)","HC_BLANC", "mdi:weather-night"),
-            "HPJW": ("Heures Pleines (Tempo Blanc)","HP_BLANC", "mdi:white-balance-sunny"),
-            "HCJR": ("Heures Creuses (Tempo Rouge)","HC_ROUGE", "mdi:weather-night"),
-            "HPJR": ("Heures Pleines (Tempo Rouge)","HP_ROUGE", "mdi:white-balance-sunny"),
+    # (friendly, short, icon) of a PTEC code, from the precompiled table (tariff.py)
+    ptec_friendly = staticmethod(ptec_period)
+
+    def raw_payload(self, lines: List[bytes]) -> str | bytes:
+        # block: newline-joined decoded lines; raw: the frame bytes, STX..ETX
+        if self.raw_mode == RAW_BLOCK:
+            payload = "\n".join(self.decode_line(line).strip("\r\n") for line in lines)
+            if not self.raw_compress:
+                return payload
+            payload = payload.encode("utf-8")
+        else:
+            payload = _STX_B + b"".join(_LF_B + line for line in lines) + _ETX_B
+        return zlib.compress(payload) if self.raw_compress else payload
+
+    async def _flush_history(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.history.async_flush()
+            except Exception as e:
+                _LOGGER.warning("Téléinfo history write failed: %s", e)
+
+    async def _flush_statistics(self):
+        # Hours missed while down, from the local history, then closed hours as they come
+        if self.history is not None:
+            try:
+                await self.statistics.async_backfill(self.history, self.history.meta.get("adco"), time.time())
+            except Exception as e:
+                _LOGGER.warning("Téléinfo statistics backfill failed: %s", e)
+        while True:
+            await asyncio.sleep(STATISTICS_INTERVAL)
+            try:
+                await self.statistics.async_flush(time.time())
+            except Exception as e:
+                _LOGGER.warning("Téléinfo statistics import failed: %s", e)
+
+    def record_history(self, adco: str | None, valid: Dict[str, str]):
+        # Integer entity labels only; series are keyed per meter with multi_meter
+        prefix = f"{adco}/" if self.multi_meter and adco else ""
+        values = {}
+        for label, raw in valid.items():
+            if label in ENTITY_LABELS:
+                try:
+                    values[prefix + label] = int(raw)
+                except ValueError:
+                    pass
+        if adco:
+            self.history.set_meta("adco", adco)
+        self.history.add(int(time.time()), values)
+
+    async def async_backfill(self, start: int, end: int, minute: bool) -> int:
+        # One JSON message per timestamp (and meter) on <topic_json>/backfill, out of the frame queue
+        msgs = []
+        for row in await self.history.async_query(start, end, minute):
+            ts = row.pop("ts")
+            per_meter: Dict[str | None, Dict[str, Any]] = {}
+            for key, v in row.items():
+                adco, _, label = key.rpartition("/")
+                per_meter.setdefault(adco or None, {"ts": ts})[label] = v
+            for adco, payload in per_meter.items():
+                msgs.append((f"{self.topics(adco).json}/backfill", json.dumps(payload), False))
+        for i in range(0, len(msgs), 500):
+            await self.publisher.async_publish_many(msgs[i:i + 500], DISCOVERY_CONCURRENCY)
+        return len(msgs)
+
+    def update_analytics(self, adco: str | None, valid: Dict[str, str], ptec_short: str | None, now: float) -> Dict[str, int | str]:
+        a = self.analytics.get(adco)
+        if a is None:
+            a = self.analytics[adco] = MeterAnalytics(self.prices)
+        return a.update(valid, ptec_short, now)
+
+    def analytics_values(self, adco: str | None) -> Dict[str, int | str]:
+        a = self.analytics.get(adco) if self.analytics is not None else None
+        return a.values if a is not None else {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Versioned state of every meter on this port: last accepted fields and derived values
+        meters = {}
+        for adco, (version, ts, valid) in self._last_valid.items():
+            meter = adco or valid.get("ADCO") or valid.get("ADSC") or ""
+            derived: Dict[str, Any] = {}
+            if "PTEC" in valid:
+                friendly, short, _icon = ptec_period(valid["PTEC"])
+                derived.update(ptec_friendly=friendly, ptec_short=short, hc_active=short.startswith("HC"))
+            for key, v in self.analytics_values(adco).items():
+                # As published: costs in EUR
+                derived[key] = round(v / COST_SCALE, 4) if key.startswith("cost_day") else v
+            meters[meter] = {"version": version, "ts": round(ts, 3), "fields": dict(valid), "derived": derived}
+        return {
+            "version": self.snapshot_version,
+            "port": self.port,
+            "mode": self.mode,
+            "available": self.available,
+            "meters": meters,
         }
-        if c in tempo: return tempo[c]
-        if c.startswith("HC"): return ("Heures Creuses", "HC", "mdi:weather-night")
-        if c.startswith("HP"): return ("Heures Pleines", "HP", "mdi:white-balance-sunny")
-        if c.startswith("TH"): return ("Toutes Heures", "TH", "mdi:clock-outline")
-        if c.startswith("HN"): return ("Heures Normales", "HN", "mdi:timer-outline")
-        if c.startswith("PM"): return ("Pointe Mobile", "PM", "mdi:flash-alert")
-        return ("Inconnu", "UNK", "mdi:clock-alert")
-
-    async def publish_mqtt(self, topic: str, payload: str, retain: bool=False):
-        try:
-            from homeassistant.components import mqtt
-        except Exception:
-            _LOGGER.debug("MQTT component not available; drop %s", topic)
-            return
+
+    def answer_snapshot(self, payload: str | bytes):
+        # Request payload: empty, or JSON {"id": "..."} for a reply on <topic_json>/snapshot/<id>
+        topic = f"{self.topic_json}/snapshot"
         try:
-            await mqtt.async_publish(self.hass, topic, payload, qos=0, retain=retain)
-        except Exception as e:
-            _LOGGER.warning("MQTT publish failed for %s: %s", topic, e)
+            req = json.loads(payload) if payload else None
+        except ValueError:
+            req = None
+        rid = req.get("id") if isinstance(req, dict) else None
+        if isinstance(rid, str) and rid and not any(c in rid for c in "/+#"):
+            topic = f"{topic}/{rid}"
+        self.publisher.publish(topic, json.dumps(self.snapshot()), False)
 
-    async def publish_discovery(self, adco: str, present: set):
+    def changed(self, topic: str, payload: str, now: float) -> bool:
+        # False when payload equals the last published one and the heartbeat has not expired
+        last = self._last_pub.get(topic)
+        if last is not None and last[0] == payload and now - last[1] < self.dedup_heartbeat:
+            return False
+        self._last_pub[topic] = (payload, now)
+        return True
+
+    def publish_mqtt(self, topic: str, payload: str, retain: bool=False):
+        self.publisher.publish(topic, payload, retain)
+
+    def republish_discovery(self):
+        # Broker or HA restarted (retained configs possibly gone): announce every
+        # known meter and label again, whatever the broker is believed to hold
+        announced, self._discovered = self._discovered, {}
+        for adco, labels in announced.items():
+            self.publish_discovery(adco, labels | self._discovery_pending.get(adco, set()), force=True)
+
+    def publish_discovery(self, adco: str, present: set, force: bool = False):
+        # Incremental: only labels not yet announced (nor being announced) for this meter
+        done = self._discovered.get(adco)
+        first = done is None
+        if first:
+            done = self._discovered[adco] = set()
+        pending = self._discovery_pending.setdefault(adco, set())
+        present = present - done if force else present - done - pending
+        if not present and not first:
+            return
+        t = self.topics(adco)
+        name = self.ha_device_name or f"Téléinfo {adco}"
+        if self.multi_meter and self.ha_device_name:
+            name = f"{name} {adco}"
         dev = {
             "identifiers": [f"teleinfo_{adco}"],
-            "name": self.ha_device_name or f"Téléinfo {adco}",
+            "name": name,
             "manufacturer": "Enedis",
-            "model": "Linky (TIC historique)",
+            "model": "Linky (TIC standard)" if self.mode == MODE_STANDARD else "Linky (TIC historique)",
         }
+        avail = f"{t.derived}/ha_avail"
+        port_avail = f"{self.topic_derived}/ha_avail"
+        if avail == port_avail:
+            availability = {"availability_topic": avail, "payload_available": "online", "payload_not_available": "offline"}
+        else:
+            # Per meter, and the port's topic (covered by the CLI's last will): both must be online
+            availability = {
+                "availability": [
+                    {"topic": topic, "payload_available": "online", "payload_not_available": "offline"}
+                    for topic in (port_avail, avail)
+                ],
+                "availability_mode": "all",
+            }
         def sensor_cfg(uid: str, name: str, state_topic: str, **kw):
             cfg = {
                 "name": name,
                 "unique_id": uid,
                 "state_topic": state_topic,
-                "availability_topic": f"{self.topic_derived}/ha_avail",
-                "payload_available": "online",
-                "payload_not_available": "offline",
+                **availability,
                 "device": dev,
             }
             cfg.update({k: v for k, v in kw.items() if v is not None})
             return cfg
 
-        async def pub_cfg(ptype: str, uid: str, cfg: dict):
-            await self.publish_mqtt(f"{self.ha_discovery_prefix}/{ptype}/{uid}/config", json.dumps(cfg, ensure_ascii=False), retain=True)
+        # (label, topic, payload)
+        batch = []
+        label = None
+        def pub_cfg(ptype: str, uid: str, cfg: dict):
+            batch.append((label, f"{self.ha_discovery_prefix}/{ptype}/{uid}/config", json.dumps(cfg, ensure_ascii=False)))
 
-        # PAPP
-        if "PAPP" in present:
-            await pub_cfg("sensor", f"teleinfo_{adco}_papp", sensor_cfg(
-                f"teleinfo_{adco}_papp", "Téléinfo PAPP", f"{self.topic_fields}/PAPP",
-                unit_of_measurement="VA", state_class="measurement", icon="mdi:flash"
-            ))
-        # IINST
-        if "IINST" in present:
-            await pub_cfg("sensor", f"teleinfo_{adco}_iinst", sensor_cfg(
-                f"teleinfo_{adco}_iinst", "Téléinfo IINST", f"{self.topic_fields}/IINST",
-                unit_of_measurement="A", device_class="current", state_class="measurement", icon="mdi:current-ac"
-            ))
-        # IMAX
-        if "IMAX" in present:
-            await pub_cfg("sensor", f"teleinfo_{adco}_imax", sensor_cfg(
-                f"teleinfo_{adco}_imax", "Téléinfo IMAX", f"{self.topic_fields}/IMAX",
-                unit_of_measurement="A", device_class="current", state_class="measurement", icon="mdi:current-ac"
+        # One config per known label, generated from the label registry
+        for desc in DISCOVERY_LABELS.values():
+            if desc.label not in present:
+                continue
+            label = desc.label
+            uid = f"teleinfo_{adco}_{desc.key.lower()}"
+            state_topic = f"{t.fields}/{desc.label}"
+            name = f"Téléinfo {desc.disc_name}" + (" (kWh)" if desc.wh_variant else "")
+            pub_cfg("sensor", uid, sensor_cfg(
+                uid, name, state_topic,
+                unit_of_measurement=desc.unit, device_class=desc.device_class, state_class=desc.state_class,
+                value_template=desc.value_template, icon=desc.icon
             ))
-        # Index énergie (Wh->kWh) + option Wh
-        for lbl, nice in [("BASE", "INDEX BASE"), ("HCHC", "INDEX HCHC"), ("HCHP", "INDEX HCHP")]:
-            if lbl in present:
-                await pub_cfg("sensor", f"teleinfo_{adco}_{lbl.lower()}_kwh", sensor_cfg(
-                    f"teleinfo_{adco}_{lbl.lower()}_kwh", f"Téléinfo {nice} (kWh)", f"{self.topic_fields}/{lbl}",
-                    unit_of_measurement="kWh", device_class="energy", state_class="total_increasing",
-                    value_template="{{ (value | float(0)) / 1000 }}", icon="mdi:counter"
+            # Index énergie (Wh->kWh) + option Wh
+            if desc.wh_variant and self.include_wh:
+                uid_wh = f"teleinfo_{adco}_{desc.label.lower()}_wh"
+                pub_cfg("sensor", uid_wh, sensor_cfg(
+                    uid_wh, f"Téléinfo {desc.disc_name} (Wh)", state_topic,
+                    unit_of_measurement="Wh", device_class=desc.device_class, state_class=desc.state_class,
+                    icon=desc.icon
                 ))
-                if self.include_wh:
-                    await pub_cfg("sensor", f"teleinfo_{adco}_{lbl.lower()}_wh", sensor_cfg(
-                        f"teleinfo_{adco}_{lbl.lower()}_wh", f"Téléinfo {nice} (Wh)", f"{self.topic_fields}/{lbl}",
-                        unit_of_measurement="Wh", device_class="energy", state_class="total_increasing",
-                        icon="mdi:counter"
-                    ))
-        # PTEC brut + friendly + HC actif (binary)
+        # PTEC friendly + HC actif (binary)
         if "PTEC" in present:
-            await pub_cfg("sensor", f"teleinfo_{adco}_ptec", sensor_cfg(
-                f"teleinfo_{adco}_ptec", "Téléinfo PTEC", f"{self.topic_fields}/PTEC", icon="mdi:clock-outline"
-            ))
-            await pub_cfg("sensor", f"teleinfo_{adco}_tarif", sensor_cfg(
-                f"teleinfo_{adco}_tarif", "Téléinfo Tarif courant", f"{self.topic_derived}/ptec_friendly", icon="mdi:clock-time-four-outline"
+            label = "PTEC"
+            pub_cfg("sensor", f"teleinfo_{adco}_tarif", sensor_cfg(
+                f"teleinfo_{adco}_tarif", "Téléinfo Tarif courant", f"{t.derived}/ptec_friendly", icon="mdi:clock-time-four-outline"
             ))
-            await pub_cfg("binary_sensor", f"teleinfo_{adco}_hc_active", sensor_cfg(
-                f"teleinfo_{adco}_hc_active", "Téléinfo Heures Creuses", f"{self.topic_derived}/hc_active", icon="mdi:weather-night"
+            pub_cfg("binary_sensor", f"teleinfo_{adco}_hc_active", sensor_cfg(
+                f"teleinfo_{adco}_hc_active", "Téléinfo Heures Creuses", f"{t.derived}/hc_active", icon="mdi:weather-night"
             ))
 
+        # Skip configs whose retained copy on the broker is already identical; a label
+        # is announced once all its configs are, so a failed publish is retried next frame
+        changed = []
+        for label, topic, payload in batch:
+            digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+            if force or self.discovery_hashes.get(topic) != digest:
+                changed.append((label, topic, payload, digest))
+        sending = {label for label, _topic, _payload, _digest in changed}
+        done |= present - sending
+        if changed:
+            pending |= sending
+            task = asyncio.get_running_loop().create_task(self._publish_configs(adco, changed))
+            self._discovery_tasks.add(task)
+            task.add_done_callback(self._discovery_tasks.discard)
+
         # Mark HA availability for discovery entities
-        await self.publish_mqtt(f"{self.topic_derived}/ha_avail", "online", retain=True)
+        if first and self._outage_start is None:
+            self.publisher.publish_batch((topic, "online", True) for topic in sorted({port_avail, avail}))
 
-class _TeleinfoProto(asyncio.Protocol):
+    async def _publish_configs(self, adco: str, changed: list):
+        try:
+            results = await self.publisher.async_publish_many(
+                [(topic, payload, True) for _label, topic, payload, _digest in changed], DISCOVERY_CONCURRENCY
+            )
+        except Exception as e:
+            _LOGGER.warning("Téléinfo discovery publish failed: %s", e)
+            results = [False] * len(changed)
+        failed = set()
+        for (label, topic, _payload, digest), ok in zip(changed, results):
+            if ok:
+                self.discovery_hashes[topic] = digest
+            else:
+                failed.add(label)
+        labels = {label for label, _topic, _payload, _digest in changed}
+        self._discovery_pending.get(adco, set()).difference_update(labels)
+        self._discovered.setdefault(adco, set()).update(labels - failed)
+        if any(results) and self._on_discovery_change:
+            self._on_discovery_change()
+
+class ParsedFrame(NamedTuple):
+    # Output of the parse stage (_FrameAssembler), consumed on the event loop by _TeleinfoProto
+    t_etx: float
+    lines: List[bytes]
+    frame: Frame
+    # Accepted fields (checksum and plausibility)
+    valid: Dict[str, str]
+    # label -> topic_invalid payload of checksum failures, None when there are none
+    invalid: Dict[str, str] | None
+    n_ok: int
+    adco: str | None
+    json: str | bytes | None
+    # label -> rejection reason; dropped under the drop policy
+    rejected: Dict[str, str]
+    dropped: bool
+
+class _FrameAssembler:
+    # Framing, parsing and integrity checks of the raw byte stream. Touches no event
+    # loop state, so it runs inline in data_received or on the parse worker thread alike.
     def __init__(self, session: TeleinfoSession):
         self.sess = session
         self.buf = bytearray()
         self.in_frame = False
         self.frame_lines = []
         self.stats_invalid = 0
+        # Raw lines waiting to be mirrored with the next result
+        self.lines = []
+        # (ParsedFrame or None for mirror lines only, mirror lines, adco) of the current feed()
+        self.results = []
 
-    def data_received(self, data: bytes):
-        for b in data:
-            if b == 0x02:  # STX
+    def feed(self, data: bytes) -> list:
+        # Scan the chunk for STX/ETX/LF boundaries with bytes.find and only copy
+        # whole line slices; bytes between boundaries are never visited in Python.
+        n = len(data)
+        mv = memoryview(data)
+        find = data.find
+        nxt_stx = find(_STX_B)
+        nxt_etx = find(_ETX_B)
+        nxt_lf = find(_LF_B)
+        if nxt_stx < 0: nxt_stx = n
+        if nxt_etx < 0: nxt_etx = n
+        if nxt_lf < 0: nxt_lf = n
+        pos = 0
+        while pos < n:
+            i = min(nxt_stx, nxt_etx, nxt_lf)
+            if i >= n:
+                # Partial line, wait for the next chunk
+                self.buf += mv[pos:]
+                break
+            if i == nxt_lf:
+                if self.buf:
+                    self.buf += mv[pos:i]
+                    self._line_received(bytes(self.buf))
+                else:
+                    self._line_received(data[pos:i])
+                self.buf.clear()
+                nxt_lf = find(_LF_B, i + 1)
+                if nxt_lf < 0: nxt_lf = n
+            elif i == nxt_stx:
+                if self.in_frame:
+                    # No ETX since the last STX
+                    self.sess.rejections[REJECT_TRUNCATED] += 1
                 self.in_frame = True
-                self.frame_lines.clear()
+                self.frame_lines = []
                 self.buf.clear()
-                continue
-            if b == 0x03:  # ETX
-                frame_obj: Dict[str, Any] = {"_meta": {"invalid_lines": self.stats_invalid}}
-                self.stats_invalid = 0
-                present = set()
-                for raw in self.frame_lines:
-                    try:
-                        label, value, chk, ok = self.sess.parse_tic_line(raw)
-                        if label and value is not None:
-                            frame_obj[label] = value
-                            present.add(label)
-                            # Push per-field
-                            if self.sess.mqtt_enable:
-                                asyncio.create_task(self.sess.publish_mqtt(f"{self.sess.topic_fields}/{label}", str(value)))
-                            if not ok and self.sess.mqtt_enable:
-                                inv = {
-                                    "label": label,
-                                    "raw": raw.strip("\r\n"),
-                                    "hex": " ".join(f"{ord(c):02X}" for c in raw),
-                                }
-                                asyncio.create_task(self.sess.publish_mqtt(self.sess.topic_invalid, json.dumps(inv, ensure_ascii=False)))
-                    except Exception:
-                        pass
-                # Derived
-                ptec_code = frame_obj.get("PTEC", "")
-                friendly, short, _icon = self.sess.ptec_friendly(ptec_code)
-                if self.sess.mqtt_enable:
-                    asyncio.create_task(self.sess.publish_mqtt(f"{self.sess.topic_derived}/ptec_friendly", friendly))
-                    asyncio.create_task(self.sess.publish_mqtt(f"{self.sess.topic_derived}/ptec_short", short))
-                    asyncio.create_task(self.sess.publish_mqtt(f"{self.sess.topic_derived}/hc_active", "ON" if short.startswith("HC") else "OFF"))
-
-                # One-shot MQTT discovery once ADCO known
-                if self.sess.ha_discovery and not self.sess._ha_discovery_done:
-                    adco = frame_obj.get("ADCO")
-                    if adco:
-                        asyncio.create_task(self.sess.publish_discovery(adco, present))
-                        self.sess._ha_discovery_done = True
-
-                # Whole frame
-                if self.sess.mqtt_enable:
-                    asyncio.create_task(self.sess.publish_mqtt(self.sess.topic_json, json.dumps(frame_obj, ensure_ascii=False)))
-
-                # Notify HA listeners (entities)
-                self.sess.hass.bus.async_fire(EVT_FRAME, {"frame": frame_obj})
-
+                nxt_stx = find(_STX_B, i + 1)
+                if nxt_stx < 0: nxt_stx = n
+            else:
+                if self.in_frame:
+                    # The last group ends at ETX, not at a LF
+                    if self.buf:
+                        self.buf += mv[pos:i]
+                        self._line_received(bytes(self.buf))
+                    elif i > pos:
+                        self._line_received(data[pos:i])
+                    self._frame_received()
+                else:
+                    self.sess.rejections[REJECT_ETX_WITHOUT_STX] += 1
                 self.in_frame = False
-                self.frame_lines.clear()
+                self.frame_lines = []
                 self.buf.clear()
+                nxt_etx = find(_ETX_B, i + 1)
+                if nxt_etx < 0: nxt_etx = n
+            pos = i + 1
+        # Lines seen outside a frame are not held back until the next ETX
+        if self.lines and not self.in_frame:
+            self.results.append((None, self.lines, None))
+            self.lines = []
+        results, self.results = self.results, []
+        return results
+
+    def _line_received(self, line: bytes):
+        # Lines are kept as bytes; decoding happens only where a str is needed
+        sess = self.sess
+        if not line:
+            # STX is followed by the first group's LF
+            return
+        if not sess._fast and not sess.decode_line(line):
+            self.stats_invalid += 1
+            return
+        if sess.mqtt_enable and sess.raw_per_line:
+            self.lines.append(sess.decode_line(line).strip("\r\n"))
+        if self.in_frame:
+            self.frame_lines.append(line)
+
+    def _frame_received(self):
+        sess = self.sess
+        t_etx = time.perf_counter() if sess.metrics is not None else 0.0
+        invalid_lines = self.stats_invalid
+        self.stats_invalid = 0
+        if sess.mode is None:
+            sess.mode = detect_mode(map(sess.decode_line, self.frame_lines), sess.parse_tic_line)
+            if sess.mode:
+                _LOGGER.info("Téléinfo on %s: %s mode detected", sess.port, sess.mode)
+        timestamps = None
+        labels = []
+        values = []
+        valid = {}
+        rejected = {}
+        invalid = None
+        n_ok = 0
+        for raw in self.frame_lines:
+            try:
+                label, value, ts, chk, ok = sess.parse_line_bytes(raw)
+            except Exception:
                 continue
+            if label and value is not None:
+                labels.append(label)
+                if ts:
+                    if timestamps is None:
+                        timestamps = {}
+                    timestamps[label] = horodate_iso(ts)
+                if ok:
+                    n_ok += 1
+                    value = valid[label] = intern_value(label, value)
+                else:
+                    rejected[label] = REJECT_CHECKSUM
+                    if sess.mqtt_enable:
+                        line = sess.decode_line(raw)
+                        # latin-1: one char per byte, so the bytes' hex is the same dump
+                        hexdump = raw.hex(" ").upper() if sess._fast else " ".join(f"{ord(c):02X}" for c in line)
+                        if invalid is None:
+                            invalid = {}
+                        invalid[label] = encode_invalid(label, line.strip("\r\n"), hexdump)
+                values.append(value)
+        layout = frame_layout(tuple(labels))
+        if len(layout.present) != len(labels):
+            # Repeated label: first position, last value, as a dict would keep them
+            fields = dict(zip(labels, values))
+            layout, values = frame_layout(tuple(fields)), list(fields.values())
+        frame = Frame(layout, values)
 
-            if b == 0x0A:  # LF
-                try:
-                    line = self.buf.decode(self.sess.decode, errors="ignore")
-                except Exception:
-                    line = ""
-                if line:
-                    if self.sess.mqtt_enable:
-                        asyncio.create_task(self.sess.publish_mqtt(self.sess.topic_line, line.strip("\r\n")))
-                    if self.in_frame:
-                        self.frame_lines.append(line)
+        # Meter of this frame, from its own ADCO/ADSC line only: a new ADCO on a
+        # single-meter link must persist to be taken
+        adco = None
+        for label in _ADCO_LABELS:
+            value = valid.get(label)
+            if value is not None:
+                if sess.adco_guard is None or sess.adco_guard.check(value):
+                    adco = value
                 else:
-                    self.stats_invalid += 1
-                self.buf.clear()
+                    rejected[label] = REJECT_ADCO_MISMATCH
+                    del valid[label]
+        dropped = False
+        if adco is None and sess.adco_guard is not None:
+            # Single-meter link: still the link's meter when its ADCO line failed
+            adco = sess.adco_guard.adco
+        elif adco is None:
+            # multi_meter: without a valid ADCO the frame cannot be credited to any meter
+            sess.rejections[REJECT_UNKNOWN_METER] += 1
+            dropped = True
+        if not dropped:
+            key = adco if sess.multi_meter else None
+            state = sess.integrity.get(key)
+            if state is None:
+                state = sess.integrity[key] = MeterIntegrity()
+            implausible = state.check(valid)
+            if implausible:
+                rejected.update(implausible)
+                for label in implausible:
+                    del valid[label]
+            state.accept(valid)
+        if rejected:
+            counters = sess.rejections
+            for reason in rejected.values():
+                counters[reason] += 1
+            policy = sess.integrity_policy
+            if dropped:
+                pass
+            elif policy == POLICY_DROP:
+                counters[REJECT_DROPPED] += 1
+                dropped = True
+            elif policy == POLICY_KEEP_LAST:
+                apply_keep_last(frame, state, rejected)
+
+        # "_meta" is only attached when there is something to report (see frame_json)
+        if invalid_lines or timestamps or rejected:
+            frame.meta = meta = {"invalid_lines": invalid_lines}
+            if timestamps:
+                meta["timestamps"] = timestamps
+            if rejected:
+                meta["rejected"] = rejected
+        payload = encode_frame(frame.as_dict(), sess.json_numeric) if sess.mqtt_enable and not dropped else None
+        self.results.append((
+            ParsedFrame(t_etx, self.frame_lines, frame, valid, invalid, n_ok, adco, payload, rejected, dropped),
+            self.lines, adco,
+        ))
+        self.lines = []
+
+class _TeleinfoProto(asyncio.Protocol):
+    def __init__(self, session: TeleinfoSession):
+        self.sess = session
+        self.assembler = _FrameAssembler(session)
+        # Frames since the last mirrored one (raw_every sampling)
+        self.raw_skip = 0
+        self.worker = None
+        if session.parse_mode == PARSE_THREAD:
+            self.worker = ParseWorker(
+                asyncio.get_running_loop(), self.assembler.feed, self._deliver, f"teleinfo-{session.port}"
+            )
+        self._closed = False
+
+    def connection_lost(self, exc):
+        self._closed = True
+        if self.worker is not None:
+            self.worker.stop()
+        self.sess._connection_lost(self)
+
+    def data_received(self, data: bytes):
+        if self.sess.metrics is not None:
+            self.sess.metrics.bytes_in += len(data)
+        if self.worker is not None:
+            self.worker.put(data)
+        else:
+            self._deliver(self.assembler.feed(data))
+
+    def _deliver(self, results: list):
+        if self._closed and self.worker is not None:
+            # Late batch from the worker of a closed link
+            return
+        for frame, lines, adco in results:
+            if frame is None:
+                self._flush(lines, [], self.sess.topics(adco))
             else:
-                self.buf.append(b)
+                self._frame_received(frame, lines)
+
+    def _flush(self, lines: list, out: list, t: MeterTopics, ack=None):
+        # Raw lines go first, as they were received before the frame's own messages
+        if lines:
+            out[:0] = [(t.line, line, False) for line in lines]
+        self.sess.publisher.publish_batch(out, ack)
+
+    def _flush_frame(self, pf: ParsedFrame, lines: list, out: list, t: MeterTopics, t_loop: float):
+        m = self.sess.metrics
+        if m is None:
+            self._flush(lines, out, t)
+            return
+        for label, reason in pf.rejected.items():
+            if reason == REJECT_CHECKSUM:
+                m.checksum_failed(label)
+        self._flush(lines, out, t, m.publish_ack(pf.t_etx))
+        m.frame(len(pf.lines), time.perf_counter() - t_loop)
+
+    def _raw_mirror(self, pf: ParsedFrame, lines: list, out: list, t: MeterTopics) -> list:
+        # Raw mirror of this frame, sampled every raw_every frames: the per-line
+        # lines to send (none when skipped), or the block/raw message put first in out
+        self.raw_skip += 1
+        if self.raw_skip < self.sess.raw_every:
+            return []
+        self.raw_skip = 0
+        if not self.sess.raw_per_line:
+            out.insert(0, (t.line, self.sess.raw_payload(pf.lines), False))
+        return lines
+
+    def _frame_received(self, pf: ParsedFrame, lines: list):
+        sess = self.sess
+        m = sess.metrics
+        # Event loop time of the frame: parse included when inline
+        t_loop = (pf.t_etx if self.worker is None else time.perf_counter()) if m is not None else 0.0
+        out = []
+        now = time.monotonic()
+        frame = pf.frame
+        adco = pf.adco
+        if pf.n_ok:
+            sess._frame_ok(now, adco)
+        # Topic namespace of this meter (only used when multi_meter is on)
+        t = sess.topics(adco)
+
+        if pf.dropped:
+            # Only the line reports and the raw mirror of a dropped frame
+            out = [(t.invalid, payload, False) for payload in pf.invalid.values()] if pf.invalid else []
+            if sess.mqtt_enable:
+                lines = self._raw_mirror(pf, lines, out, t)
+            # Still counted in the metrics: a noisy line is when they matter
+            self._flush_frame(pf, lines, out, t, t_loop)
+            return
+
+        if sess.mqtt_enable:
+            invalid = pf.invalid
+            for label, value in zip(frame.layout.labels, frame.values):
+                # Push per-field
+                if value is not None:
+                    topic, payload = f"{t.fields}/{label}", str(value)
+                    if not sess.dedup_fields or sess.changed(topic, payload, now):
+                        out.append((topic, payload, False))
+                if invalid is not None and label in invalid:
+                    out.append((t.invalid, invalid[label], False))
+        # Derived
+        ptec_code = frame.get("PTEC", "")
+        friendly, short, _icon = sess.ptec_friendly(ptec_code)
+        if sess.mqtt_enable:
+            for topic, payload in (
+                (f"{t.derived}/ptec_friendly", friendly),
+                (f"{t.derived}/ptec_short", short),
+                (f"{t.derived}/hc_active", "ON" if short.startswith("HC") else "OFF"),
+            ):
+                if not sess.dedup_derived or sess.changed(topic, payload, now):
+                    out.append((topic, payload, False))
+        valid = pf.valid
+        if valid:
+            # Kept by reference: snapshot() copies it only when asked
+            sess.snapshot_version += 1
+            sess._last_valid[adco] = (sess.snapshot_version, time.time(), valid)
+        if sess.history is not None:
+            sess.record_history(adco, valid)
+        if sess.statistics is not None:
+            meter = adco or valid.get("ADCO") or valid.get("ADSC")
+            if meter:
+                sess.statistics.add(int(time.time()), meter, valid)
+        if sess.analytics is not None:
+            values = sess.update_analytics(adco, valid, short if "PTEC" in valid else None, now)
+            if sess.mqtt_enable:
+                for key, v in values.items():
+                    # Costs are kept in 1/10000 EUR, published in EUR
+                    topic, payload = f"{t.derived}/{key}", f"{v / COST_SCALE:.4f}" if key.startswith("cost_day") else str(v)
+                    if not sess.dedup_derived or sess.changed(topic, payload, now):
+                        out.append((topic, payload, False))
+
+        # MQTT discovery per meter once ADCO (ADSC in standard mode) is known, then for new labels
+        if sess.ha_discovery:
+            meter = adco or frame.get("ADCO") or frame.get("ADSC")
+            if meter:
+                # Registry labels only (precomputed per layout), so line noise never grows the announced set
+                labels = frame.layout.discovery
+                done = sess._discovered.get(meter)
+                if done is None or not labels <= done:
+                    sess.publish_discovery(meter, labels)
+
+        if sess.mqtt_enable:
+            lines = self._raw_mirror(pf, lines, out, t)
+
+        # Whole frame
+        if sess.mqtt_enable:
+            out.append((t.json, pf.json, False))
+        self._flush_frame(pf, lines, out, t, t_loop)
+
+        # Notify in-process subscribers (entities)
+        sess.dispatch_frame(frame)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import logging
+from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+
+from .labels import LABELS, TicLabel, CLASS_POWER, CLASS_ENERGY
+from .tariff import contract, price_mismatch, tempo_colour
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Derived analytics (opt-in)
+# -----------------------------
+# Incremental per-meter stage fed with the checksum-valid values of each
+# frame: rolling PAPP means, daily peak, daily consumption per tariff
+# period from index deltas, and an active power estimate from currents.
+# Every update is O(1) in the history length. With a price grid (EUR/kWh
+# per period key), the daily consumption of each period is also costed.
+
+# Costs are kept as integers in 1/10000 EUR
+COST_SCALE = 10000
+
+# Nominal voltage for the IINST based estimate when the meter gives none
+NOMINAL_VOLTAGE = 230
+# Larger index jumps between two frames are treated as glitches (Wh)
+_MAX_DELTA_WH = 100_000
+
+# (current, voltage) label pairs; a frame only carries one family (mono/tri, historic/standard)
+_PHASES = (
+    ("IINST", ""), ("IINST1", ""), ("IINST2", ""), ("IINST3", ""),
+    ("IRMS1", "URMS1"), ("IRMS2", "URMS2"), ("IRMS3", "URMS3"),
+)
+
+# Per-period indexes (totals EAST/EAIT/EASDxx would double count)
+_PERIOD_INDEXES = frozenset(
+    d.label for d in LABELS.values() if d.wh_variant and not d.label.startswith(("EAST", "EAIT", "EASD"))
+)
+# Historic indexes are booked under the running PTEC period (standard ones under themselves)
+_PTEC_INDEXES = frozenset(label for label in _PERIOD_INDEXES if not label.startswith("EASF"))
+
+def _derived(key: str, name: str, unit: str, device_class: str | None, state_class: str,
+             write_class: str, scale: int = 1) -> TicLabel:
+    return TicLabel(
+        key, name, unit, device_class, state_class, kind="int", scale=scale,
+        icon="mdi:chart-line", write_class=write_class, entity=True,
+    )
+
+DERIVED_LABELS: Mapping[str, TicLabel] = MappingProxyType({d.label: d for d in (
+    _derived("papp_avg_1m", "Puissance apparente moyenne 1 min", "VA", None, "measurement", CLASS_POWER),
+    _derived("papp_avg_15m", "Puissance apparente moyenne 15 min", "VA", None, "measurement", CLASS_POWER),
+    _derived("papp_peak_day", "Pic de puissance apparente du jour", "VA", None, "measurement", CLASS_POWER),
+    _derived("power_est", "Puissance active estimée", "W", "power", "measurement", CLASS_POWER),
+    _derived("cost_day", "Coût du jour", "EUR", None, "total_increasing", CLASS_ENERGY, COST_SCALE),
+    TicLabel("tempo_demain", "Couleur Tempo du lendemain", icon="mdi:palette", entity=True),
+)})
+
+@lru_cache(maxsize=None)
+def derived_label(key: str) -> TicLabel | None:
+    desc = DERIVED_LABELS.get(key)
+    if desc is None and key.startswith("energy_day_"):
+        period = key[len("energy_day_"):].upper()
+        desc = _derived(key, f"Consommation du jour {period}", "kWh", "energy", "total_increasing", CLASS_ENERGY, 1000)
+    elif desc is None and key.startswith("cost_day_"):
+        period = key[len("cost_day_"):].upper()
+        desc = _derived(key, f"Coût du jour {period}", "EUR", None, "total_increasing", CLASS_ENERGY, COST_SCALE)
+    return desc
+
+class RollingMean:
+    # Time-slotted ring: add() evicts the slots that expired since the last call
+    __slots__ = ("slot_s", "n", "sums", "counts", "total", "count", "last")
+
+    def __init__(self, window_s: float, slots: int):
+        self.slot_s = window_s / slots
+        self.n = slots
+        self.sums = [0] * slots
+        self.counts = [0] * slots
+        self.total = 0
+        self.count = 0
+        self.last = None
+
+    def add(self, now: float, value: int):
+        sid = int(now / self.slot_s)
+        if self.last is not None and sid != self.last:
+            for k in range(self.last + 1, min(sid, self.last + self.n) + 1):
+                i = k % self.n
+                self.total -= self.sums[i]
+                self.count -= self.counts[i]
+                self.sums[i] = 0
+                self.counts[i] = 0
+        i = sid % self.n
+        self.sums[i] += value
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+        self.last = sid
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+def _int(v: Any) -> int | None:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+class MeterAnalytics:
+    def __init__(self, prices: Mapping[str, float] | None = None):
+        self.avg_1m = RollingMean(60, 60)
+        self.avg_15m = RollingMean(900, 90)
+        self.day: date | None = None
+        self.peak: int | None = None
+        self.last_index: Dict[str, int] = {}
+        self.energy_day: Dict[str, int] = {}
+        # Last checksum-valid PTEC period (lowercased short), None until one is seen
+        self.period: str | None = None
+        # EUR/kWh per period key, empty without a price grid
+        self.prices = prices or {}
+        self.cost_day: Dict[str, int] = {}
+        # Contract kind from OPTARIF, the price grid is checked against it on change
+        self.contract: str | None = None
+        # Latest results, keyed like DERIVED_LABELS / derived_label()
+        self.values: Dict[str, int | str] = {}
+
+    def update(self, valid: Dict[str, str], ptec_short: str | None, now: float) -> Dict[str, int]:
+        values = self.values
+        today = date.today()
+        if today != self.day:
+            self.day = today
+            self.peak = None
+            self.energy_day = {}
+            self.cost_day = {}
+            for k in values:
+                if k.startswith(("energy_day_", "cost_day")):
+                    values[k] = 0
+
+        papp = _int(valid.get("PAPP") or valid.get("SINSTS"))
+        if papp is not None:
+            self.avg_1m.add(now, papp)
+            self.avg_15m.add(now, papp)
+            values["papp_avg_1m"] = round(self.avg_1m.mean)
+            values["papp_avg_15m"] = round(self.avg_15m.mean)
+            if self.peak is None or papp > self.peak:
+                self.peak = papp
+            values["papp_peak_day"] = self.peak
+
+        # P ~ U x I per phase, with the nominal voltage when the meter gives none (historic)
+        power = None
+        for amps_label, volts_label in _PHASES:
+            amps = _int(valid.get(amps_label))
+            if amps is not None:
+                power = (power or 0) + amps * (_int(valid.get(volts_label)) or NOMINAL_VOLTAGE)
+        if power is not None:
+            values["power_est"] = power
+
+        optarif = valid.get("OPTARIF")
+        if optarif is not None:
+            kind = contract(optarif)
+            if kind != self.contract:
+                self.contract = kind
+                missing, foreign = price_mismatch(self.prices, kind)
+                if missing or foreign:
+                    _LOGGER.warning("Price grid does not match the %s contract (OPTARIF %s): missing %s, not used %s",
+                                    kind, optarif.strip(), ", ".join(missing) or "-", ", ".join(foreign) or "-")
+
+        if ptec_short is not None:
+            self.period = ptec_short.lower()
+        for label, raw in valid.items():
+            if label not in _PERIOD_INDEXES:
+                continue
+            v = _int(raw)
+            if v is None:
+                continue
+            last = self.last_index.get(label)
+            # Historic: the running PTEC period, the last good one when PTEC failed its
+            # checksum; before any, the delta is left for the next frame; standard: the index itself
+            if label in _PTEC_INDEXES:
+                period = self.period
+                if period is None:
+                    if last is None:
+                        self.last_index[label] = v
+                    continue
+            else:
+                period = label.lower()
+            self.last_index[label] = v
+            if last is not None and 0 < v - last < _MAX_DELTA_WH:
+                energy = self.energy_day[period] = self.energy_day.get(period, 0) + v - last
+                values[f"energy_day_{period}"] = energy
+                price = self.prices.get(period)
+                if price is not None:
+                    # From the day's energy (not per-delta increments), so rounding never accumulates
+                    cost = round(energy * price * COST_SCALE / 1000)
+                    values["cost_day"] = values.get("cost_day", 0) + cost - self.cost_day.get(period, 0)
+                    self.cost_day[period] = values[f"cost_day_{period}"] = cost
+
+        demain = valid.get("DEMAIN")
+        if demain is not None:
+            values["tempo_demain"] = tempo_colour(demain)
+        return values
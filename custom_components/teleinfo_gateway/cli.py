@@ -0,0 +1,163 @@
+from __future__ import annotations
+import argparse, asyncio, contextlib, json, logging, signal, socket
+
+from . import TeleinfoSession
+from .const import (
+    DEFAULT_PORT, DEFAULT_BAUD, DEFAULT_BYTESIZE, DEFAULT_PARITY, DEFAULT_STOPBITS, DEFAULT_TIMEOUT, DEFAULT_DECODE,
+    DEFAULT_RELAXED, DEFAULT_TIC_MODE, DEFAULT_WATCHDOG, DEFAULT_MQTT_QUEUE_SIZE, DEFAULT_DEDUP_HEARTBEAT,
+    POLICY_COALESCE, QUEUE_POLICIES, DEDUP_GROUPS, RAW_PER_LINE, RAW_MODES, PARSE_INLINE, PARSE_MODES,
+)
+from .integrity import POLICY_FLAG, INTEGRITY_POLICIES
+from .metrics import SessionMetrics
+from .mqtt_client import MqttClient
+from .publisher import MqttPublisher
+from .replay import SOURCES, SOURCE_SERIAL
+from .tariff import parse_prices
+from .tic import TIC_MODES
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Headless gateway: the same session (parsing, derivation, discovery) outside
+# Home Assistant, publishing through the built-in MQTT client.
+#   python -m custom_components.teleinfo_gateway.cli --port /dev/ttyUSB0 --mqtt-host 192.168.1.10
+# -----------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="teleinfo-gateway", description="Téléinfo serial to MQTT gateway")
+    link = p.add_argument_group("link")
+    link.add_argument("--port", default=DEFAULT_PORT, help="serial port, or capture file with --source replay")
+    link.add_argument("--source", default=SOURCE_SERIAL, choices=SOURCES)
+    link.add_argument("--no-realtime", dest="realtime", action="store_false", help="replay/simulate at full speed")
+    link.add_argument("--baud", type=int, default=DEFAULT_BAUD)
+    link.add_argument("--bytesize", type=int, default=DEFAULT_BYTESIZE, choices=[7, 8])
+    link.add_argument("--parity", default=DEFAULT_PARITY, choices=["E", "N"])
+    link.add_argument("--stopbits", type=int, default=DEFAULT_STOPBITS, choices=[1, 2])
+    link.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    link.add_argument("--decode", default=DEFAULT_DECODE)
+    link.add_argument("--relaxed", nargs="*", default=DEFAULT_RELAXED, metavar="LABEL")
+    link.add_argument("--tic-mode", default=DEFAULT_TIC_MODE, choices=TIC_MODES)
+    link.add_argument("--watchdog", type=float, default=DEFAULT_WATCHDOG)
+    link.add_argument("--parse-mode", default=PARSE_INLINE, choices=PARSE_MODES)
+    link.add_argument("--integrity-policy", default=POLICY_FLAG, choices=INTEGRITY_POLICIES)
+
+    mqtt = p.add_argument_group("mqtt")
+    mqtt.add_argument("--mqtt-host", default="localhost")
+    mqtt.add_argument("--mqtt-port", type=int, default=1883)
+    mqtt.add_argument("--mqtt-username")
+    mqtt.add_argument("--mqtt-password")
+    mqtt.add_argument("--mqtt-client-id", default=f"teleinfo-{socket.gethostname()}")
+    mqtt.add_argument("--mqtt-qos", type=int, default=0, choices=[0, 1])
+    mqtt.add_argument("--mqtt-keepalive", type=int, default=60)
+    mqtt.add_argument("--mqtt-inflight", type=int, default=64, help="max unacknowledged QoS 1 publishes")
+    mqtt.add_argument("--mqtt-buffer", type=int, default=10000, help="offline buffer size (messages)")
+    mqtt.add_argument("--queue-size", type=int, default=DEFAULT_MQTT_QUEUE_SIZE)
+    mqtt.add_argument("--queue-policy", default=POLICY_COALESCE, choices=QUEUE_POLICIES)
+
+    out = p.add_argument_group("output")
+    out.add_argument("--topic-line", default="teleinfo/line")
+    out.add_argument("--topic-json", default="teleinfo/json")
+    out.add_argument("--topic-fields", default="teleinfo/fields")
+    out.add_argument("--topic-invalid", default="teleinfo/invalid")
+    out.add_argument("--topic-derived", default="teleinfo/derived")
+    out.add_argument("--raw-mode", default=RAW_PER_LINE, choices=RAW_MODES)
+    out.add_argument("--raw-compress", action="store_true")
+    out.add_argument("--raw-every", type=int, default=1)
+    out.add_argument("--json-numeric", action="store_true")
+    out.add_argument("--dedup", nargs="*", default=list(DEDUP_GROUPS), choices=DEDUP_GROUPS, metavar="GROUP")
+    out.add_argument("--dedup-heartbeat", type=float, default=DEFAULT_DEDUP_HEARTBEAT)
+    out.add_argument("--no-discovery", dest="discovery", action="store_false")
+    out.add_argument("--discovery-prefix", default="homeassistant")
+    out.add_argument("--device-name", default="", help='default: "Téléinfo <ADCO>" per meter')
+    out.add_argument("--include-wh", action="store_true")
+    out.add_argument("--multi-meter", action="store_true")
+    out.add_argument("--analytics", action="store_true")
+    out.add_argument("--prices", default="", help='EUR/kWh per tariff period, e.g. "hc=0.2068,hp=0.27"')
+
+    p.add_argument("--stats-interval", type=float, default=0, help="log counters every N seconds (0: never)")
+    p.add_argument("--log-level", default="INFO")
+    return p
+
+async def run(args: argparse.Namespace):
+    session: TeleinfoSession | None = None
+
+    def _on_connect():
+        # The broker published our will (offline) if the previous connection dropped,
+        # and may have lost the retained discovery configs (restart without persistence)
+        if session is None:
+            return
+        session.publish_availability()
+        if args.discovery:
+            session.republish_discovery()
+
+    def _on_ha_status(payload: bytes):
+        # HA (re)started: it reads the retained configs, send them again in case they are gone
+        if payload == b"online":
+            session.republish_discovery()
+
+    client = MqttClient(
+        args.mqtt_host, args.mqtt_port, client_id=args.mqtt_client_id,
+        username=args.mqtt_username, password=args.mqtt_password, keepalive=args.mqtt_keepalive,
+        qos=args.mqtt_qos, max_inflight=args.mqtt_inflight, buffer_size=args.mqtt_buffer,
+        # One will per connection: the port's topic, which every meter's entities also follow
+        will=(f"{args.topic_derived}/ha_avail", "offline", True) if args.discovery else None,
+        on_connect=_on_connect,
+    )
+    publisher = MqttPublisher(client.publish, max_batches=args.queue_size, policy=args.queue_policy)
+    session = TeleinfoSession(
+        None,
+        port=args.port, baud=args.baud, bits=args.bytesize, parity=args.parity, stopbits=args.stopbits,
+        timeout=args.timeout, decode=args.decode, relaxed_labels=set(args.relaxed), tic_mode=args.tic_mode,
+        watchdog=args.watchdog, source=args.source, replay_realtime=args.realtime,
+        mqtt_enable=True,
+        raw_mode=args.raw_mode, raw_compress=args.raw_compress, raw_every=args.raw_every,
+        json_numeric=args.json_numeric, parse_mode=args.parse_mode, integrity_policy=args.integrity_policy,
+        topic_line=args.topic_line, topic_json=args.topic_json, topic_fields=args.topic_fields,
+        topic_invalid=args.topic_invalid, topic_derived=args.topic_derived,
+        ha_discovery=args.discovery, ha_discovery_prefix=args.discovery_prefix, ha_device_name=args.device_name,
+        include_wh=args.include_wh, dedup_groups=set(args.dedup), dedup_heartbeat=args.dedup_heartbeat,
+        multi_meter=args.multi_meter, metrics=SessionMetrics() if args.stats_interval else None,
+        analytics=args.analytics, prices=parse_prices(args.prices), publisher=publisher,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    # Snapshot requests on <topic_json>/get, answered on <topic_json>/snapshot[/<id>]
+    client.subscribe(session.snapshot_request_topic, session.answer_snapshot)
+    if args.discovery:
+        client.subscribe(f"{args.discovery_prefix}/status", _on_ha_status)
+    client.start()
+    try:
+        # The session opens (and retries) the port itself
+        await session.start(background=True)
+        while not stop.is_set():
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), args.stats_interval or None)
+            if args.stats_interval and not stop.is_set():
+                _LOGGER.info("%s", json.dumps({
+                    "link": session.link_stats(),
+                    "publisher": publisher.stats(),
+                    "mqtt": client.stats(),
+                    "metrics": session.metrics.snapshot(),
+                }, default=str))
+    finally:
+        # Also reached on cancellation (Ctrl+C without signal handlers)
+        await session.async_close()
+        # A clean DISCONNECT does not fire the will
+        if args.discovery:
+            for adco in {None} | session.meters:
+                await client.publish(f"{session.topics(adco).derived}/ha_avail", "offline", True)
+        await client.async_stop()
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
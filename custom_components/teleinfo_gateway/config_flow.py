@@ -7,10 +7,22 @@ from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
+from .tic import TIC_MODES
+from .replay import SOURCES, SOURCE_SERIAL
+from .integrity import POLICY_FLAG, INTEGRITY_POLICIES
 from .const import (
     DOMAIN, DEFAULT_PORT, DEFAULT_BAUD, DEFAULT_BYTESIZE, DEFAULT_PARITY, DEFAULT_STOPBITS, DEFAULT_TIMEOUT, DEFAULT_DECODE, DEFAULT_RELAXED,
+    DEFAULT_TIC_MODE,
     OPT_MQTT_ENABLE, OPT_MQTT_TOPIC_LINE, OPT_MQTT_TOPIC_JSON, OPT_MQTT_TOPIC_FIELDS, OPT_MQTT_TOPIC_INVALID, OPT_MQTT_TOPIC_DERIVED,
     OPT_HA_DISCOVERY, OPT_HA_DISCOVERY_PREFIX, OPT_HA_DEVICE_NAME, OPT_INCLUDE_WH,
+    OPT_MQTT_QUEUE_SIZE, OPT_MQTT_QUEUE_POLICY, DEFAULT_MQTT_QUEUE_SIZE, POLICY_COALESCE, QUEUE_POLICIES,
+    OPT_DEDUP_GROUPS, OPT_DEDUP_HEARTBEAT, DEDUP_GROUPS, DEFAULT_DEDUP_HEARTBEAT,
+    OPT_MIN_INTERVAL_POWER, OPT_MIN_INTERVAL_CURRENT, OPT_MIN_INTERVAL_ENERGY, OPT_STATUS_INTERVAL,
+    OPT_DEADBAND_PAPP, OPT_DEADBAND_IINST, OPT_DEADBAND_REL, OPT_DEADBAND_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL_POWER, DEFAULT_MIN_INTERVAL_CURRENT, DEFAULT_MIN_INTERVAL_ENERGY, DEFAULT_STATUS_INTERVAL,
+    DEFAULT_DEADBAND_PAPP, DEFAULT_DEADBAND_IINST, DEFAULT_DEADBAND_REL, DEFAULT_DEADBAND_MAX_INTERVAL,
+    OPT_FIRE_EVENTS, OPT_WATCHDOG, DEFAULT_WATCHDOG, OPT_MULTI_METER, OPT_METRICS,
+    OPT_ANALYTICS, OPT_PRICES, OPT_HISTORY, OPT_STATISTICS, OPT_INTEGRITY_POLICY, OPT_PARSE_MODE, PARSE_INLINE, PARSE_MODES, OPT_JSON_NUMERIC, OPT_RAW_MODE, OPT_RAW_COMPRESS, OPT_RAW_EVERY, RAW_PER_LINE, RAW_MODES,
 )
 
 RELAX_CHOICES = [
@@ -25,6 +37,11 @@ SERIAL_SCHEMA = vol.Schema({
     vol.Required("stopbits", default=DEFAULT_STOPBITS): vol.In([1,2]),
     vol.Optional("timeout", default=DEFAULT_TIMEOUT): vol.Coerce(float),
     vol.Optional("decode", default=DEFAULT_DECODE): str,
+    # auto: detect historic/standard from the first frames and probe 1200/9600 baud
+    vol.Optional("tic_mode", default=DEFAULT_TIC_MODE): vol.In(TIC_MODES),
+    # replay: "port" is the path of a raw capture; simulate: synthetic historic frames
+    vol.Optional("source", default=SOURCE_SERIAL): vol.In(SOURCES),
+    vol.Optional("replay_realtime", default=True): bool,
     vol.Optional("relaxed_labels", default=DEFAULT_RELAXED): selector.SelectSelector(
         selector.SelectSelectorConfig(options=RELAX_CHOICES, multiple=True, mode="list")
     ),
@@ -36,12 +53,55 @@ OPTIONS_SCHEMA = vol.Schema({
     vol.Optional(OPT_HA_DISCOVERY_PREFIX, default="homeassistant"): str,
     vol.Optional(OPT_HA_DEVICE_NAME, default=""): str,
     vol.Required(OPT_INCLUDE_WH, default=False): bool,
+    vol.Required(OPT_FIRE_EVENTS, default=False): bool,
+    vol.Optional(OPT_WATCHDOG, default=DEFAULT_WATCHDOG): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    # Several meters on this port: topics, discovery and devices namespaced by ADCO
+    vol.Required(OPT_MULTI_METER, default=False): bool,
+    # Runtime counters and latency histograms, in diagnostics and as diagnostic sensors
+    vol.Required(OPT_METRICS, default=False): bool,
+    # Rolling PAPP means, daily peak, daily consumption per tariff period, estimated power
+    vol.Required(OPT_ANALYTICS, default=False): bool,
+    # EUR/kWh per tariff period for the daily costs, e.g. "hc=0.2068, hp=0.2700" (empty: no costs)
+    vol.Optional(OPT_PRICES, default=""): str,
+    # Local frame history: instant sensor restore at startup, backfill service for the broker
+    vol.Required(OPT_HISTORY, default=False): bool,
+    # Hourly index statistics imported into the recorder (Energy dashboard), backfilled from the history
+    vol.Required(OPT_STATISTICS, default=False): bool,
+    # Parse on a worker thread to keep the event loop free (slow hosts)
+    vol.Optional(OPT_PARSE_MODE, default=PARSE_INLINE): vol.In(PARSE_MODES),
+    # Rejected fields (checksum, index rollback, current range, ADCO change): flag, keep_last or drop the frame
+    vol.Optional(OPT_INTEGRITY_POLICY, default=POLICY_FLAG): vol.In(INTEGRITY_POLICIES),
 
     vol.Optional(OPT_MQTT_TOPIC_LINE, default="teleinfo/line"): str,
+    # Raw mirror on the line topic: per_line, or one message per frame (block / raw bytes)
+    vol.Optional(OPT_RAW_MODE, default=RAW_PER_LINE): vol.In(RAW_MODES),
+    vol.Required(OPT_RAW_COMPRESS, default=False): bool,
+    vol.Optional(OPT_RAW_EVERY, default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
     vol.Optional(OPT_MQTT_TOPIC_JSON, default="teleinfo/json"): str,
+    vol.Required(OPT_JSON_NUMERIC, default=False): bool,
     vol.Optional(OPT_MQTT_TOPIC_FIELDS, default="teleinfo/fields"): str,
     vol.Optional(OPT_MQTT_TOPIC_INVALID, default="teleinfo/invalid"): str,
     vol.Optional(OPT_MQTT_TOPIC_DERIVED, default="teleinfo/derived"): str,
+
+    vol.Optional(OPT_MQTT_QUEUE_SIZE, default=DEFAULT_MQTT_QUEUE_SIZE): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(OPT_MQTT_QUEUE_POLICY, default=POLICY_COALESCE): vol.In(QUEUE_POLICIES),
+
+    # Publish-on-change per topic group, with a forced republish every heartbeat (s)
+    vol.Optional(OPT_DEDUP_GROUPS, default=DEDUP_GROUPS): selector.SelectSelector(
+        selector.SelectSelectorConfig(options=DEDUP_GROUPS, multiple=True, mode="list")
+    ),
+    vol.Optional(OPT_DEDUP_HEARTBEAT, default=DEFAULT_DEDUP_HEARTBEAT): vol.All(vol.Coerce(int), vol.Range(min=0)),
+
+    # Entity state writes: min interval per sensor class (s), deadbands (VA, A, %)
+    vol.Optional(OPT_MIN_INTERVAL_POWER, default=DEFAULT_MIN_INTERVAL_POWER): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(OPT_MIN_INTERVAL_CURRENT, default=DEFAULT_MIN_INTERVAL_CURRENT): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(OPT_MIN_INTERVAL_ENERGY, default=DEFAULT_MIN_INTERVAL_ENERGY): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(OPT_STATUS_INTERVAL, default=DEFAULT_STATUS_INTERVAL): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(OPT_DEADBAND_PAPP, default=DEFAULT_DEADBAND_PAPP): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(OPT_DEADBAND_IINST, default=DEFAULT_DEADBAND_IINST): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(OPT_DEADBAND_REL, default=DEFAULT_DEADBAND_REL): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+    # Longest hold of a value within the deadband (s, 0: no limit)
+    vol.Optional(OPT_DEADBAND_MAX_INTERVAL, default=DEFAULT_DEADBAND_MAX_INTERVAL): vol.All(vol.Coerce(float), vol.Range(min=0)),
 })
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -49,7 +109,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_user(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         if user_input is not None:
-            return self.async_create_entry(title="Téléinfo Gateway", data=user_input)
+            # One entry per serial port; each port gets its own session
+            source = user_input.get("source", SOURCE_SERIAL)
+            uid = user_input["port"] if source == SOURCE_SERIAL else f"{source}:{user_input['port']}"
+            await self.async_set_unique_id(uid)
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(title=f"Téléinfo Gateway ({user_input['port']})", data=user_input)
         return self.async_show_form(step_id="user", data_schema=SERIAL_SCHEMA)
 
     @staticmethod
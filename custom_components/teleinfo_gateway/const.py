@@ -9,6 +9,12 @@ DEFAULT_STOPBITS = 1
 DEFAULT_TIMEOUT = 1.0
 DEFAULT_DECODE = "latin-1"
 DEFAULT_RELAXED = ["PTEC"]
+DEFAULT_TIC_MODE = "auto"
+# Seconds without a valid frame before the autoprobe tries the other baud rate
+PROBE_WINDOW = 5.0
+# Serial reconnect backoff bounds (s)
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 60.0
 
 # MQTT mirror & discovery
 OPT_MQTT_ENABLE = "mqtt_enable"
@@ -21,7 +27,100 @@ OPT_HA_DISCOVERY = "ha_discovery"
 OPT_HA_DISCOVERY_PREFIX = "ha_discovery_prefix"
 OPT_HA_DEVICE_NAME = "ha_device_name"
 OPT_INCLUDE_WH = "include_wh"
+OPT_MQTT_QUEUE_SIZE = "mqtt_queue_size"
+OPT_MQTT_QUEUE_POLICY = "mqtt_queue_policy"
+
+# Publisher backpressure (queue size counted in frame batches)
+DEFAULT_MQTT_QUEUE_SIZE = 32
+POLICY_COALESCE = "coalesce"
+POLICY_DROP_OLDEST = "drop_oldest"
+QUEUE_POLICIES = [POLICY_COALESCE, POLICY_DROP_OLDEST]
+
+# Publish-on-change: topic groups whose unchanged payloads are suppressed
+OPT_DEDUP_GROUPS = "dedup_groups"
+OPT_DEDUP_HEARTBEAT = "dedup_heartbeat"
+DEDUP_FIELDS = "fields"
+DEDUP_DERIVED = "derived"
+DEDUP_GROUPS = [DEDUP_FIELDS, DEDUP_DERIVED]
+DEFAULT_DEDUP_HEARTBEAT = 300
+
+# Entity state write throttling, per sensor class (intervals in s)
+OPT_MIN_INTERVAL_POWER = "min_interval_power"
+OPT_MIN_INTERVAL_CURRENT = "min_interval_current"
+OPT_MIN_INTERVAL_ENERGY = "min_interval_energy"
+OPT_STATUS_INTERVAL = "status_interval"
+OPT_DEADBAND_PAPP = "deadband_papp"
+OPT_DEADBAND_IINST = "deadband_iinst"
+OPT_DEADBAND_REL = "deadband_rel"
+OPT_DEADBAND_MAX_INTERVAL = "deadband_max_interval"
+DEFAULT_MIN_INTERVAL_POWER = 10
+DEFAULT_MIN_INTERVAL_CURRENT = 10
+DEFAULT_MIN_INTERVAL_ENERGY = 60
+DEFAULT_STATUS_INTERVAL = 60
+DEFAULT_DEADBAND_PAPP = 0
+DEFAULT_DEADBAND_IINST = 0
+DEFAULT_DEADBAND_REL = 0
+DEFAULT_DEADBAND_MAX_INTERVAL = 300
+
+# Several meters on one port: per-ADCO topic namespaces, discovery and devices
+OPT_MULTI_METER = "multi_meter"
+
+# Opt-in: also fire EVT_FRAME on the HA bus for automations
+OPT_FIRE_EVENTS = "fire_events"
+
+# Seconds without a valid frame before availability goes offline and the port is reopened (0 = off)
+OPT_WATCHDOG = "watchdog"
+DEFAULT_WATCHDOG = 30
+
+# Opt-in runtime metrics (diagnostics + diagnostic sensors)
+OPT_METRICS = "metrics"
+
+# Opt-in derived analytics (rolling PAPP means, daily peak, per-period consumption, power estimate)
+OPT_ANALYTICS = "analytics"
+# Price grid for the daily costs (analytics): "hc=0.2068, hp=0.2700" in EUR/kWh per period
+OPT_PRICES = "prices"
+
+# Raw mirror on the line topic: one message per line (default), or one per frame as a
+# newline-joined block or the raw frame bytes, optionally zlib-compressed, every Nth frame
+OPT_RAW_MODE = "raw_mode"
+OPT_RAW_COMPRESS = "raw_compress"
+OPT_RAW_EVERY = "raw_every"
+RAW_PER_LINE = "per_line"
+RAW_BLOCK = "block"
+RAW_FRAME = "raw"
+RAW_MODES = [RAW_PER_LINE, RAW_BLOCK, RAW_FRAME]
+
+# Whole-frame JSON: emit integer labels (PAPP, indexes...) as numbers
+OPT_JSON_NUMERIC = "json_numeric"
+
+# Where framing/parsing/JSON encoding run: inline in data_received, or on a worker thread per link
+OPT_PARSE_MODE = "parse_mode"
+PARSE_INLINE = "inline"
+PARSE_THREAD = "thread"
+PARSE_MODES = [PARSE_INLINE, PARSE_THREAD]
+
+# What frames carry for fields failing their checksum or a plausibility rule (see integrity.py)
+OPT_INTEGRITY_POLICY = "integrity_policy"
+
+# Opt-in local frame history (ring files under .storage), restore at setup and backfill service
+OPT_HISTORY = "history"
+SERVICE_BACKFILL = "backfill"
+
+# Opt-in hourly energy statistics imported into the recorder (see statistics.py)
+OPT_STATISTICS = "statistics"
+
+# Last-frame snapshot on demand: service response, and MQTT request <topic_json>/get
+# answered on <topic_json>/snapshot (or <topic_json>/snapshot/<id>)
+SERVICE_SNAPSHOT = "snapshot"
+
+# MQTT discovery: max concurrent config publishes, and the HA storage key of
+# the retained-config hash cache (also its hass.data key)
+DISCOVERY_CONCURRENCY = 8
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
+STORAGE_VERSION = 1
 
 # Derived keys
+# hass.data key of the MQTT publisher shared by all entries
+DATA_PUBLISHER = f"{DOMAIN}_publisher"
 EVT_RAW = f"{DOMAIN}_raw"
 EVT_FRAME = f"{DOMAIN}_frame"
@@ -5,8 +5,10 @@ from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
 
 from .const import DOMAIN
+from .frame_json import JSON_BACKEND
 
 async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    session = hass.data.get(DOMAIN, {}).get(entry.entry_id)
     return {
         "port": entry.data.get("port"),
         "baud": entry.data.get("baud"),
@@ -20,4 +22,10 @@ async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigE
             "derived": entry.options.get("mqtt_topic_derived"),
         },
         "ha_discovery": entry.options.get("ha_discovery", True),
+        "multi_meter": entry.options.get("multi_meter", False),
+        "json_backend": JSON_BACKEND,
+        "publisher": session.publisher.stats() if session else None,
+        "link": session.link_stats() if session else None,
+        "metrics": session.metrics.snapshot() if session and session.metrics else None,
+        "snapshot": session.snapshot() if session else None,
     }
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .labels import DISCOVERY_LABELS
+
+# -----------------------------
+# Compact frame representation
+# -----------------------------
+# A meter sends the same labels in the same order frame after frame, so the
+# label tuple is learned once into a shared FrameLayout (slot index, label
+# set, discovery labels) and each frame only holds a value list aligned with
+# it. Accepted values of low-cardinality labels are interned. Frame is a
+# read-only Mapping over "label -> value" (plus "_meta" when present); a
+# plain dict is only built by as_dict(), for consumers that need one (JSON
+# encoder, HA bus events), and never kept on the frame.
+
+# Few distinct values per meter: one shared str instead of one per frame
+_INTERNED = frozenset((
+    "ADCO", "OPTARIF", "ISOUSC", "PTEC", "IMAX", "HHPHC", "MOTDETAT", "DEMAIN", "PEJP",
+    "ADSC", "VTIC", "NGTF", "LTARF", "NTARF", "STGE", "PREF", "PCOUP", "MSG1", "MSG2", "PRM", "RELAIS",
+))
+# Bound on the layout cache (noisy links can produce many distinct label tuples)
+_MAX_LAYOUTS = 256
+
+def intern_value(label: str, value: str) -> str:
+    return sys.intern(value) if label in _INTERNED else value
+
+class FrameLayout:
+    __slots__ = ("labels", "index", "present", "discovery")
+
+    def __init__(self, labels: Tuple[str, ...]):
+        self.labels = labels
+        self.index: Dict[str, int] = {label: i for i, label in enumerate(labels)}
+        self.present = frozenset(labels)
+        self.discovery = self.present.intersection(DISCOVERY_LABELS)
+
+_layouts: Dict[Tuple[str, ...], FrameLayout] = {}
+
+def frame_layout(labels: Tuple[str, ...]) -> FrameLayout:
+    layout = _layouts.get(labels)
+    if layout is None:
+        if len(_layouts) >= _MAX_LAYOUTS:
+            _layouts.clear()
+        layout = _layouts[labels] = FrameLayout(labels)
+    return layout
+
+class Frame(Mapping):
+    # values[i] belongs to layout.labels[i]; None means left out (keep_last without a good value)
+    __slots__ = ("layout", "values", "meta")
+
+    def __init__(self, layout: FrameLayout, values: List[str | None], meta: Dict[str, Any] | None = None):
+        self.layout = layout
+        self.values = values
+        self.meta = meta
+
+    def __getitem__(self, key: str):
+        if key == "_meta":
+            if self.meta is None:
+                raise KeyError(key)
+            return self.meta
+        v = self.values[self.layout.index[key]]
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def get(self, key: str, default=None):
+        if key == "_meta":
+            return default if self.meta is None else self.meta
+        i = self.layout.index.get(key)
+        if i is None:
+            return default
+        v = self.values[i]
+        return default if v is None else v
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for label, v in zip(self.layout.labels, self.values):
+            if v is not None:
+                yield label
+        if self.meta is not None:
+            yield "_meta"
+
+    def __len__(self) -> int:
+        return len(self.values) - self.values.count(None) + (self.meta is not None)
+
+    def fields(self) -> Iterator[Tuple[str, str]]:
+        # (label, value) pairs without "_meta"
+        for label, v in zip(self.layout.labels, self.values):
+            if v is not None:
+                yield label, v
+
+    def set(self, label: str, value: str | None):
+        # Parse stage only, before the frame is handed out
+        self.values[self.layout.index[label]] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        values = self.values
+        d = dict(self.fields()) if None in values else dict(zip(self.layout.labels, values))
+        if self.meta is not None:
+            d["_meta"] = self.meta
+        return d
+
+    def __repr__(self) -> str:
+        return f"Frame({self.as_dict()!r})"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+from json import JSONEncoder
+from json.encoder import encode_basestring
+from typing import Any, Dict
+
+from .labels import LABELS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# -----------------------------
+# Frame JSON encoding (topic_json / topic_invalid)
+# -----------------------------
+# Frames are flat {label: str} dicts plus an optional "_meta" dict, which is
+# left out of the frame when there is nothing to report; "_meta" always comes
+# first in the output. The stdlib path reuses one C encoder and splices the
+# precomputed clean "_meta" fragment in front of the labels, byte-identical to
+# json.dumps(frame, ensure_ascii=False). orjson (when installed, as in HA core)
+# gives the same document in compact form, as bytes.
+
+JSON_BACKEND = "orjson" if orjson is not None else "stdlib"
+
+# json.dumps(..., ensure_ascii=False) builds a new encoder on every call
+_encode = JSONEncoder(ensure_ascii=False).encode
+_INT_LABELS = frozenset(label for label, d in LABELS.items() if d.kind == "int")
+_CLEAN_META = {"invalid_lines": 0}
+_CLEAN_META_FRAG = '{"_meta": ' + _encode(_CLEAN_META)
+
+def _number(k: str, v: str) -> Any:
+    # Raw integer for int labels (indexes stay in Wh), the string otherwise
+    if k in _INT_LABELS:
+        try:
+            return int(v)
+        except ValueError:
+            pass
+    return v
+
+def _numeric(frame: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v if k == "_meta" else _number(k, v) for k, v in frame.items()}
+
+def _frame_stdlib(frame: Dict[str, Any], numeric: bool = False) -> str:
+    if numeric:
+        frame = _numeric(frame)
+    meta = frame.get("_meta")
+    if meta is not None:
+        return _encode({"_meta": meta, **frame})
+    if not frame:
+        return _CLEAN_META_FRAG + "}"
+    return _CLEAN_META_FRAG + ", " + _encode(frame)[1:]
+
+def _frame_orjson(frame: Dict[str, Any], numeric: bool = False) -> bytes:
+    if numeric:
+        frame = _numeric(frame)
+    return orjson.dumps({"_meta": frame.get("_meta") or _CLEAN_META, **frame})
+
+encode_frame = _frame_orjson if orjson is not None else _frame_stdlib
+
+def encode_invalid(label: str, raw: str, hexdump: str) -> str:
+    # hexdump is "HH HH ..." and never needs escaping
+    return '{"label": ' + encode_basestring(label) + ', "raw": ' + encode_basestring(raw) + ', "hex": "' + hexdump + '"}'
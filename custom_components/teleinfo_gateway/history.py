@@ -0,0 +1,224 @@
+from __future__ import annotations
+import asyncio, json, logging, os, struct
+from typing import Any, Dict, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Local frame history (opt-in)
+# -----------------------------
+# Two fixed-capacity ring files of fixed-width little-endian records, plus a
+# JSON sidecar interning the series keys ("PAPP", or "<ADCO>/PAPP" with
+# multi_meter) and a few meta values:
+#   raw.ring     one record per integer field per frame: ts u32, key u16, value u32
+#   minute.ring  per-minute aggregates: ts u32, key u16, min, max, mean, last u32
+# Records are buffered on the event loop; all file I/O runs in the executor.
+
+RAW_CAPACITY = 500_000      # ~5 MB, about a day of historic frames
+MINUTE_CAPACITY = 400_000   # ~9 MB, about a month for a dozen series
+FLUSH_INTERVAL = 10.0
+
+_MAGIC = b"TIC1"
+# magic, record size, capacity, head (next slot), count
+_HEADER = struct.Struct("<4sHIII")
+_RAW = struct.Struct("<IHI")
+_MINUTE = struct.Struct("<IHIIII")
+_U32_MAX = 0xFFFFFFFF
+
+class RingFile:
+    def __init__(self, path: str, record: struct.Struct, capacity: int):
+        self.path = path
+        self.record = record
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+        self._f = None
+
+    def open(self):
+        try:
+            f = open(self.path, "r+b")
+            magic, size, capacity, head, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic == _MAGIC and size == self.record.size and capacity == self.capacity and count <= capacity:
+                self._f, self.head, self.count = f, head, count
+                return
+            f.close()
+            _LOGGER.warning("Téléinfo history %s has another layout, starting a new one", self.path)
+        except (OSError, struct.error):
+            pass
+        self._f = open(self.path, "w+b")
+        self._f.truncate(_HEADER.size + self.capacity * self.record.size)
+        self.head = self.count = 0
+        self._write_header()
+
+    def _write_header(self):
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(_MAGIC, self.record.size, self.capacity, self.head, self.count))
+
+    def append(self, records: List[tuple]):
+        records = records[-self.capacity:]
+        if not records:
+            return
+        pack = self.record.pack
+        data = [pack(*r) for r in records]
+        first = data[:self.capacity - self.head]
+        self._f.seek(_HEADER.size + self.head * self.record.size)
+        self._f.write(b"".join(first))
+        if len(data) > len(first):
+            self._f.seek(_HEADER.size)
+            self._f.write(b"".join(data[len(first):]))
+        self.head = (self.head + len(data)) % self.capacity
+        self.count = min(self.capacity, self.count + len(data))
+        self._write_header()
+        self._f.flush()
+
+    def read(self, last: Optional[int] = None) -> List[tuple]:
+        # Oldest first; only the `last` newest records when given
+        n = self.count if last is None else min(last, self.count)
+        start = (self.head - n) % self.capacity
+        size = self.record.size
+        chunks = []
+        if start + n > self.capacity:
+            self._f.seek(_HEADER.size + start * size)
+            chunks.append(self._f.read((self.capacity - start) * size))
+            self._f.seek(_HEADER.size)
+            chunks.append(self._f.read(self.head * size))
+        else:
+            self._f.seek(_HEADER.size + start * size)
+            chunks.append(self._f.read(n * size))
+        return list(self.record.iter_unpack(b"".join(chunks)))
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+class HistoryStore:
+    def __init__(self, directory: str, *, raw_capacity: int = RAW_CAPACITY, minute_capacity: int = MINUTE_CAPACITY):
+        self.directory = directory
+        self._raw = RingFile(os.path.join(directory, "raw.ring"), _RAW, raw_capacity)
+        self._minute = RingFile(os.path.join(directory, "minute.ring"), _MINUTE, minute_capacity)
+        self._sidecar = os.path.join(directory, "keys.json")
+        self._keys: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.meta: Dict[str, Any] = {}
+        self._dirty = False
+        # Latest value per series key: (ts, value)
+        self.last: Dict[str, Tuple[int, int]] = {}
+        self._pending_raw: List[tuple] = []
+        self._pending_minute: List[tuple] = []
+        # Current minute aggregates per key id: [min, max, sum, count, last]
+        self._minute_ts: Optional[int] = None
+        self._agg: Dict[int, list] = {}
+        # Serialises executor jobs on the ring files
+        self._lock = asyncio.Lock()
+
+    # ------------- executor side -------------
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(self._sidecar, encoding="utf-8") as f:
+                data = json.load(f)
+            self._keys = list(data.get("keys", []))
+            self.meta = dict(data.get("meta", {}))
+        except (OSError, ValueError):
+            pass
+        self._ids = {k: i for i, k in enumerate(self._keys)}
+        self._raw.open()
+        self._minute.open()
+        # Latest value per key from the tail of the raw ring
+        for ts, i, v in self._raw.read(last=4096):
+            if i < len(self._keys):
+                self.last[self._keys[i]] = (ts, v)
+
+    def _write(self, raw: List[tuple], minute: List[tuple], sidecar: Optional[dict]):
+        if sidecar is not None:
+            tmp = self._sidecar + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(sidecar, f)
+            os.replace(tmp, self._sidecar)
+        self._raw.append(raw)
+        self._minute.append(minute)
+
+    def _query(self, start: int, end: int, minute: bool) -> List[Dict[str, Any]]:
+        # Rows grouped by timestamp: {"ts": ts, key: value} or {"ts": ts, key: {min,max,mean,last}}
+        rows: Dict[int, Dict[str, Any]] = {}
+        keys = self._keys
+        for rec in (self._minute if minute else self._raw).read():
+            ts, i = rec[0], rec[1]
+            if start <= ts <= end and i < len(keys):
+                row = rows.get(ts)
+                if row is None:
+                    row = rows[ts] = {"ts": ts}
+                row[keys[i]] = dict(zip(("min", "max", "mean", "last"), rec[2:])) if minute else rec[2]
+        return [rows[ts] for ts in sorted(rows)]
+
+    def _close(self):
+        self._raw.close()
+        self._minute.close()
+
+    # ------------- event loop side -------------
+    async def async_load(self):
+        await asyncio.get_running_loop().run_in_executor(None, self._load)
+
+    def set_meta(self, key: str, value: Any):
+        if self.meta.get(key) != value:
+            self.meta[key] = value
+            self._dirty = True
+
+    def _id(self, key: str) -> int:
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+            self._dirty = True
+        return i
+
+    def add(self, ts: int, values: Dict[str, int]):
+        minute = ts - ts % 60
+        if self._minute_ts is not None and minute != self._minute_ts:
+            self._close_minute()
+        self._minute_ts = minute
+        for key, v in values.items():
+            if not 0 <= v <= _U32_MAX:
+                continue
+            i = self._id(key)
+            self._pending_raw.append((ts, i, v))
+            self.last[key] = (ts, v)
+            a = self._agg.get(i)
+            if a is None:
+                self._agg[i] = [v, v, v, 1, v]
+            else:
+                if v < a[0]:
+                    a[0] = v
+                if v > a[1]:
+                    a[1] = v
+                a[2] += v
+                a[3] += 1
+                a[4] = v
+
+    def _close_minute(self):
+        ts = self._minute_ts
+        for i, (lo, hi, total, n, last) in self._agg.items():
+            self._pending_minute.append((ts, i, lo, hi, round(total / n), last))
+        self._agg.clear()
+
+    async def async_flush(self, final: bool = False):
+        if final and self._agg:
+            self._close_minute()
+        raw, self._pending_raw = self._pending_raw, []
+        minute, self._pending_minute = self._pending_minute, []
+        sidecar = {"keys": list(self._keys), "meta": dict(self.meta)} if self._dirty else None
+        self._dirty = False
+        if raw or minute or sidecar is not None:
+            async with self._lock:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, raw, minute, sidecar)
+
+    async def async_query(self, start: int, end: int, minute: bool) -> List[Dict[str, Any]]:
+        await self.async_flush()
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self._query, start, end, minute)
+
+    async def async_close(self):
+        await self.async_flush(final=True)
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._close)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from typing import Dict, Tuple
+
+from .labels import LABELS
+from .frame import Frame
+
+# -----------------------------
+# Frame integrity (strict assembly + plausibility)
+# -----------------------------
+# Checked after parsing, per meter: fields failing their checksum or a
+# plausibility rule are "rejected" with a reason, and the policy decides what
+# the frame carries for them. An index that keeps failing with consistent
+# values (each reading at or slightly above the previous failing one) for
+# REBASE_AFTER frames is taken as the new reference (meter swapped, or an
+# earlier accepted value was the corrupt one); unrelated bad readings never are.
+
+POLICY_FLAG = "flag"            # publish as received, reasons in _meta.rejected
+POLICY_KEEP_LAST = "keep_last"  # rejected fields carry their last good value (or are left out)
+POLICY_DROP = "drop"            # frames with any rejected field are not published
+INTEGRITY_POLICIES = [POLICY_FLAG, POLICY_KEEP_LAST, POLICY_DROP]
+
+REJECT_ETX_WITHOUT_STX = "etx_without_stx"
+REJECT_TRUNCATED = "truncated_frame"
+REJECT_CHECKSUM = "checksum"
+REJECT_INDEX_ROLLBACK = "index_rollback"
+REJECT_CURRENT_RANGE = "current_range"
+REJECT_ADCO_MISMATCH = "adco_mismatch"
+# multi_meter: frame without a valid ADCO/ADSC, dropped whatever the policy
+REJECT_UNKNOWN_METER = "unknown_meter"
+REJECT_DROPPED = "dropped_frame"
+REJECT_REASONS = (
+    REJECT_ETX_WITHOUT_STX, REJECT_TRUNCATED, REJECT_CHECKSUM, REJECT_INDEX_ROLLBACK,
+    REJECT_CURRENT_RANGE, REJECT_ADCO_MISMATCH, REJECT_UNKNOWN_METER, REJECT_DROPPED,
+)
+
+REBASE_AFTER = 3
+# Largest step (Wh) between two failing readings that still counts as the same new index
+REBASE_MAX_STEP = 10000
+# IINST may exceed ISOUSC for a while (ADPS) before the breaker trips
+CURRENT_MARGIN = 2
+
+_INDEX_LABELS = frozenset(label for label, d in LABELS.items() if d.wh_variant)
+_CURRENT_LABELS = ("IINST", "IINST1", "IINST2", "IINST3")
+
+def new_counters() -> Dict[str, int]:
+    # Fixed keys: the parse worker only ever updates values, so readers can iterate safely
+    return dict.fromkeys(REJECT_REASONS, 0)
+
+class MeterIntegrity:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.last_good: Dict[str, str] = {}
+        # label -> (consecutive consistent failures, last failing value), for rebasing
+        self._streak: Dict[str, Tuple[int, int]] = {}
+
+    def _rebase(self, label: str, v: int) -> bool:
+        streak = self._streak.get(label)
+        n = streak[0] + 1 if streak is not None and 0 <= v - streak[1] <= REBASE_MAX_STEP else 1
+        if n >= REBASE_AFTER:
+            self._streak.pop(label, None)
+            return True
+        self._streak[label] = (n, v)
+        return False
+
+    def check(self, values: Dict[str, str]) -> Dict[str, str]:
+        # values: checksum-valid fields of one frame; returns {label: reason}
+        rejected = {}
+        for label, raw in values.items():
+            if label in _INDEX_LABELS:
+                try:
+                    v = int(raw)
+                except ValueError:
+                    continue
+                last = self.index.get(label)
+                if last is not None and v < last and not self._rebase(label, v):
+                    rejected[label] = REJECT_INDEX_ROLLBACK
+                    continue
+                self._streak.pop(label, None)
+                self.index[label] = v
+        isousc = values.get("ISOUSC") or self.last_good.get("ISOUSC")
+        if isousc and isousc.isdigit():
+            limit = int(isousc) * CURRENT_MARGIN
+            for label in _CURRENT_LABELS:
+                raw = values.get(label)
+                if raw is not None and raw.isdigit() and int(raw) > limit:
+                    rejected[label] = REJECT_CURRENT_RANGE
+        return rejected
+
+    def accept(self, values: Dict[str, str]):
+        self.last_good.update(values)
+
+class AdcoGuard:
+    # Single-meter links: a different ADCO/ADSC is rejected until it persists
+    def __init__(self):
+        self.adco: str | None = None
+        self._candidate: str | None = None
+        self._count = 0
+
+    def check(self, adco: str) -> bool:
+        if self.adco is None or adco == self.adco:
+            self.adco = adco
+            self._candidate = None
+            return True
+        if adco != self._candidate:
+            self._candidate, self._count = adco, 0
+        self._count += 1
+        if self._count >= REBASE_AFTER:
+            self.adco = adco
+            self._candidate = None
+            return True
+        return False
+
+def apply_keep_last(frame: Frame, state: MeterIntegrity, rejected: Dict[str, str]):
+    # Rejected fields take their last good value, or are left out (None)
+    for label in rejected:
+        frame.set(label, state.last_good.get(label))
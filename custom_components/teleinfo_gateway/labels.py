@@ -0,0 +1,181 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
+
+# -----------------------------
+# TIC label registry (historic + standard mode)
+# -----------------------------
+# One immutable descriptor per label drives both native entities (sensor.py)
+# and MQTT discovery (TeleinfoSession.publish_discovery). Converters are
+# resolved once here, at import.
+
+# Write-throttle classes (see sensor.WriteThrottle)
+CLASS_POWER = "power"
+CLASS_CURRENT = "current"
+CLASS_ENERGY = "energy"
+CLASS_VOLTAGE = "voltage"
+
+@dataclass(frozen=True, slots=True)
+class TicLabel:
+    label: str
+    name: str
+    unit: str | None = None
+    device_class: str | None = None
+    state_class: str | None = None
+    # Raw value type ("int" or "str") and divisor applied on top (Wh -> kWh = 1000)
+    kind: str = "str"
+    scale: int = 1
+    icon: str | None = None
+    write_class: str | None = None
+    # Native entity / MQTT discovery for this label
+    entity: bool = False
+    discovery: bool = False
+    # Entity key (unique_id suffix) and discovery display name
+    key: str = ""
+    disc_name: str = ""
+    # Energy index: discovery also offers a raw Wh sensor when include_wh is set
+    wh_variant: bool = False
+    convert: Callable[[str], Any] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "convert", _converter(self.kind, self.scale))
+        if not self.key:
+            object.__setattr__(self, "key", self.label)
+        if not self.disc_name:
+            object.__setattr__(self, "disc_name", self.label)
+
+    @property
+    def value_template(self) -> str | None:
+        if self.scale == 1:
+            return None
+        return f"{{{{ (value | float(0)) / {self.scale} }}}}"
+
+def _converter(kind: str, scale: int) -> Callable[[str], Any]:
+    if kind == "str":
+        return str
+    if scale == 1:
+        return int
+    def _conv(v: str, _d=scale):
+        return int(v) / _d
+    return _conv
+
+def _text(label: str, name: str, **kw) -> TicLabel:
+    return TicLabel(label, name, **kw)
+
+def _index(label: str, name: str | None = None) -> TicLabel:
+    return TicLabel(
+        label, name or f"Index {label} (kWh)", "kWh", "energy", "total_increasing",
+        kind="int", scale=1000, icon="mdi:counter", write_class=CLASS_ENERGY,
+        entity=True, discovery=True, key=f"{label.lower()}_kwh", disc_name=f"INDEX {label}", wh_variant=True,
+    )
+
+def _current(label: str, name: str) -> TicLabel:
+    return TicLabel(
+        label, name, "A", "current", "measurement", kind="int", icon="mdi:current-ac",
+        write_class=CLASS_CURRENT, entity=True, discovery=True,
+    )
+
+def _power(label: str, name: str, unit: str = "VA", device_class: str | None = None) -> TicLabel:
+    return TicLabel(
+        label, name, unit, device_class, "measurement", kind="int", icon="mdi:flash",
+        write_class=CLASS_POWER, entity=True, discovery=True,
+    )
+
+def _voltage(label: str, name: str) -> TicLabel:
+    return TicLabel(
+        label, name, "V", "voltage", "measurement", kind="int", icon="mdi:sine-wave",
+        write_class=CLASS_VOLTAGE, entity=True, discovery=True,
+    )
+
+def _reactive(label: str, name: str) -> TicLabel:
+    return TicLabel(
+        label, name, "VArh", None, "total_increasing", kind="int", icon="mdi:counter",
+        write_class=CLASS_ENERGY, entity=True, discovery=True,
+    )
+
+_HISTORIC = [
+    _text("ADCO", "Adresse compteur"),
+    _text("OPTARIF", "Option tarifaire"),
+    _current("ISOUSC", "Intensité souscrite"),
+    _index("BASE"),
+    _index("HCHC"),
+    _index("HCHP"),
+    _index("EJPHN"),
+    _index("EJPHPM"),
+    _index("BBRHCJB"),
+    _index("BBRHPJB"),
+    _index("BBRHCJW"),
+    _index("BBRHPJW"),
+    _index("BBRHCJR"),
+    _index("BBRHPJR"),
+    _text("PEJP", "Préavis EJP"),
+    _text("PTEC", "Période tarifaire en cours", icon="mdi:clock-outline", discovery=True),
+    _text("DEMAIN", "Couleur du lendemain"),
+    _current("IINST", "Courant instantané"),
+    _current("IINST1", "Courant instantané phase 1"),
+    _current("IINST2", "Courant instantané phase 2"),
+    _current("IINST3", "Courant instantané phase 3"),
+    _current("IMAX", "Courant max"),
+    _current("IMAX1", "Courant max phase 1"),
+    _current("IMAX2", "Courant max phase 2"),
+    _current("IMAX3", "Courant max phase 3"),
+    _current("ADPS", "Avertissement dépassement"),
+    _current("ADIR1", "Avertissement dépassement phase 1"),
+    _current("ADIR2", "Avertissement dépassement phase 2"),
+    _current("ADIR3", "Avertissement dépassement phase 3"),
+    _power("PMAX", "Puissance max triphasée", "W", "power"),
+    _power("PAPP", "Puissance apparente"),
+    _text("HHPHC", "Horaire heures creuses"),
+    _text("MOTDETAT", "Mot d'état"),
+    _text("PPOT", "Présence des potentiels"),
+]
+
+_STANDARD = [
+    _text("ADSC", "Adresse secondaire compteur"),
+    _text("VTIC", "Version TIC"),
+    _text("DATE", "Date et heure courante"),
+    _text("NGTF", "Nom du calendrier tarifaire"),
+    _text("LTARF", "Libellé tarif en cours"),
+    _index("EAST", "Énergie soutirée totale (kWh)"),
+    *[_index(f"EASF{i:02d}", f"Énergie soutirée fournisseur index {i:02d} (kWh)") for i in range(1, 11)],
+    *[_index(f"EASD{i:02d}", f"Énergie soutirée distributeur index {i:02d} (kWh)") for i in range(1, 5)],
+    _index("EAIT", "Énergie injectée totale (kWh)"),
+    *[_reactive(f"ERQ{i}", f"Énergie réactive Q{i}") for i in range(1, 5)],
+    *[_current(f"IRMS{i}", f"Courant efficace phase {i}") for i in range(1, 4)],
+    *[_voltage(f"URMS{i}", f"Tension efficace phase {i}") for i in range(1, 4)],
+    _power("PREF", "Puissance apparente de référence", "kVA"),
+    _power("PCOUP", "Puissance apparente de coupure", "kVA"),
+    _power("SINSTS", "Puissance apparente soutirée"),
+    *[_power(f"SINSTS{i}", f"Puissance apparente soutirée phase {i}") for i in range(1, 4)],
+    _power("SMAXSN", "Puissance apparente max soutirée du jour"),
+    *[_power(f"SMAXSN{i}", f"Puissance apparente max soutirée du jour phase {i}") for i in range(1, 4)],
+    _power("SMAXSN-1", "Puissance apparente max soutirée de la veille"),
+    *[_power(f"SMAXSN{i}-1", f"Puissance apparente max soutirée de la veille phase {i}") for i in range(1, 4)],
+    _power("SINSTI", "Puissance apparente injectée"),
+    _power("SMAXIN", "Puissance apparente max injectée du jour"),
+    _power("SMAXIN-1", "Puissance apparente max injectée de la veille"),
+    _power("CCASN", "Point de courbe de charge soutirée", "W", "power"),
+    _power("CCASN-1", "Point précédent de courbe de charge soutirée", "W", "power"),
+    _power("CCAIN", "Point de courbe de charge injectée", "W", "power"),
+    _power("CCAIN-1", "Point précédent de courbe de charge injectée", "W", "power"),
+    *[_voltage(f"UMOY{i}", f"Tension moyenne phase {i}") for i in range(1, 4)],
+    _text("STGE", "Registre de statuts"),
+    *[_text(f"DPM{i}", f"Début pointe mobile {i}") for i in range(1, 4)],
+    *[_text(f"FPM{i}", f"Fin pointe mobile {i}") for i in range(1, 4)],
+    _text("MSG1", "Message court"),
+    _text("MSG2", "Message ultra court"),
+    _text("PRM", "PRM"),
+    _text("RELAIS", "Relais"),
+    _text("NTARF", "Numéro de l'index tarifaire en cours"),
+    _text("NJOURF", "Numéro du jour en cours calendrier fournisseur"),
+    _text("NJOURF+1", "Numéro du prochain jour calendrier fournisseur"),
+    _text("PJOURF+1", "Profil du prochain jour calendrier fournisseur"),
+    _text("PPOINTE", "Profil du prochain jour de pointe"),
+]
+
+LABELS: Mapping[str, TicLabel] = MappingProxyType({d.label: d for d in (*_HISTORIC, *_STANDARD)})
+ENTITY_LABELS: Mapping[str, TicLabel] = MappingProxyType({k: d for k, d in LABELS.items() if d.entity})
+DISCOVERY_LABELS: Mapping[str, TicLabel] = MappingProxyType({k: d for k, d in LABELS.items() if d.discovery})
+# Entity key (unique_id suffix) -> descriptor, to recognise registered entities
+ENTITY_KEYS: Mapping[str, TicLabel] = MappingProxyType({d.key: d for d in ENTITY_LABELS.values()})
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict
+
+# -----------------------------
+# Runtime metrics (opt-in)
+# -----------------------------
+# Sessions keep `metrics = None` unless the option is set, so the hot path
+# only pays an `is not None` test when disabled. All times are perf_counter.
+
+class LatencyHistogram:
+    # Fixed log2 buckets from 50 us to ~3.3 s, plus an overflow bucket
+    __slots__ = ("counts", "count", "total", "max")
+    BOUNDS = tuple(50e-6 * 2 ** i for i in range(17))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float | None:
+        # Upper bound of the bucket holding the q-quantile
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        def ms(v):
+            return None if v is None else round(v * 1000, 3)
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.5)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "max_ms": ms(self.max) if self.count else None,
+        }
+
+class SessionMetrics:
+    def __init__(self):
+        self.bytes_in = 0
+        self.lines = 0
+        self.frames = 0
+        self.entity_writes = 0
+        self.checksum_failures: Dict[str, int] = {}
+        self.parse_time = LatencyHistogram()
+        self.publish_latency = LatencyHistogram()
+        # Frames per second over the last minute, as a ring of (second, count)
+        self._sec = [0] * 60
+        self._sec_count = [0] * 60
+
+    def frame(self, lines: int, parse_s: float):
+        self.frames += 1
+        self.lines += lines
+        self.parse_time.observe(parse_s)
+        s = int(time.monotonic())
+        i = s % 60
+        if self._sec[i] != s:
+            self._sec[i] = s
+            self._sec_count[i] = 0
+        self._sec_count[i] += 1
+
+    def checksum_failed(self, label: str):
+        self.checksum_failures[label] = self.checksum_failures.get(label, 0) + 1
+
+    def publish_ack(self, t_etx: float) -> Callable[[], None]:
+        # Called by the publisher once the frame's batch has been handed to MQTT
+        def _ack():
+            self.publish_latency.observe(time.perf_counter() - t_etx)
+        return _ack
+
+    @property
+    def frames_per_minute(self) -> int:
+        now = int(time.monotonic())
+        return sum(n for s, n in zip(self._sec, self._sec_count) if now - s < 60)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "bytes_in": self.bytes_in,
+            "lines": self.lines,
+            "frames": self.frames,
+            "frames_per_minute": self.frames_per_minute,
+            "checksum_failures": dict(sorted(self.checksum_failures.items())),
+            "entity_writes": self.entity_writes,
+            "parse_time": self.parse_time.snapshot(),
+            "etx_to_mqtt": self.publish_latency.snapshot(),
+        }
@@ -0,0 +1,326 @@
+from __future__ import annotations
+import asyncio, contextlib, itertools, logging, struct
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Minimal asyncio MQTT 3.1.1 client (headless gateway, see cli.py)
+# -----------------------------
+# Publisher, plus exact-topic QoS 0 subscriptions (renewed on every
+# connection) for request topics. One persistent connection, reconnected
+# with backoff.
+# publish() writes the packet straight into the transport buffer (QoS 0 and 1
+# alike), so publishes are pipelined; QoS 1 only waits when max_inflight
+# PUBACKs are outstanding. While disconnected, messages go to a bounded
+# offline buffer (oldest dropped first), except retained ones (discovery
+# configs, availability), kept apart as the latest payload per topic and
+# never evicted; on reconnect the retained ones are sent first, then
+# unacknowledged QoS 1 messages and the buffer, in order. Topics that are
+# not valid publish topics (wildcards, NUL) are dropped: the broker would
+# close the connection on them.
+
+_CONNECT, _CONNACK, _PUBLISH, _PUBACK, _SUBSCRIBE = 0x10, 0x20, 0x30, 0x40, 0x82
+_PINGREQ = b"\xc0\x00"
+_SUBACK, _PINGRESP = 0x90, 0xD0
+_DISCONNECT = b"\xe0\x00"
+
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 60.0
+
+def valid_topic(topic: str) -> bool:
+    return bool(topic) and "+" not in topic and "#" not in topic and "\x00" not in topic \
+        and len(topic.encode("utf-8")) <= 0xFFFF
+
+def _str(s: str | bytes) -> bytes:
+    b = s.encode("utf-8") if isinstance(s, str) else s
+    return struct.pack("!H", len(b)) + b
+
+def _packet(header: int, body: bytes) -> bytes:
+    n = len(body)
+    length = bytearray()
+    while True:
+        byte, n = n & 0x7F, n >> 7
+        length.append(byte | 0x80 if n else byte)
+        if not n:
+            break
+    return bytes((header,)) + bytes(length) + body
+
+def _connect_packet(client_id: str, keepalive: int, username: str | None, password: str | None,
+                    will: Tuple[str, str, bool] | None) -> bytes:
+    flags = 0x02  # clean session
+    payload = _str(client_id)
+    if will:
+        topic, message, retain = will
+        flags |= 0x04 | (0x20 if retain else 0)
+        payload += _str(topic) + _str(message)
+    if username is not None:
+        flags |= 0x80
+        payload += _str(username)
+        if password is not None:
+            flags |= 0x40
+            payload += _str(password)
+    return _packet(_CONNECT, _str("MQTT") + bytes((4, flags)) + struct.pack("!H", keepalive) + payload)
+
+def _publish_packet(topic: str, payload: str | bytes, retain: bool, qos: int, pid: int) -> bytes:
+    body = _str(topic)
+    if qos:
+        body += struct.pack("!H", pid)
+    body += payload.encode("utf-8") if isinstance(payload, str) else payload
+    return _packet(_PUBLISH | (qos << 1) | (1 if retain else 0), body)
+
+class MqttClient:
+    def __init__(self, host: str, port: int = 1883, *, client_id: str, username: str | None = None,
+                 password: str | None = None, keepalive: int = 60, qos: int = 0, max_inflight: int = 64,
+                 buffer_size: int = 10000, will: Tuple[str, str, bool] | None = None,
+                 on_connect: Callable[[], None] | None = None):
+        self.host = host
+        self.port = port
+        self.client_id = client_id
+        self.username = username
+        self.password = password
+        self.keepalive = keepalive
+        self.qos = qos
+        self.max_inflight = max(1, max_inflight)
+        self.will = will
+        self.on_connect = on_connect
+        self._writer: asyncio.StreamWriter | None = None
+        self._connected = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # The current attempt reached CONNACK (the link may already be marked down by publish())
+        self._established = False
+        self._last_rx = 0.0
+        # Offline buffer of (topic, payload, retain), and retained messages by topic (outside the buffer)
+        self._buffer: Deque[Tuple[str, str | bytes, bool]] = deque(maxlen=max(1, buffer_size))
+        self._retained: Dict[str, Tuple[str, str | bytes, bool]] = {}
+        # QoS 1: packet id -> (topic, payload, retain) awaiting PUBACK, in send order
+        self._inflight: Dict[int, Tuple[str, str | bytes, bool]] = {}
+        self._window = asyncio.Event()
+        self._window.set()
+        # Cleared while the offline buffer is resent after a reconnect: live
+        # publishes wait behind it (order, and back-pressure on the producer)
+        self._flushed = asyncio.Event()
+        self._flushed.set()
+        self._pids = itertools.cycle(range(1, 0x10000))
+        # topic -> callback(payload bytes), called on the loop for incoming messages
+        self._subscriptions: Dict[str, Callable[[bytes], None]] = {}
+        self.sent = 0
+        self.acked = 0
+        self.dropped = 0
+        self.invalid = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def async_stop(self):
+        if self._writer is not None and self.connected:
+            with contextlib.suppress(Exception):
+                self._writer.write(_DISCONNECT)
+                await self._writer.drain()
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._task
+            self._task = None
+
+    def subscribe(self, topic: str, cb: Callable[[bytes], None]):
+        # Exact topic (no wildcards); also sent on the current connection, if any
+        self._subscriptions[topic] = cb
+        if self.connected and not self._writer.is_closing():
+            self._writer.write(self._subscribe_packet((topic,)))
+
+    def _subscribe_packet(self, topics) -> bytes:
+        body = struct.pack("!H", next(self._pids)) + b"".join(_str(t) + b"\x00" for t in topics)
+        return _packet(_SUBSCRIBE, body)
+
+    # Sender for MqttPublisher
+    async def publish(self, topic: str, payload: str | bytes, retain: bool = False):
+        if not valid_topic(topic):
+            self.invalid += 1
+            _LOGGER.warning("Dropping MQTT publish to invalid topic %r", topic)
+            return
+        if not self._flushed.is_set():
+            await self._flushed.wait()
+        if self.qos and self.connected and len(self._inflight) >= self.max_inflight:
+            self._window.clear()
+            await self._window.wait()
+        if not self.connected or self._writer.is_closing():
+            self._buffer_add(topic, payload, retain)
+            return
+        self._write(topic, payload, retain)
+        try:
+            await self._writer.drain()
+        except (ConnectionError, OSError):
+            # _run sees the loss on its side; QoS 1 messages come back from _inflight
+            self._connected.clear()
+            if not self.qos:
+                self._buffer_add(topic, payload, retain)
+
+    def _buffer_add(self, topic: str, payload: str | bytes, retain: bool):
+        if retain:
+            # Latest payload per topic, in order of the last update
+            self._retained.pop(topic, None)
+            self._retained[topic] = (topic, payload, retain)
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((topic, payload, retain))
+
+    def _write(self, topic: str, payload: str | bytes, retain: bool):
+        pid = 0
+        if self.qos:
+            pid = next(self._pids)
+            self._inflight[pid] = (topic, payload, retain)
+        self._writer.write(_publish_packet(topic, payload, retain, self.qos, pid))
+        self.sent += 1
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "sent": self.sent,
+            "acked": self.acked,
+            "inflight": len(self._inflight),
+            "buffered": len(self._buffer) + len(self._retained),
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "reconnects": self.reconnects,
+        }
+
+    async def _run(self):
+        delay = RECONNECT_MIN
+        while True:
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._established:
+                    delay = RECONNECT_MIN
+                    _LOGGER.warning("MQTT connection to %s:%s lost: %s", self.host, self.port, e)
+                else:
+                    _LOGGER.warning("MQTT connection to %s:%s failed: %s (retry in %.0fs)", self.host, self.port, e, delay)
+            finally:
+                self._disconnected()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX)
+            self.reconnects += 1
+
+    def _disconnected(self):
+        self._connected.clear()
+        self._established = False
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        # Unacknowledged QoS 1 messages go back in front of the buffer
+        # (a full buffer drops them, being the oldest); retained ones unless superseded
+        for msg in reversed(list(self._inflight.values())):
+            if msg[2]:
+                self._retained.setdefault(msg[0], msg)
+            elif len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            else:
+                self._buffer.appendleft(msg)
+        self._inflight.clear()
+        self._window.set()
+        self._flushed.set()
+
+    async def _session(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._writer.write(_connect_packet(self.client_id, self.keepalive, self.username, self.password, self.will))
+        header, body = await asyncio.wait_for(self._read(reader), self.keepalive or 30)
+        if header >> 4 != _CONNACK >> 4 or len(body) < 2:
+            raise ConnectionError("unexpected reply to CONNECT")
+        if body[1]:
+            raise ConnectionError(f"connection refused (code {body[1]})")
+        _LOGGER.info("MQTT connected to %s:%s", self.host, self.port)
+        self._established = True
+        self._last_rx = asyncio.get_running_loop().time()
+        self._flushed.clear()
+        self._connected.set()
+        if self._subscriptions:
+            self._writer.write(self._subscribe_packet(self._subscriptions))
+        # Retained messages and the offline buffer first, then live publishes
+        while self._retained or self._buffer:
+            if self._retained:
+                msg = self._retained.pop(next(iter(self._retained)))
+            else:
+                msg = self._buffer.popleft()
+            self._write(*msg)
+            if self.qos and len(self._inflight) >= self.max_inflight:
+                await self._writer.drain()
+                await self._read_acks(reader, until_window=True)
+        await self._writer.drain()
+        self._flushed.set()
+        if self.on_connect:
+            self.on_connect()
+        ping = asyncio.get_running_loop().create_task(self._ping())
+        try:
+            await self._read_acks(reader)
+        finally:
+            ping.cancel()
+
+    async def _ping(self):
+        # Without traffic, the broker answers PINGREQ at least every keepalive / 2;
+        # closing the transport makes _read_acks fail and _run reconnect
+        loop = asyncio.get_running_loop()
+        while self.keepalive:
+            await asyncio.sleep(self.keepalive / 2)
+            if loop.time() - self._last_rx > self.keepalive * 1.5:
+                _LOGGER.warning("MQTT broker %s:%s not responding", self.host, self.port)
+                self._writer.close()
+                return
+            self._writer.write(_PINGREQ)
+
+    async def _read_acks(self, reader: asyncio.StreamReader, until_window: bool = False):
+        # No per-packet timeout (see _ping): acks already buffered are read without
+        # going back to the loop, even when the loop is busy parsing
+        loop = asyncio.get_running_loop()
+        while True:
+            header, body = await self._read(reader)
+            self._last_rx = loop.time()
+            kind = header & 0xF0
+            if kind == _PUBACK and len(body) >= 2:
+                if self._inflight.pop(struct.unpack("!H", body[:2])[0], None) is not None:
+                    self.acked += 1
+                if len(self._inflight) < self.max_inflight:
+                    self._window.set()
+                    if until_window:
+                        return
+            elif kind == _PUBLISH:
+                self._received(header, body)
+            elif kind not in (_PINGRESP, _SUBACK):
+                _LOGGER.debug("Ignoring MQTT packet type 0x%02X", header)
+
+    def _received(self, header: int, body: bytes):
+        n = struct.unpack("!H", body[:2])[0]
+        topic = body[2:2 + n].decode("utf-8", "replace")
+        payload = body[2 + n:]
+        if header & 0x06:
+            # QoS 1 (subscriptions are QoS 0, but a broker may still send one): packet id, then PUBACK
+            pid, payload = payload[:2], payload[2:]
+            self._writer.write(bytes((_PUBACK, 2)) + pid)
+        cb = self._subscriptions.get(topic)
+        if cb is not None:
+            try:
+                cb(payload)
+            except Exception:
+                _LOGGER.exception("Error in MQTT message callback for %s", topic)
+
+    @staticmethod
+    async def _read(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        header = (await reader.readexactly(1))[0]
+        n = shift = 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            n |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return header, await reader.readexactly(n) if n else b""
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import asyncio, logging, contextlib
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from .const import POLICY_COALESCE, POLICY_DROP_OLDEST
+
+_LOGGER = logging.getLogger(__name__)
+
+# (topic, payload, retain); bytes payloads are the compressed/raw line mirror
+Message = Tuple[str, "str | bytes", bool]
+Sender = Callable[[str, "str | bytes", bool], Awaitable[None]]
+# Called once a batch has been handed to MQTT (latency metrics)
+Ack = Callable[[], None]
+
+# Coalescing keeps at most this many stream messages per merged batch (oldest dropped)
+MAX_STREAM_BACKLOG = 2000
+
+def ha_mqtt_sender(hass) -> Sender:
+    # Resolve the MQTT component once, on the first publish rather than at setup
+    mqtt = None
+
+    async def _send(topic: str, payload: str | bytes, retain: bool):
+        nonlocal mqtt
+        if mqtt is None:
+            try:
+                from homeassistant.components import mqtt
+            except Exception:
+                mqtt = False
+        if mqtt is False:
+            _LOGGER.debug("MQTT component not available; drop %s", topic)
+            return
+        await mqtt.async_publish(hass, topic, payload, qos=0, retain=retain)
+
+    return _send
+
+# Single long-lived publisher fed by a bounded queue of per-frame batches
+class MqttPublisher:
+    def __init__(self, send: Sender, *, max_batches: int, policy: str = POLICY_COALESCE):
+        self._send = send
+        self._queue: asyncio.Queue[Tuple[List[Message], List[Ack]]] = asyncio.Queue(maxsize=max(1, max_batches))
+        self.policy = policy
+        # Topics carrying a stream of messages (raw line mirror, invalid-line reports):
+        # coalescing keeps them as ordered appends instead of merging them by topic
+        self.streams: set = set()
+        self._task: asyncio.Task | None = None
+        # Sessions sharing this publisher; the task runs while there is at least one
+        self.users = 0
+        self.published = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def acquire(self):
+        self.users += 1
+        self.start()
+
+    async def async_release(self):
+        self.users -= 1
+        if self.users <= 0:
+            self.users = 0
+            await self.async_stop()
+
+    async def async_stop(self):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._task
+            self._task = None
+
+    def publish(self, topic: str, payload: str | bytes, retain: bool = False):
+        self.publish_batch([(topic, payload, retain)])
+
+    def publish_batch(self, batch: Iterable[Message], ack: Optional[Ack] = None):
+        batch = list(batch)
+        if not batch:
+            return
+        acks = [ack] if ack else []
+        if self._queue.full():
+            old, old_acks = self._queue.get_nowait()
+            if self.policy == POLICY_DROP_OLDEST:
+                self.dropped += len(old)
+            else:
+                batch = self._coalesce(old + batch)
+                acks[:0] = old_acks
+        self._queue.put_nowait((batch, acks))
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _coalesce(self, msgs: List[Message]) -> List[Message]:
+        # Most recent payload per state topic, at its latest position; stream messages all
+        # kept in order, up to MAX_STREAM_BACKLOG
+        streams = self.streams
+        last = {}
+        n_stream = 0
+        for i, m in enumerate(msgs):
+            if m[0] in streams:
+                n_stream += 1
+            else:
+                last[m[0]] = i
+        skip = max(0, n_stream - MAX_STREAM_BACKLOG)
+        out = []
+        for i, m in enumerate(msgs):
+            if m[0] in streams:
+                if skip:
+                    skip -= 1
+                    continue
+            elif last[m[0]] != i:
+                continue
+            out.append(m)
+        self.dropped += len(msgs) - len(out)
+        return out
+
+    async def async_publish_many(self, messages: Iterable[Message], limit: int) -> List[bool]:
+        # Out-of-queue concurrent sends (retained discovery configs); True per message sent
+        sem = asyncio.Semaphore(max(1, limit))
+
+        async def _one(topic: str, payload: str | bytes, retain: bool) -> bool:
+            async with sem:
+                try:
+                    await self._send(topic, payload, retain)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    _LOGGER.warning("MQTT publish failed for %s: %s", topic, e)
+                    return False
+                self.published += 1
+                return True
+
+        return list(await asyncio.gather(*(_one(*m) for m in messages)))
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_size": self._queue.maxsize,
+            "queue_depth_max": self.max_depth,
+            "policy": self.policy,
+            "users": self.users,
+            "batches": self.batches,
+            "published": self.published,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        q = self._queue
+        while True:
+            batch, acks = await q.get()
+            # Drain whatever piled up while we were waiting on the broker
+            while not q.empty():
+                more, more_acks = q.get_nowait()
+                batch.extend(more)
+                acks.extend(more_acks)
+            self.batches += 1
+            for topic, payload, retain in batch:
+                try:
+                    await self._send(topic, payload, retain)
+                    self.published += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    _LOGGER.warning("MQTT publish failed for %s: %s", topic, e)
+            for ack in acks:
+                ack()
@@ -1,18 +1,44 @@
 
 from __future__ import annotations
-from typing import Any, Dict, List
+import time
+from typing import Any, Callable, Dict, List, Tuple
 from datetime import datetime
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import RestoreSensor, SensorEntity
 from homeassistant.core import callback
-from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.const import UnitOfElectricCurrent, UnitOfApparentPower, UnitOfEnergy
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 
-from .const import DOMAIN, EVT_FRAME
+from .const import (
+    DOMAIN,
+    OPT_MIN_INTERVAL_POWER, OPT_MIN_INTERVAL_CURRENT, OPT_MIN_INTERVAL_ENERGY, OPT_STATUS_INTERVAL,
+    OPT_DEADBAND_PAPP, OPT_DEADBAND_IINST, OPT_DEADBAND_REL, OPT_DEADBAND_MAX_INTERVAL, OPT_MULTI_METER,
+    DEFAULT_MIN_INTERVAL_POWER, DEFAULT_MIN_INTERVAL_CURRENT, DEFAULT_MIN_INTERVAL_ENERGY, DEFAULT_STATUS_INTERVAL,
+    DEFAULT_DEADBAND_PAPP, DEFAULT_DEADBAND_IINST, DEFAULT_DEADBAND_REL, DEFAULT_DEADBAND_MAX_INTERVAL,
+)
+from .analytics import derived_label
+from .frame import Frame
+from .labels import ENTITY_LABELS, ENTITY_KEYS, TicLabel, CLASS_POWER, CLASS_CURRENT, CLASS_ENERGY, CLASS_VOLTAGE
+from .throttle import WriteThrottle
 
 async def async_setup_entry(hass, entry, async_add_entities):
     mgr = TeleinfoEntityManager(hass, entry, async_add_entities)
     await mgr.async_init()
 
+def _throttles(opts) -> Dict[str, WriteThrottle]:
+    # Keyed by write class, with per-label overrides (deadbands) keyed by label
+    rel = opts.get(OPT_DEADBAND_REL, DEFAULT_DEADBAND_REL) / 100.0
+    power = opts.get(OPT_MIN_INTERVAL_POWER, DEFAULT_MIN_INTERVAL_POWER)
+    current = opts.get(OPT_MIN_INTERVAL_CURRENT, DEFAULT_MIN_INTERVAL_CURRENT)
+    hold = opts.get(OPT_DEADBAND_MAX_INTERVAL, DEFAULT_DEADBAND_MAX_INTERVAL)
+    return {
+        CLASS_POWER: WriteThrottle(power),
+        CLASS_VOLTAGE: WriteThrottle(power),
+        CLASS_CURRENT: WriteThrottle(current),
+        CLASS_ENERGY: WriteThrottle(opts.get(OPT_MIN_INTERVAL_ENERGY, DEFAULT_MIN_INTERVAL_ENERGY)),
+        "PAPP": WriteThrottle(power, opts.get(OPT_DEADBAND_PAPP, DEFAULT_DEADBAND_PAPP), rel, hold),
+        "IINST": WriteThrottle(current, opts.get(OPT_DEADBAND_IINST, DEFAULT_DEADBAND_IINST), rel, hold),
+    }
+
 class TeleinfoEntityManager:
     def __init__(self, hass, entry, async_add_entities):
         self.hass = hass
@@ -21,81 +47,156 @@ class TeleinfoEntityManager:
         self.entities: Dict[str, TeleinfoSensor] = {}
         self.dev_info = DeviceInfo(identifiers={(DOMAIN, entry.entry_id)}, name="Téléinfo Gateway")
         self.frames_count = 0
-        self.status_entity = TeleinfoStatusSensor(f"{entry.entry_id}_status", "Statut Téléinfo", self.dev_info)
+        self.throttles = _throttles(entry.options)
+        self.multi_meter = entry.options.get(OPT_MULTI_METER, False)
+        self._adco = None
+        self._device_info = self.dev_info
+        self._meter_devices: Dict[str, DeviceInfo] = {}
+        # Entities created since the last flush, added to HA in one call
+        self._new: List[SensorEntity] = []
+        self.status_entity = TeleinfoStatusSensor(
+            f"{entry.entry_id}_status", "Statut Téléinfo", self.dev_info,
+            entry.options.get(OPT_STATUS_INTERVAL, DEFAULT_STATUS_INTERVAL),
+        )
         self.entities[self.status_entity.unique_id] = self.status_entity
+        self.session = hass.data[DOMAIN][entry.entry_id]
 
     async def async_init(self):
-        # Add status entity immediately so something appears
-        self.async_add_entities([self.status_entity])
+        # Status entity, plus the entities of the previous run (restored state), in one batch
+        self._new.append(self.status_entity)
+        if self.session.metrics is not None:
+            self._new.extend(
+                TeleinfoMetricSensor(f"{self.entry.entry_id}_metric_{key}", name, self.dev_info, unit, state_class, getter, self.session)
+                for key, name, unit, state_class, getter in METRIC_SENSORS
+            )
+        self._from_registry()
+        history = self.session.history
+        if history is not None:
+            # Last known values from the local history, before the first frame arrives
+            for key, (_ts, raw) in history.last.items():
+                adco, _, label = key.rpartition("/")
+                desc = ENTITY_LABELS.get(label)
+                if desc is None:
+                    continue
+                try:
+                    value = desc.convert(str(raw))
+                except (TypeError, ValueError):
+                    continue
+                prefix, device_info = self._meter(adco or history.meta.get("adco"))
+                self._upsert(prefix, desc, value, device_info)
+        self._flush_new()
         # Listen to incoming frames
-        self.entry.async_on_unload(self.hass.bus.async_listen(EVT_FRAME, self._handle_frame))
+        self.entry.async_on_unload(self.session.async_subscribe(self._handle_frame))
+
+    def _from_registry(self):
+        # Rebuild the sensors registered for this entry from their unique ids
+        # ("<entry_id>_<key>", or "<entry_id>_<ADCO>_<key>" with multi_meter)
+        ent_reg = er.async_get(self.hass)
+        dev_reg = dr.async_get(self.hass)
+        base = f"{self.entry.entry_id}_"
+        for reg in er.async_entries_for_config_entry(ent_reg, self.entry.entry_id):
+            uid = reg.unique_id
+            if uid in self.entities or not uid.startswith(base):
+                continue
+            rest = uid[len(base):]
+            adco = None
+            desc = ENTITY_KEYS.get(rest) or derived_label(rest)
+            if desc is None and "_" in rest:
+                adco, key = rest.split("_", 1)
+                desc = ENTITY_KEYS.get(key) or derived_label(key)
+            if desc is None:
+                continue
+            if adco is None and not self.multi_meter:
+                # Single meter: the ADCO is in the identifiers of the entity's device
+                device = dev_reg.async_get(reg.device_id) if reg.device_id else None
+                adco = next((i for d, i in device.identifiers if d == DOMAIN and i != self.entry.entry_id), None) if device else None
+            prefix, device_info = self._meter(adco)
+            if uid == f"{prefix}_{desc.key}":
+                self._create(uid, desc, device_info)
+
+    def _meter(self, adco: str | None) -> Tuple[str, DeviceInfo]:
+        # Unique id prefix and device of a meter's entities
+        if self.multi_meter:
+            # One device per meter; the status sensor stays on the port's device
+            device_info = self.dev_info
+            if adco:
+                device_info = self._meter_devices.get(adco)
+                if device_info is None:
+                    device_info = self._meter_devices[adco] = DeviceInfo(
+                        identifiers={(DOMAIN, adco)}, name=f"Téléinfo {adco}", via_device=(DOMAIN, self.entry.entry_id)
+                    )
+            return (f"{self.entry.entry_id}_{adco}" if adco else self.entry.entry_id), device_info
+        else:
+            if adco and adco != self._adco:
+                self._adco = adco
+                self._device_info = DeviceInfo(identifiers={(DOMAIN, adco)}, name=f"Téléinfo {adco}")
+                # update status sensor device if we now know ADCO
+                self.status_entity.set_device_info(self._device_info)
+            return self.entry.entry_id, self._device_info
 
     @callback
-    def _handle_frame(self, event):
-        frame: Dict[str, Any] = event.data.get("frame") or {}
-        adco = frame.get("ADCO")
-        device_info = self.dev_info
-        if adco:
-            device_info = DeviceInfo(identifiers={(DOMAIN, adco)}, name=f"Téléinfo {adco}")
-            # update status sensor device if we now know ADCO
-            self.status_entity.set_device_info(device_info)
+    def _handle_frame(self, frame: Frame):
+        # Fields failing the integrity checks never reach the entities
+        meta = frame.get("_meta")
+        rejected = meta.get("rejected", ()) if meta is not None else ()
+        adco = next((frame[label] for label in ("ADCO", "ADSC") if frame.get(label) and label not in rejected), None)
+        prefix, device_info = self._meter(adco)
 
         self.frames_count += 1
-        self.status_entity.update_from_frame(self.frames_count, frame)
+        writes = self.status_entity.update_from_frame(self.frames_count, frame, self.session.reconnects)
 
-        mapping = {
-            "PAPP": ("Puissance apparente", UnitOfApparentPower.VOLT_AMPERE, None),
-            "IINST": ("Courant instantané", UnitOfElectricCurrent.AMPERE, None),
-            "IMAX": ("Courant max", UnitOfElectricCurrent.AMPERE, None),
-        }
-        # Dynamic fields
-        for key, (name, unit, device_class) in mapping.items():
-            if key in frame:
-                value = frame[key]
-                # Try numeric when appropriate
-                try:
-                    if key in ("PAPP", "IINST", "IMAX"):
-                        value = float(value)
-                except Exception:
-                    pass
-                self._upsert(key, name, value, unit, device_class, device_info)
-
-        # Energy indexes (Wh → expose kWh)
-        for lbl, nice in [("BASE", "Index BASE"), ("HCHC", "Index HCHC"), ("HCHP", "Index HCHP")]:
-            if lbl in frame:
-                try:
-                    val = float(frame[lbl])
-                except Exception:
-                    val = None
-                if val is not None:
-                    self._upsert(f"{lbl.lower()}_kwh", f"{nice} (kWh)", val/1000.0, UnitOfEnergy.KILO_WATT_HOUR, "energy", device_info)
-
-    def _upsert(self, key: str, name: str, value: Any, unit: str | None, device_class: str | None, device_info: DeviceInfo):
-        uid = f"{self.entry.entry_id}_{key}"
-        ent = self.entities.get(uid)
-        if not ent:
-            ent = TeleinfoSensor(uid, name, unit, device_class, device_info)
-            self.entities[uid] = ent
-            # Add entity now
-            self.async_add_entities([ent])
-        ent.set_native_value(value)
-
-    def _async_add(self, new: List[SensorEntity]):
+        # Native entities for every known label (indexes are exposed in kWh)
+        for label, raw in frame.fields():
+            desc = ENTITY_LABELS.get(label)
+            if desc is None or label in rejected:
+                continue
+            try:
+                value = desc.convert(raw)
+            except (TypeError, ValueError):
+                continue
+            writes += self._upsert(prefix, desc, value, device_info)
+
+        # Derived analytics of this meter (already numbers)
+        for key, raw in self.session.analytics_values(adco).items():
+            desc = derived_label(key)
+            if desc is not None:
+                writes += self._upsert(prefix, desc, desc.convert(raw), device_info)
+        if self._new:
+            self._flush_new()
+        if self.session.metrics is not None:
+            self.session.metrics.entity_writes += writes
+
+    def _upsert(self, prefix: str, desc: TicLabel, value: Any, device_info: DeviceInfo) -> bool:
+        uid = f"{prefix}_{desc.key}"
+        ent = self.entities.get(uid) or self._create(uid, desc, device_info)
+        return ent.set_native_value(value)
+
+    def _create(self, uid: str, desc: TicLabel, device_info: DeviceInfo) -> TeleinfoSensor:
+        throttle = self.throttles.get(desc.label) or self.throttles.get(desc.write_class)
+        ent = self.entities[uid] = TeleinfoSensor(uid, desc, device_info, throttle)
+        self._new.append(ent)
+        return ent
+
+    def _flush_new(self):
+        new, self._new = self._new, []
         self.async_add_entities(new)
 
 class TeleinfoStatusSensor(SensorEntity):
     _attr_has_entity_name = True
     _attr_icon = "mdi:flash-triangle-outline"
 
-    def __init__(self, unique_id: str, name: str, device_info: DeviceInfo):
+    def __init__(self, unique_id: str, name: str, device_info: DeviceInfo, min_interval: float = 0):
         self._attr_unique_id = unique_id
         self._attr_name = name
         self._state = None
         self._attr_device_info = device_info
+        self._min_interval = min_interval
+        self._written_ts = None
         self._attr_extra_state_attributes = {
             "frames": 0,
             "last_ptec": None,
             "last_seen": None,
+            "reconnects": 0,
         }
 
     @property
@@ -105,32 +206,90 @@ class TeleinfoStatusSensor(SensorEntity):
     def set_device_info(self, device_info: DeviceInfo):
         self._attr_device_info = device_info
 
-    def update_from_frame(self, count: int, frame: Dict[str, Any]):
+    def update_from_frame(self, count: int, frame: Dict[str, Any], reconnects: int = 0) -> bool:
         self._state = count
         self._attr_extra_state_attributes = {
             "frames": count,
             "last_ptec": frame.get("PTEC"),
             "last_seen": datetime.now().isoformat(timespec="seconds"),
+            "reconnects": reconnects,
         }
         if self.hass:
-            self.async_write_ha_state()
+            now = time.monotonic()
+            if self._written_ts is None or now - self._written_ts >= self._min_interval:
+                self._written_ts = now
+                self.async_write_ha_state()
+                return True
+        return False
 
-class TeleinfoSensor(SensorEntity):
+class TeleinfoSensor(RestoreSensor):
     _attr_has_entity_name = True
 
-    def __init__(self, unique_id: str, name: str, unit, device_class, device_info: DeviceInfo):
+    def __init__(self, unique_id: str, desc: TicLabel, device_info: DeviceInfo,
+                 throttle: WriteThrottle | None = None):
         self._attr_unique_id = unique_id
-        self._attr_name = name
+        self._attr_name = desc.name
         self._state = None
-        self._attr_native_unit_of_measurement = unit
-        self._attr_device_class = device_class
+        self._throttle = throttle or WriteThrottle()
+        self._written = None
+        self._written_ts = 0.0
+        self._attr_native_unit_of_measurement = desc.unit
+        self._attr_device_class = desc.device_class
+        self._attr_state_class = desc.state_class
+        self._attr_icon = desc.icon
         self._attr_device_info = device_info
 
     @property
     def native_value(self):
         return self._state
 
-    def set_native_value(self, val):
+    async def async_added_to_hass(self):
+        # Created from the registry before any frame: start from the last known state
+        if self._state is None and (last := await self.async_get_last_sensor_data()) is not None:
+            self._state = last.native_value
+        # HA writes the initial state itself when the entity is added
+        self._written = self._state
+        self._written_ts = time.monotonic()
+
+    def set_native_value(self, val) -> bool:
         self._state = val
         if self.hass:
-            self.async_write_ha_state()
+            now = time.monotonic()
+            if self._throttle.allows(self._written, val, self._written_ts, now):
+                self._written = val
+                self._written_ts = now
+                self.async_write_ha_state()
+                return True
+        return False
+
+# (key, name, unit, state_class, getter(session)) of the optional metrics sensors
+METRIC_SENSORS = [
+    ("bytes_in", "Octets reçus", "B", "total_increasing", lambda s: s.metrics.bytes_in),
+    ("frames_per_minute", "Trames par minute", "trames/min", "measurement", lambda s: s.metrics.frames_per_minute),
+    ("checksum_failures", "Erreurs de checksum", None, "total_increasing", lambda s: sum(s.metrics.checksum_failures.values())),
+    ("parse_time_p95", "Traitement trame (p95)", "ms", "measurement", lambda s: s.metrics.parse_time.snapshot()["p95_ms"]),
+    ("publish_latency_p95", "Latence ETX → MQTT (p95)", "ms", "measurement", lambda s: s.metrics.publish_latency.snapshot()["p95_ms"]),
+    ("queue_depth", "File MQTT", None, "measurement", lambda s: s.publisher.queue_depth),
+    ("entity_writes", "Écritures d'état", None, "total_increasing", lambda s: s.metrics.entity_writes),
+]
+
+class TeleinfoMetricSensor(SensorEntity):
+    # Polled: reads the session counters on HA's scan interval, never on the frame path
+    _attr_has_entity_name = True
+    _attr_should_poll = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:speedometer"
+
+    def __init__(self, unique_id: str, name: str, device_info: DeviceInfo, unit: str | None,
+                 state_class: str | None, getter: Callable[[Any], Any], session):
+        self._attr_unique_id = unique_id
+        self._attr_name = name
+        self._attr_device_info = device_info
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._getter = getter
+        self._session = session
+
+    @property
+    def native_value(self):
+        return self._getter(self._session)
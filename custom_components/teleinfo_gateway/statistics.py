@@ -0,0 +1,190 @@
+from __future__ import annotations
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from .const import DOMAIN
+from .labels import LABELS
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Hourly energy statistics (opt-in)
+# -----------------------------
+# Energy indexes are aggregated in memory per meter, index (one per tariff
+# period) and hour, and every closed hour is imported into the recorder as
+# an external statistic "teleinfo_gateway:<adco>_<label>" in kWh, instead of
+# relying on per-frame state writes. Sums continue from the last imported
+# row, so downtime never loses energy: it is booked on the first hour after
+# the gap, or spread over the right hours when the local history covers it.
+# HA's recorder is only imported by the importing methods.
+
+HOUR = 3600
+FLUSH_INTERVAL = 60.0
+
+_INDEX_LABELS = frozenset(label for label, d in LABELS.items() if d.wh_variant)
+
+# (statistic_id, hour start, index in Wh at the end of the hour)
+Hour = Tuple[str, int, int]
+
+def statistic_id(adco: str, label: str) -> str:
+    return f"{DOMAIN}:{adco.lower()}_{label.lower()}"
+
+class HourlyIndexes:
+    def __init__(self):
+        # statistic_id -> [hour start, last index seen in that hour]
+        self._open: Dict[str, list] = {}
+        # statistic_id -> display name
+        self.names: Dict[str, str] = {}
+        self.closed: List[Hour] = []
+
+    def add(self, ts: int, adco: str, values: Dict[str, str]):
+        hour = ts - ts % HOUR
+        for label, raw in values.items():
+            if label not in _INDEX_LABELS:
+                continue
+            try:
+                v = int(raw)
+            except ValueError:
+                continue
+            sid = statistic_id(adco, label)
+            cur = self._open.get(sid)
+            if cur is None:
+                self._open[sid] = [hour, v]
+                self.names[sid] = f"Téléinfo {adco} {LABELS[label].name}"
+            elif cur[0] == hour:
+                cur[1] = v
+            else:
+                self.closed.append((sid, cur[0], cur[1]))
+                cur[0], cur[1] = hour, v
+
+    def close_before(self, ts: int):
+        # Hours that ended without a later frame (link down across the boundary)
+        hour = ts - ts % HOUR
+        for sid, cur in self._open.items():
+            if cur[0] < hour:
+                self.closed.append((sid, cur[0], cur[1]))
+                cur[0] = hour
+
+    def take(self) -> List[Hour]:
+        closed, self.closed = self.closed, []
+        return closed
+
+class EnergyStatistics:
+    def __init__(self, hass):
+        self.hass = hass
+        self.hours = HourlyIndexes()
+        # statistic_id -> (hour start, state kWh, sum kWh) of the last imported row, None if none
+        self._last: Dict[str, Tuple[int, float, float] | None] = {}
+        self.imported = 0
+
+    def add(self, ts: int, adco: str, values: Dict[str, str]):
+        self.hours.add(ts, adco, values)
+
+    async def _last_row(self, sid: str) -> Tuple[int, float, float] | None:
+        if sid in self._last:
+            return self._last[sid]
+        from homeassistant.components.recorder import get_instance
+        from homeassistant.components.recorder.statistics import get_last_statistics
+        rows = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics, self.hass, 1, sid, True, {"state", "sum"}
+        )
+        last = None
+        if rows.get(sid):
+            row = rows[sid][0]
+            start = row["start"]
+            if isinstance(start, datetime):
+                start = start.timestamp()
+            last = (int(start), row.get("state") or 0.0, row.get("sum") or 0.0)
+        self._last[sid] = last
+        return last
+
+    async def async_resume_from(self, sids: List[str]) -> int:
+        # Oldest hour still missing across these series (0 when one has never been imported)
+        starts = []
+        for sid in sids:
+            last = await self._last_row(sid)
+            if last is None:
+                return 0
+            starts.append(last[0] + HOUR)
+        return min(starts, default=0)
+
+    async def async_import(self, hours: List[Hour], names: Dict[str, str]) -> int:
+        from homeassistant.components.recorder.models import StatisticMetaData
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        per_sid: Dict[str, List[Tuple[int, int]]] = {}
+        for sid, start, wh in hours:
+            per_sid.setdefault(sid, []).append((start, wh))
+        n = 0
+        for sid, rows in per_sid.items():
+            last = await self._last_row(sid)
+            stats = []
+            for start, wh in sorted(rows):
+                # Hours already in the recorder are never rewritten
+                if last is not None and start <= last[0]:
+                    continue
+                state = wh / 1000
+                total = 0.0
+                if last is not None:
+                    delta = state - last[1]
+                    # An index lower than the last one is a new meter starting from zero
+                    total = last[2] + (delta if delta >= 0 else state)
+                stats.append({"start": datetime.fromtimestamp(start, timezone.utc), "state": state, "sum": total})
+                last = (start, state, total)
+            if not stats:
+                continue
+            metadata = {
+                "has_mean": False,
+                "has_sum": True,
+                "name": names.get(sid, sid),
+                "source": DOMAIN,
+                "statistic_id": sid,
+                "unit_of_measurement": "kWh",
+            }
+            # Fields of newer recorders
+            fields = StatisticMetaData.__annotations__
+            if "mean_type" in fields:
+                from homeassistant.components.recorder.models import StatisticMeanType
+                metadata["mean_type"] = StatisticMeanType.NONE
+            if "unit_class" in fields:
+                metadata["unit_class"] = "energy"
+            async_add_external_statistics(self.hass, metadata, stats)
+            self._last[sid] = last
+            n += len(stats)
+        self.imported += n
+        return n
+
+    async def async_flush(self, now: float) -> int:
+        self.hours.close_before(int(now))
+        hours = self.hours.take()
+        return await self.async_import(hours, self.hours.names) if hours else 0
+
+    async def async_backfill(self, history, adco: str | None, now: float) -> int:
+        # Hours missing from the recorder rebuilt from the local per-minute history
+        # (series "LABEL" of `adco`, or "<ADCO>/LABEL" with multi_meter)
+        series = {}
+        for key in history.last:
+            meter, _, label = key.rpartition("/")
+            meter = meter or adco
+            if meter and label in _INDEX_LABELS:
+                series[key] = (meter, label)
+        if not series:
+            return 0
+        start = await self.async_resume_from([statistic_id(m, label) for m, label in series.values()])
+        hours = HourlyIndexes()
+        for row in await history.async_query(start, int(now), True):
+            ts = row.pop("ts")
+            per_meter: Dict[str, Dict[str, str]] = {}
+            for key, agg in row.items():
+                if key in series:
+                    meter, label = series[key]
+                    per_meter.setdefault(meter, {})[label] = str(agg["last"])
+            for meter, values in per_meter.items():
+                hours.add(ts, meter, values)
+        # Only ended hours: the current one is left to the live aggregation
+        hours.close_before(int(now))
+        n = await self.async_import(hours.take(), hours.names)
+        if n:
+            _LOGGER.info("Téléinfo statistics: %s hours rebuilt from the local history", n)
+        return n
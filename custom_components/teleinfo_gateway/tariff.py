@@ -0,0 +1,131 @@
+from __future__ import annotations
+import logging, re
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Tariff tables
+# -----------------------------
+# PTEC (running period), OPTARIF (contract) and DEMAIN (Tempo colour of the
+# next day) are resolved by one dict lookup per frame. The tables hold the
+# codes meters send as-is ("HC..", "HPJB", "BBR(", "BLAN"); other spellings
+# go through the prefix rules once and are memoised, up to a bound (line
+# noise under the flag policy can produce arbitrary codes).
+
+class Period(NamedTuple):
+    friendly: str
+    # Period key: MQTT payload, price grid key and energy_day_/cost_day_ suffix (lowercased)
+    short: str
+    icon: str
+
+_NIGHT, _SUN = "mdi:weather-night", "mdi:white-balance-sunny"
+
+_PERIODS = {
+    "TH": Period("Toutes Heures", "TH", "mdi:clock-outline"),
+    "HC": Period("Heures Creuses", "HC", _NIGHT),
+    "HP": Period("Heures Pleines", "HP", _SUN),
+    "HN": Period("Heures Normales", "HN", "mdi:timer-outline"),
+    "PM": Period("Pointe Mobile", "PM", "mdi:flash-alert"),
+    "HCJB": Period("Heures Creuses (Tempo Bleu)", "HC_BLEU", _NIGHT),
+    "HPJB": Period("Heures Pleines (Tempo Bleu)", "HP_BLEU", _SUN),
+    "HCJW": Period("Heures Creuses (Tempo Blanc)", "HC_BLANC", _NIGHT),
+    "HPJW": Period("Heures Pleines (Tempo Blanc)", "HP_BLANC", _SUN),
+    "HCJR": Period("Heures Creuses (Tempo Rouge)", "HC_ROUGE", _NIGHT),
+    "HPJR": Period("Heures Pleines (Tempo Rouge)", "HP_ROUGE", _SUN),
+}
+UNKNOWN_PERIOD = Period("Inconnu", "UNK", "mdi:clock-alert")
+
+# Contract kinds (OPTARIF)
+CONTRACT_BASE = "base"
+CONTRACT_HCHP = "hchp"
+CONTRACT_EJP = "ejp"
+CONTRACT_TEMPO = "tempo"
+
+# Price grid keys of the periods each contract runs through
+_CONTRACT_PERIODS = {
+    CONTRACT_BASE: frozenset({"th"}),
+    CONTRACT_HCHP: frozenset({"hc", "hp"}),
+    CONTRACT_EJP: frozenset({"hn", "pm"}),
+    CONTRACT_TEMPO: frozenset(p.short.lower() for code, p in _PERIODS.items() if code.endswith(("JB", "JW", "JR"))),
+}
+_ALL_PERIODS = frozenset().union(*_CONTRACT_PERIODS.values())
+
+# Tempo colours (DEMAIN), "----" while not yet known
+_COLOURS = {"BLEU": "Bleu", "BLAN": "Blanc", "ROUG": "Rouge", "----": "Inconnu"}
+
+_MAX_MEMO = 64
+
+_PRICE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(\d+(?:[.,]\d+)?)")
+
+def _period(code: str) -> Period:
+    c = code.strip().upper()
+    if c in _PERIODS:
+        return _PERIODS[c]
+    for prefix in ("HC", "HP", "TH", "HN", "PM"):
+        if c.startswith(prefix):
+            return _PERIODS[prefix]
+    return UNKNOWN_PERIOD
+
+def _contract(code: str) -> str | None:
+    c = code.strip().upper()
+    if c.startswith("BASE"):
+        return CONTRACT_BASE
+    if c.startswith("HC"):
+        return CONTRACT_HCHP
+    if c.startswith("EJP"):
+        return CONTRACT_EJP
+    if c.startswith("BBR"):
+        return CONTRACT_TEMPO
+    return None
+
+def _colour(code: str) -> str:
+    return _COLOURS.get(code.strip().upper()[:4], "Inconnu")
+
+# Raw codes as sent by historic meters, resolved at import
+_PTEC: Dict[str, Period] = {code: _period(code) for code in (
+    "TH..", "HC..", "HP..", "HN..", "PM..", "HCJB", "HPJB", "HCJW", "HPJW", "HCJR", "HPJR",
+)}
+_PTEC[""] = UNKNOWN_PERIOD
+_OPTARIF: Dict[str, str | None] = {code: _contract(code) for code in (
+    "BASE", "HC..", "EJP.", "BBR(", "BBRx",
+)}
+_DEMAIN: Dict[str, str] = {code: _colour(code) for code in ("----", "BLEU", "BLAN", "ROUG")}
+
+def _lookup(table: dict, fn, code: str):
+    v = table.get(code)
+    if v is None and code not in table:
+        v = fn(code)
+        if len(table) < _MAX_MEMO:
+            table[code] = v
+    return v
+
+def ptec_period(code: str | None) -> Period:
+    return _lookup(_PTEC, _period, code or "")
+
+def contract(optarif: str | None) -> str | None:
+    return _lookup(_OPTARIF, _contract, optarif or "")
+
+def tempo_colour(demain: str | None) -> str:
+    return _lookup(_DEMAIN, _colour, demain or "----")
+
+def price_mismatch(prices: Mapping[str, float], kind: str | None) -> Tuple[List[str], List[str]]:
+    # (periods of the contract without a price, priced periods of other contracts);
+    # other keys (standard-mode indexes) are not checked
+    periods = _CONTRACT_PERIODS.get(kind)
+    if not prices or periods is None:
+        return [], []
+    return sorted(periods - prices.keys()), sorted((_ALL_PERIODS - periods) & prices.keys())
+
+def parse_prices(text: str | None) -> Mapping[str, float]:
+    # "hc=0.2068, hp=0.2700" (EUR/kWh per period key) -> {"hc": 0.2068, "hp": 0.27};
+    # decimal commas are accepted ("hc=0,2068; hp=0,27"); the rest is ignored with a warning
+    text = text or ""
+    rest = _PRICE.sub("", text).replace(",", " ").replace(";", " ").split()
+    if rest:
+        _LOGGER.warning("Ignoring unparsed price grid text: %s", " ".join(rest))
+    return MappingProxyType({
+        key.lower(): float(value.replace(",", "."))
+        for key, value in _PRICE.findall(text)
+    })
@@ -0,0 +1,36 @@
+from __future__ import annotations
+from typing import Any
+
+# -----------------------------
+# Entity state write throttling
+# -----------------------------
+# Plain Python (no HA import): sensor.py keeps one per write class or label.
+
+class WriteThrottle:
+    # Decides whether a new value is worth an HA state write
+    __slots__ = ("min_interval", "abs_db", "rel_db", "max_interval")
+
+    def __init__(self, min_interval: float = 0, abs_db: float = 0, rel_db: float = 0, max_interval: float = 0):
+        self.min_interval = min_interval
+        self.abs_db = abs_db
+        self.rel_db = rel_db
+        # A value held back by the deadband is written anyway once this long has passed (0: never)
+        self.max_interval = max_interval
+
+    def allows(self, last: Any, new: Any, last_ts: float, now: float) -> bool:
+        if last is None:
+            return True
+        if new == last:
+            return False
+        if now - last_ts < self.min_interval:
+            return False
+        if self.abs_db or self.rel_db:
+            if self.max_interval and now - last_ts >= self.max_interval:
+                return True
+            try:
+                delta = abs(new - last)
+            except TypeError:
+                return True
+            if delta < self.abs_db or delta < abs(last) * self.rel_db:
+                return False
+        return True
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import re
+from typing import Callable, Iterable, Optional, Tuple
+
+from .labels import LABELS
+
+# -----------------------------
+# TIC line parsing (standard mode) and mode detection
+# -----------------------------
+# Standard mode (Linky, 9600 baud): LABEL HT [HORODATE HT] VALUE HT CHK
+# The checksum covers everything from the label up to and including the
+# HT that precedes it. The reference historic parser lives in
+# TeleinfoSession.parse_tic_line; the *_bytes fast paths below work on raw
+# latin-1 line bytes and must stay result-identical to the str parsers.
+
+MODE_AUTO = "auto"
+MODE_HISTORIC = "historic"
+MODE_STANDARD = "standard"
+TIC_MODES = [MODE_AUTO, MODE_HISTORIC, MODE_STANDARD]
+
+BAUD_HISTORIC = 1200
+BAUD_STANDARD = 9600
+
+HT = "\t"
+
+# (label, value, horodate, chk, ok)
+StdLine = Tuple[Optional[str], Optional[str], Optional[str], str, bool]
+
+def parse_std_line(s: str) -> StdLine:
+    s = s.strip("\r\n")
+    i = s.rfind(HT)
+    if i <= 0:
+        return (None, None, None, "", False)
+    chk = s[i + 1:]
+    parts = s[:i].split(HT)
+    label = parts[0]
+    if len(parts) == 2:
+        ts, value = None, parts[1]
+    elif len(parts) == 3:
+        ts, value = parts[1], parts[2]
+    else:
+        return (label or None, HT.join(parts[1:]), None, chk if len(chk) == 1 else "", False)
+    ok = len(chk) == 1 and ((sum(map(ord, s[:i + 1])) & 0x3F) + 0x20) == ord(chk)
+    return (label or None, value, ts or None, chk, ok)
+
+# Known labels, so the hot path never decodes them
+_LABEL_STR = {k.encode("latin-1"): k for k in LABELS}
+# Anything str.split() treats as whitespace in a latin-1 decoded line, except SP
+_WS_NOT_SP = re.compile(rb"[\t\n\x0b\x0c\r\x1c-\x1f\x85\xa0]")
+
+def parse_hist_bytes(b: bytes) -> Optional[StdLine]:
+    # Canonical "LABEL SP VALUE SP CHK" only; None means use the str parser
+    s = b.strip(b"\r\n")
+    parts = s.split(b" ")
+    if len(parts) != 3:
+        return None
+    label, value, chk = parts
+    if not label or not value or len(chk) != 1 or _WS_NOT_SP.search(s) is not None:
+        return None
+    lbl = _LABEL_STR.get(label) or label.decode("latin-1")
+    c = chk[0]
+    if ((sum(s[:-2]) & 0x3F) + 0x20) == c:
+        return (lbl, value.decode("latin-1"), None, chr(c), True)
+    return (lbl, s[len(label) + 1:].decode("latin-1"), None, chr(c), False)
+
+def parse_std_bytes(b: bytes) -> StdLine:
+    s = b.strip(b"\r\n")
+    i = s.rfind(b"\t")
+    if i <= 0:
+        return (None, None, None, "", False)
+    chk = s[i + 1:].decode("latin-1")
+    parts = s[:i].split(b"\t")
+    label = _LABEL_STR.get(parts[0]) or parts[0].decode("latin-1") or None
+    if len(parts) == 2:
+        ts, value = None, parts[1].decode("latin-1")
+    elif len(parts) == 3:
+        ts, value = parts[1].decode("latin-1") or None, parts[2].decode("latin-1")
+    else:
+        return (label, b"\t".join(parts[1:]).decode("latin-1"), None, chk if len(chk) == 1 else "", False)
+    ok = len(chk) == 1 and ((sum(s[:i + 1]) & 0x3F) + 0x20) == s[i + 1]
+    return (label, value, ts, chk, ok)
+
+def horodate_iso(ts: str) -> str:
+    # "SAAMMJJhhmmss": season E (summer, UTC+2) / H (winter, UTC+1), lower case when clock is degraded
+    if len(ts) != 13 or not ts[1:].isdigit():
+        return ts
+    off = {"E": "+02:00", "H": "+01:00"}.get(ts[0].upper(), "")
+    return f"20{ts[1:3]}-{ts[3:5]}-{ts[5:7]}T{ts[7:9]}:{ts[9:11]}:{ts[11:13]}{off}"
+
+def detect_mode(lines: Iterable[str], parse_historic: Callable[[str], tuple]) -> Optional[str]:
+    # Majority of checksum-valid lines in one frame decides; None when undecided
+    n_std = n_hist = 0
+    for line in lines:
+        if HT in line and parse_std_line(line)[4]:
+            n_std += 1
+        elif parse_historic(line)[3]:
+            n_hist += 1
+    if max(n_std, n_hist) < 3 or n_std == n_hist:
+        return None
+    return MODE_STANDARD if n_std > n_hist else MODE_HISTORIC
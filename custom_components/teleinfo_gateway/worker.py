@@ -0,0 +1,55 @@
+from __future__ import annotations
+import asyncio, contextlib, logging, queue, threading
+from typing import Callable, List
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Parse worker (parse_mode "thread")
+# -----------------------------
+# One thread per link runs framing, parsing and JSON encoding on the raw
+# chunks; the event loop only enqueues chunks and dispatches the results.
+# Everything parsed while the loop was busy comes back as one batch, with a
+# single call_soon_threadsafe.
+
+class ParseWorker:
+    def __init__(self, loop: asyncio.AbstractEventLoop, fn: Callable[[bytes], list],
+                 deliver: Callable[[list], None], name: str):
+        self._loop = loop
+        self._fn = fn
+        self._deliver = deliver
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, data: bytes):
+        self._queue.put(data)
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _run(self):
+        q = self._queue
+        while True:
+            chunks: List[bytes | None] = [q.get()]
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    chunks.append(q.get_nowait())
+            results = []
+            for chunk in chunks:
+                if chunk is None:
+                    break
+                try:
+                    results.extend(self._fn(chunk))
+                except Exception:
+                    _LOGGER.exception("Error in Téléinfo parse worker")
+            if results:
+                self.batches += 1
+                try:
+                    self._loop.call_soon_threadsafe(self._deliver, results)
+                except RuntimeError:
+                    # Event loop closed
+                    return
+            if chunk is None:
+                return
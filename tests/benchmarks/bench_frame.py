@@ -0,0 +1,63 @@
+# Frames over a day at one frame per 1.5 s: parse cost, GC pressure, allocation peak
+# per frame, and memory held per frame by a consumer keeping them, Frame vs plain dict
+#   python -m tests.benchmarks.bench_frame [capture.bin]
+import gc, itertools, sys, time, tracemalloc
+
+from custom_components.teleinfo_gateway.replay import synthetic_frames
+
+from tests.common import feed, make_session
+
+DAY = 57600
+
+def session(consumer):
+    sess = make_session(dedup_groups={"fields", "derived"}, dedup_heartbeat=300, raw_mode="block")
+    sess.async_subscribe(consumer)
+    return sess
+
+def retained(frames: list, keep) -> float:
+    held = []
+    sess = session(lambda f: held.append(keep(f)))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    feed(sess, frames)
+    sess.publisher.messages.clear()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(held)
+
+def main(argv):
+    if argv:
+        one = [b"\x02" + f for f in open(argv[0], "rb").read().split(b"\x02")[1:]]
+        frames = list(itertools.islice(itertools.cycle(one), DAY))
+    else:
+        frames = list(itertools.islice(synthetic_frames(), DAY))
+    sess = session(lambda f: f.get("PTEC"))
+    gc.collect()
+    gen0 = gc.get_stats()[0]["collections"]
+    t = time.perf_counter()
+    feed(sess, frames)
+    dt = time.perf_counter() - t
+    gen0 = gc.get_stats()[0]["collections"] - gen0
+    print(f"{DAY} frames: {dt / DAY * 1e6:.1f} us/frame, {gen0} gen0 collections")
+
+    sess = session(lambda f: None)
+    feed(sess, frames[:1000])
+    tracemalloc.start()
+    peak = 0
+    for data in frames[1000:3000]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        feed(sess, [data])
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    print(f"allocation peak: {peak / 2000:.0f} B/frame")
+
+    quarter = frames[:DAY // 4]
+    print(f"held by a consumer keeping {len(quarter)} frames:"
+          f" Frame {retained(quarter, lambda f: f):.0f} B/frame,"
+          f" dict {retained(quarter, lambda f: f.as_dict()):.0f} B/frame")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
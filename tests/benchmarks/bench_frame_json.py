@@ -0,0 +1,42 @@
+# Frame JSON for topic_json / topic_invalid: the former json.dumps path vs frame_json
+#   python -m tests.benchmarks.bench_frame_json
+import json, timeit
+
+from custom_components.teleinfo_gateway import frame_json
+from custom_components.teleinfo_gateway.frame_json import JSON_BACKEND, _frame_stdlib, encode_invalid
+
+from tests.common import feed, frames_of, hist_frame, make_session, std_frame
+
+def former(frame):
+    # Fresh "_meta" dict per frame, then json.dumps
+    obj = {"_meta": {"invalid_lines": 0}}
+    obj.update(frame)
+    return json.dumps(obj, ensure_ascii=False)
+
+def main():
+    for name, data, mode in (("historic", hist_frame(), "historic"), ("standard", std_frame(), "standard")):
+        sess = make_session(tic_mode=mode)
+        frames = frames_of(sess)
+        feed(sess, [data])
+        frame = frames[0]
+        n = 20000
+        cases = [("json.dumps", lambda: former(frame)), ("stdlib", lambda: _frame_stdlib(frame)),
+                 ("stdlib numeric", lambda: _frame_stdlib(frame, True))]
+        if frame_json.orjson is not None:
+            cases += [("orjson", lambda: frame_json._frame_orjson(frame)),
+                      ("orjson numeric", lambda: frame_json._frame_orjson(frame, True))]
+        base = None
+        print(f"{name} frame, {len(frame)} labels (backend in use: {JSON_BACKEND})")
+        for label, fn in cases:
+            t = timeit.timeit(fn, number=n) / n
+            base = base or t
+            print(f"  {label:15s} {t * 1e6:6.2f} us  x{base / t:.1f}")
+    raw = "PAPP 00750 !"
+    n = 50000
+    old = timeit.timeit(lambda: json.dumps({"label": "PAPP", "raw": raw, "hex": " ".join(f"{ord(c):02X}" for c in raw)}, ensure_ascii=False), number=n) / n
+    b = raw.encode("latin-1")
+    new = timeit.timeit(lambda: encode_invalid("PAPP", raw, b.hex(" ").upper()), number=n) / n
+    print(f"invalid line report: json.dumps {old * 1e6:.2f} us  encode_invalid {new * 1e6:.2f} us  x{old / new:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# MQTT client throughput, QoS 0 and QoS 1 (per max_inflight), publishing one by one
+# and through MqttPublisher in frame-sized batches. Against the in-process broker
+# stand-in of the tests by default, or a real broker (e.g. a local mosquitto).
+#   python -m tests.benchmarks.bench_mqtt_client [host:port]
+import asyncio, sys, time
+
+from custom_components.teleinfo_gateway.mqtt_client import MqttClient
+from custom_components.teleinfo_gateway.publisher import MqttPublisher
+
+from tests.test_mqtt_client import Broker
+
+MESSAGES = 20000
+FRAME = 20
+
+async def run(host: str, port: int, broker: Broker | None, qos: int, inflight: int, batched: bool):
+    connected = asyncio.Event()
+    client = MqttClient(host, port, client_id="bench", qos=qos, max_inflight=inflight, on_connect=connected.set)
+    client.start()
+    await connected.wait()
+    received = len(broker.published) if broker is not None else 0
+    sent = client.sent
+    # Payloads of the size of a field value
+    msgs = [(f"bench/fields/L{i % FRAME}", f"{i:09d}", False) for i in range(MESSAGES)]
+    t = time.perf_counter()
+    if batched:
+        pub = MqttPublisher(client.publish, max_batches=MESSAGES // FRAME)
+        pub.acquire()
+        for i in range(0, MESSAGES, FRAME):
+            pub.publish_batch(msgs[i:i + FRAME])
+            # One frame per loop iteration, as from the serial transport
+            await asyncio.sleep(0)
+        while client.sent - sent < MESSAGES:
+            await asyncio.sleep(0)
+    else:
+        for msg in msgs:
+            await client.publish(*msg)
+    if broker is not None:
+        while len(broker.published) - received < MESSAGES:
+            await asyncio.sleep(0.001)
+    while qos and client.stats()["inflight"]:
+        await asyncio.sleep(0.001)
+    wall = time.perf_counter() - t
+    if batched:
+        await pub.async_release()
+    await client.async_stop()
+    how = "batched" if batched else "one by one"
+    window = f", inflight {inflight:3d}" if qos else ""
+    print(f"  QoS {qos}{window:15s} {how:10s} {MESSAGES / wall:8.0f} msgs/s")
+
+async def main_async(argv):
+    broker = None
+    if argv:
+        host, port = argv[0].rsplit(":", 1)
+        port = int(port)
+    else:
+        broker = Broker()
+        host, port = "127.0.0.1", await broker.start()
+    for batched in (False, True):
+        await run(host, port, broker, 0, 1, batched)
+        for inflight in (1, 16, 64):
+            await run(host, port, broker, 1, inflight, batched)
+    if broker is not None:
+        await broker.stop()
+
+def main(argv):
+    print(f"{MESSAGES} messages")
+    asyncio.run(main_async(argv))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
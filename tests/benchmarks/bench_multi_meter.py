@@ -0,0 +1,54 @@
+# Scaling with the number of meters: N ports (one session each) or N meters on one
+# bus (multi_meter), all sharing one MqttPublisher whose sender only counts messages
+#   python -m tests.benchmarks.bench_multi_meter
+import asyncio, itertools, time
+
+from custom_components.teleinfo_gateway import _TeleinfoProto
+from custom_components.teleinfo_gateway.publisher import MqttPublisher
+from custom_components.teleinfo_gateway.replay import synthetic_frames
+
+from tests.common import make_session
+
+FRAMES = 100
+
+async def run(n: int, one_bus: bool) -> tuple:
+    sent = 0
+    async def send(topic, payload, retain):
+        nonlocal sent
+        sent += 1
+    pub = MqttPublisher(send, max_batches=n * FRAMES)
+    pub.acquire()
+    meters = [f"{i:012d}" for i in range(1, n + 1)]
+    if one_bus:
+        sess = make_session(pub, multi_meter=True)
+        frames = [b"".join(f) for f in zip(*(itertools.islice(synthetic_frames(m), FRAMES) for m in meters))]
+        links = [(_TeleinfoProto(sess), frames)]
+    else:
+        links = [(_TeleinfoProto(make_session(pub, port=f"port{i}", topic_fields=f"teleinfo/{m}/fields")),
+                  list(itertools.islice(synthetic_frames(m), FRAMES)))
+                 for i, m in enumerate(meters)]
+    t = time.perf_counter()
+    for i in range(FRAMES):
+        for proto, frames in links:
+            proto.data_received(frames[i])
+    parse = time.perf_counter() - t
+    while pub.queue_depth:
+        await asyncio.sleep(0)
+    total = time.perf_counter() - t
+    await pub.async_release()
+    return parse, total, sent
+
+def main():
+    for one_bus in (False, True):
+        print("N meters on one bus (multi_meter)" if one_bus else "N ports, one session each")
+        base = None
+        for n in (1, 4, 16, 64):
+            parse, total, sent = asyncio.run(run(n, one_bus))
+            frames = n * FRAMES
+            per_frame = total / frames * 1e6
+            base = base or per_frame
+            print(f"  N={n:3d}: {per_frame:6.1f} us/frame (parse {parse / frames * 1e6:5.1f})"
+                  f"  {sent / frames:4.1f} msgs/frame  x{per_frame / base:.2f} of N=1")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# Line parsing: decode + parse_tic_line (reference) vs the bytes-level fast path
+#   python -m tests.benchmarks.bench_parse_bytes
+import timeit
+
+from custom_components.teleinfo_gateway.tic import MODE_HISTORIC
+
+from tests.common import hist_group, make_session
+
+CASES = {
+    "valid": [hist_group(l, v).strip(b"\n") for l, v in (("PAPP", "00750"), ("HCHC", "012345678"), ("PTEC", "HP.."), ("ADCO", "012345678901"))],
+    "bad checksum": [hist_group("PAPP", "00750", "!").strip(b"\n")],
+    "relaxed label, bad checksum": [hist_group("PTEC", "HP..", "!").strip(b"\n")],
+}
+
+def main():
+    sess = make_session()
+    sess.mode = MODE_HISTORIC
+    for name, lines in CASES.items():
+        lines = lines * (1000 // len(lines))
+        ref = timeit.timeit(lambda: [sess.parse_line(l.decode("latin-1")) for l in lines], number=50) / 50 / len(lines)
+        new = timeit.timeit(lambda: [sess.parse_line_bytes(l) for l in lines], number=50) / 50 / len(lines)
+        print(f"{name:28s} str {ref * 1e6:5.2f} us/line  bytes {new * 1e6:5.2f} us/line  x{ref / new:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# End-to-end cost per stage: parse (_FrameAssembler), publish (+ MqttPublisher with
+# a counting sender as stub MQTT), entity (+ a frame consumer doing the entity
+# conversions and change checks of sensor.py, which needs Home Assistant itself),
+# then the replay source at full speed through TeleinfoSession.start()
+#   python -m tests.benchmarks.bench_pipeline [capture.bin]
+import asyncio, itertools, sys, time, tracemalloc
+
+from custom_components.teleinfo_gateway import _FrameAssembler, _TeleinfoProto
+from custom_components.teleinfo_gateway.labels import ENTITY_LABELS
+from custom_components.teleinfo_gateway.publisher import MqttPublisher
+from custom_components.teleinfo_gateway.replay import SOURCE_REPLAY, SOURCE_SIMULATE, synthetic_frames
+
+from tests.common import make_session
+
+N = 2000
+
+class EntityStage:
+    # Per-frame work of TeleinfoEntityManager._handle_frame, minus the HA state writes
+    def __init__(self):
+        self.values = {}
+        self.writes = 0
+
+    def __call__(self, frame):
+        meta = frame.get("_meta")
+        rejected = meta.get("rejected", ()) if meta is not None else ()
+        for label, raw in frame.fields():
+            desc = ENTITY_LABELS.get(label)
+            if desc is None or label in rejected:
+                continue
+            try:
+                value = desc.convert(raw)
+            except (TypeError, ValueError):
+                continue
+            if self.values.get(label) != value:
+                self.values[label] = value
+                self.writes += 1
+
+async def stage(name: str, frames: list):
+    sent = 0
+    async def send(topic, payload, retain):
+        nonlocal sent
+        sent += 1
+    pub = MqttPublisher(send, max_batches=len(frames))
+    pub.acquire()
+    sess = make_session(pub)
+    if name == "parse":
+        feed = _FrameAssembler(sess).feed
+    else:
+        feed = _TeleinfoProto(sess).data_received
+    entities = None
+    if name == "entity":
+        entities = EntityStage()
+        sess.async_subscribe(entities)
+    # Warm-up: layouts, interned values, integrity state
+    for data in frames[:100]:
+        feed(data)
+    frames = frames[100:]
+    while pub.queue_depth:
+        await asyncio.sleep(0)
+    sent = 0
+    if entities is not None:
+        entities.writes = 0
+    cpu, t = time.process_time(), time.perf_counter()
+    for data in frames:
+        feed(data)
+    while pub.queue_depth:
+        await asyncio.sleep(0)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - t
+    msgs = sent
+    extra = f"  {entities.writes / len(frames):4.1f} writes/frame" if entities is not None else ""
+    # Allocation peak of each frame, in a second pass (tracemalloc slows everything down)
+    tracemalloc.start()
+    peak = 0
+    for data in frames:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        feed(data)
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    await pub.async_release()
+    n = len(frames)
+    print(f"{name:8s} {n / wall:8.0f} frames/s  {cpu / n * 1e6:6.1f} us CPU/frame"
+          f"  {peak / n:7.0f} B alloc/frame  {msgs / n:4.1f} MQTT msgs/frame{extra}")
+
+async def end_to_end(source: str, path: str, secs: float = 2.0):
+    sent = 0
+    async def send(topic, payload, retain):
+        nonlocal sent
+        sent += 1
+    pub = MqttPublisher(send, max_batches=64)
+    sess = make_session(pub, source=source, port=path, replay_realtime=False)
+    sess.async_subscribe(EntityStage())
+    await sess.start()
+    cpu = time.process_time()
+    await asyncio.sleep(secs)
+    cpu = time.process_time() - cpu
+    n = sess.frames_valid
+    await sess.async_close()
+    print(f"{source} at full speed: {n / secs:.0f} frames/s  {cpu / max(n, 1) * 1e6:.1f} us CPU/frame"
+          f"  {sent / max(n, 1):.1f} MQTT msgs/frame")
+
+def main(argv):
+    if argv:
+        # Raw capture: replayed in a loop, cut into frames for the stage runs
+        data = open(argv[0], "rb").read()
+        one = [b"\x02" + f for f in data.split(b"\x02")[1:]]
+        frames = list(itertools.islice(itertools.cycle(one), N + 100))
+    else:
+        frames = list(itertools.islice(synthetic_frames(), N + 100))
+    for name in ("parse", "publish", "entity"):
+        asyncio.run(stage(name, frames))
+    asyncio.run(end_to_end(SOURCE_REPLAY, argv[0]) if argv else end_to_end(SOURCE_SIMULATE, "sim"))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
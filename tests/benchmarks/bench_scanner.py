@@ -0,0 +1,42 @@
+# Frame scanner: per-byte loop vs the chunked bytes.find scanner (_FrameAssembler.feed)
+#   python -m tests.benchmarks.bench_scanner [capture.bin]
+import itertools, sys, timeit
+
+from custom_components.teleinfo_gateway import _FrameAssembler
+from custom_components.teleinfo_gateway.replay import synthetic_frames
+
+from tests.common import make_session, std_frame
+from tests.test_scanner import PerByteScanner
+
+class _ScanOnly(_FrameAssembler):
+    # Framing only: frames are collected, not parsed
+    def _frame_received(self):
+        self.results.append((self.frame_lines, self.lines, None))
+        self.lines = []
+
+def chunked(data: bytes, scanner, size: int):
+    for i in range(0, len(data), size):
+        scanner(data[i:i + size])
+
+def main(argv):
+    if argv:
+        captures = [(argv[0], open(argv[0], "rb").read())]
+    else:
+        captures = [
+            ("historic x500", b"".join(itertools.islice(synthetic_frames(), 500))),
+            ("standard x100", std_frame() * 100),
+        ]
+    for name, data in captures:
+        ref = PerByteScanner()
+        ref.feed(data)
+        frames = len(ref.frames)
+        print(f"{name}: {len(data)} bytes, {frames} frames")
+        sess = make_session()
+        for size in (16, 64, 512, 4096):
+            ref = timeit.timeit(lambda: chunked(data, PerByteScanner().feed, size), number=5) / 5
+            new = timeit.timeit(lambda: chunked(data, _ScanOnly(sess).feed, size), number=5) / 5
+            print(f"  chunk {size:5d}: per-byte {ref / frames * 1e6:8.1f} us/frame"
+                  f"  chunked {new / frames * 1e6:7.1f} us/frame  x{ref / new:.1f}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
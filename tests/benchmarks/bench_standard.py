@@ -0,0 +1,35 @@
+# Standard-mode parse throughput, per line and per frame, against the 9600 baud line rate
+#   python -m tests.benchmarks.bench_standard [standard_capture.bin]
+import sys, time
+
+from custom_components.teleinfo_gateway.tic import MODE_STANDARD
+
+from tests.common import RecordingPublisher, feed, make_session, std_frame
+
+# 9600 baud, 7E1: 10 bits per byte
+LINE_RATE = 9600 / 10
+
+def main(argv):
+    data = open(argv[0], "rb").read() if argv else b"".join(std_frame(sinsts=300 + i % 2700) for i in range(1000))
+    sess = make_session(tic_mode=MODE_STANDARD, baud=9600, mqtt_enable=False)
+    lines = [l for l in data.replace(b"\x02", b"\n").replace(b"\x03", b"\n").split(b"\n") if l]
+    for name, fn in (
+        ("parse_line(str)", lambda l: sess.parse_line(l.decode("latin-1"))),
+        ("parse_line_bytes", sess.parse_line_bytes),
+    ):
+        t = time.perf_counter()
+        for l in lines:
+            fn(l)
+        dt = time.perf_counter() - t
+        print(f"{name:18s} {dt / len(lines) * 1e6:6.2f} us/line  {len(lines) / dt:9.0f} lines/s")
+    for mqtt in (False, True):
+        sess = make_session(tic_mode=MODE_STANDARD, baud=9600, mqtt_enable=mqtt, publisher=RecordingPublisher())
+        t = time.perf_counter()
+        feed(sess, [data[i:i + 512] for i in range(0, len(data), 512)])
+        dt = time.perf_counter() - t
+        n = sess.frames_valid
+        print(f"frames, mqtt={'on ' if mqtt else 'off'}    {dt / n * 1e6:6.1f} us/frame  {n / dt:9.0f} frames/s"
+              f"  x{len(data) / dt / LINE_RATE:.0f} the line rate")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+# Setup cost: package and serial module import times, and how long start() holds the
+# caller (async_setup_entry) in the foreground vs the background mode
+#   python -m tests.benchmarks.bench_startup [capture.bin]
+import asyncio, logging, os, statistics, subprocess, sys, tempfile, time
+
+from custom_components.teleinfo_gateway.replay import SOURCE_REPLAY, SOURCE_SERIAL
+
+from tests.common import capture, make_session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def import_time(module: str, runs: int = 5) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return statistics.median(
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout)
+        for _ in range(runs)
+    )
+
+async def start(source: str, port: str, background: bool) -> tuple:
+    sess = make_session(source=source, port=port, replay_realtime=False)
+    t = time.perf_counter()
+    err = None
+    try:
+        await sess.start(background=background)
+    except Exception as e:
+        err = type(e).__name__
+    held = time.perf_counter() - t
+    # Time to the first frame, when there is one
+    first = None
+    while time.perf_counter() - t < 1 and not sess.frames_valid:
+        await asyncio.sleep(0.001)
+    if sess.frames_valid:
+        first = time.perf_counter() - t
+    if err is None:
+        await sess.async_close()
+    return held, err, first
+
+def main(argv):
+    logging.disable(logging.WARNING)
+    print(f"import custom_components.teleinfo_gateway: {import_time('custom_components.teleinfo_gateway') * 1e3:.1f} ms")
+    print(f"import serial_asyncio (now in an executor, on first open): {import_time('serial_asyncio') * 1e3:.1f} ms")
+    with tempfile.NamedTemporaryFile(suffix=".bin") as f:
+        if argv:
+            path = argv[0]
+        else:
+            f.write(capture(20))
+            f.flush()
+            path = f.name
+        for source, port in ((SOURCE_REPLAY, path), (SOURCE_SERIAL, "/nonexistent/ttyTIC")):
+            for background in (False, True):
+                held, err, first = asyncio.run(start(source, port, background))
+                print(f"{source:7s} {'background' if background else 'foreground'}: start() holds the caller {held * 1e3:7.3f} ms"
+                      + (f", first frame after {first * 1e3:.1f} ms" if first is not None else "")
+                      + (f" ({err})" if err else ""))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+# Tariff engine: PTEC table lookup vs the former ptec_friendly, and the per-frame cost
+# of the period/cost update, which must stay flat however long the session runs
+#   python -m tests.benchmarks.bench_tariff
+import itertools, time, timeit
+
+from custom_components.teleinfo_gateway.analytics import MeterAnalytics
+from custom_components.teleinfo_gateway.replay import synthetic_frames
+from custom_components.teleinfo_gateway.tariff import parse_prices, ptec_period
+
+from tests.common import feed, make_session
+from tests.test_tariff import former_ptec_friendly
+
+PRICES = "hc=0.2068, hp=0.2700, hc_bleu=0.1296, hp_bleu=0.1609"
+
+def main():
+    codes = ["HC..", "HP..", "HPJB", "TH.."]
+    n = 200000
+    for name, fn in (("former ptec_friendly", former_ptec_friendly), ("ptec_period", ptec_period)):
+        t = timeit.timeit(lambda: [fn(c) for c in codes], number=n // len(codes)) / n
+        print(f"{name:22s} {t * 1e9:6.0f} ns/lookup")
+
+    a = MeterAnalytics(parse_prices(PRICES))
+    hchc, hchp = 1_000_000, 2_000_000
+    step = 0
+    print("MeterAnalytics.update, per frame:")
+    for block in (1000, 10000, 100000):
+        t = time.perf_counter()
+        for _ in range(block):
+            step += 1
+            hc = (step // 600) % 2 == 0
+            if hc:
+                hchc += 1
+            else:
+                hchp += 1
+            a.update({"HCHC": str(hchc), "HCHP": str(hchp), "PAPP": "00750", "IINST": "003"},
+                     ptec_period("HC.." if hc else "HP..").short, step * 1.5)
+        dt = time.perf_counter() - t
+        print(f"  after {step:6d} frames: {dt / block * 1e6:5.2f} us")
+
+    print("whole frame with analytics and prices, per frame:")
+    sess = make_session(analytics=True, prices=parse_prices(PRICES), mqtt_enable=False)
+    frames = synthetic_frames()
+    total = 0
+    for block in (1000, 10000, 50000):
+        data = list(itertools.islice(frames, block))
+        t = time.perf_counter()
+        feed(sess, data)
+        dt = time.perf_counter() - t
+        total += block
+        print(f"  after {total:6d} frames: {dt / block * 1e6:5.1f} us")
+
+if __name__ == "__main__":
+    main()
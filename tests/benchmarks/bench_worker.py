@@ -0,0 +1,58 @@
+# Event loop occupancy per frame, parse_mode inline vs thread: time spent on the
+# loop in data_received and in the dispatch of parsed results. Chunks are fed as
+# fast as possible, so the worker hands back large batches (one frame each at line rate).
+#   python -m tests.benchmarks.bench_worker [capture.bin]
+import asyncio, itertools, sys, time
+
+from custom_components.teleinfo_gateway import _TeleinfoProto
+from custom_components.teleinfo_gateway.const import PARSE_INLINE, PARSE_THREAD
+from custom_components.teleinfo_gateway.metrics import SessionMetrics
+from custom_components.teleinfo_gateway.replay import synthetic_frames
+
+from tests.common import make_session
+
+async def run(parse_mode: str, data: bytes, chunk: int, **kw):
+    sess = make_session(parse_mode=parse_mode, **kw)
+    frames = 0
+    def count(_frame):
+        nonlocal frames
+        frames += 1
+    sess.async_subscribe(count)
+    proto = _TeleinfoProto(sess)
+    busy, longest = 0.0, 0.0
+    def timed(fn):
+        def wrapper(arg):
+            nonlocal busy, longest
+            t = time.perf_counter()
+            fn(arg)
+            dt = time.perf_counter() - t
+            busy += dt
+            longest = max(longest, dt)
+        return wrapper
+    data_received = timed(proto.data_received)
+    if proto.worker is not None:
+        proto.worker._deliver = timed(proto._deliver)
+    expected = data.count(b"\x03")
+    t = time.perf_counter()
+    for i in range(0, len(data), chunk):
+        data_received(data[i:i + chunk])
+        # The serial transport hands chunks over from separate loop iterations
+        await asyncio.sleep(0)
+    while frames < expected:
+        await asyncio.sleep(0.001)
+    wall = time.perf_counter() - t
+    proto.connection_lost(None)
+    batches = f"  {proto.worker.batches} batches" if proto.worker is not None else ""
+    print(f"  {parse_mode:6s} loop {busy / frames * 1e6:6.1f} us/frame, longest callback {longest * 1e3:5.2f} ms,"
+          f" {frames / wall:6.0f} frames/s{batches}")
+
+def main(argv):
+    data = open(argv[0], "rb").read() if argv else b"".join(itertools.islice(synthetic_frames(), 2000))
+    for chunk in (64, 4096):
+        for name, kw in (("plain", {}), ("analytics + metrics", {"analytics": True, "metrics": SessionMetrics()})):
+            print(f"chunks of {chunk} bytes, {name}")
+            for mode in (PARSE_INLINE, PARSE_THREAD):
+                asyncio.run(run(mode, data, chunk, **kw))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import random
+from typing import Callable, Iterable, List, Tuple
+
+from custom_components.teleinfo_gateway import TeleinfoSession, _TeleinfoProto
+
+# -----------------------------
+# Helpers shared by the tests and the benchmarks (tests/benchmarks)
+# -----------------------------
+# Everything runs without Home Assistant: the session is built with hass=None,
+# as cli.py does, and MQTT messages are recorded instead of sent.
+
+STX, ETX = b"\x02", b"\x03"
+
+def hist_group(label: str, value: str, chk: str | None = None) -> bytes:
+    s = f"{label} {value}"
+    if chk is None:
+        chk = chr((sum(map(ord, s)) & 0x3F) + 0x20)
+    return f"\n{s} {chk}\r".encode("latin-1")
+
+def std_group(label: str, value: str, horodate: str | None = None) -> bytes:
+    s = f"{label}\t{horodate}\t{value}\t" if horodate is not None else f"{label}\t{value}\t"
+    return f"\n{s}{chr((sum(map(ord, s)) & 0x3F) + 0x20)}\r".encode("latin-1")
+
+def hist_frame(adco: str = "012345678901", papp: int = 750, hchc: int = 12345678, hchp: int = 9876543,
+               ptec: str = "HP..", bad: Iterable[str] = ()) -> bytes:
+    # bad: labels sent with a wrong checksum
+    fields = (
+        ("ADCO", adco), ("OPTARIF", "HC.."), ("ISOUSC", "45"), ("HCHC", f"{hchc:09d}"),
+        ("HCHP", f"{hchp:09d}"), ("PTEC", ptec), ("IINST", f"{papp // 230:03d}"), ("IMAX", "090"),
+        ("PAPP", f"{papp:05d}"), ("HHPHC", "A"), ("MOTDETAT", "000000"),
+    )
+    bad = set(bad)
+    return STX + b"".join(hist_group(l, v, "!" if l in bad else None) for l, v in fields) + ETX
+
+def std_frame(adsc: str = "041876097467", sinsts: int = 750, east: int = 12345678, ts: str = "E231017120000") -> bytes:
+    return STX + b"".join((
+        std_group("ADSC", adsc),
+        std_group("VTIC", "02"),
+        std_group("DATE", "", ts),
+        std_group("NGTF", "H PLEINE/CREUSE "),
+        std_group("LTARF", "HEURE  PLEINE   "),
+        std_group("EAST", f"{east:09d}"),
+        std_group("EASF01", f"{east // 2:09d}"),
+        std_group("EASF02", f"{east - east // 2:09d}"),
+        std_group("IRMS1", f"{sinsts // 230:03d}"),
+        std_group("URMS1", "231"),
+        std_group("PREF", "09"),
+        std_group("PCOUP", "09"),
+        std_group("SINSTS", f"{sinsts:05d}"),
+        std_group("SMAXSN", f"{sinsts + 100:05d}", ts),
+        std_group("NTARF", "02"),
+        std_group("NJOURF", "00"),
+        std_group("MSG1", "PAS DE          MESSAGE         "),
+        std_group("RELAIS", "000"),
+        std_group("STGE", "003A0001"),
+    )) + ETX
+
+def capture(n: int, frame: Callable[..., bytes] = hist_frame, **kw) -> bytes:
+    # n frames with a moving load, as a raw port capture
+    return b"".join(frame(**kw, **({"papp": 300 + i * 37 % 2700} if frame is hist_frame else {"sinsts": 300 + i * 37 % 2700})) for i in range(n))
+
+def mutate(data: bytes, rng: random.Random, n: int = 6, alphabet: bytes = b"\x00\x02\x03\t\n\r A\xff") -> bytes:
+    # A few random byte substitutions, including framing bytes
+    b = bytearray(data)
+    for _ in range(rng.randint(0, n)):
+        b[rng.randrange(len(b))] = rng.choice(alphabet)
+    return bytes(b)
+
+def split(data: bytes, rng: random.Random, max_cuts: int = 20) -> List[bytes]:
+    # Random chunking, as a serial port hands them over
+    cuts = sorted(rng.sample(range(1, len(data)), min(len(data) - 1, rng.randint(0, max_cuts))))
+    return [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+
+class RecordingPublisher:
+    # Stands in for MqttPublisher: same interface, messages kept in order
+    def __init__(self):
+        self.streams: set = set()
+        self.messages: List[Tuple[str, str | bytes, bool]] = []
+        self.batches = 0
+        self.users = 0
+
+    def publish_batch(self, batch, ack=None):
+        self.batches += 1
+        self.messages.extend(batch)
+        if ack is not None:
+            ack()
+
+    def publish(self, topic, payload, retain=False):
+        self.publish_batch([(topic, payload, retain)])
+
+    def acquire(self):
+        self.users += 1
+
+    async def async_release(self):
+        self.users -= 1
+
+    async def async_publish_many(self, messages, limit):
+        messages = list(messages)
+        self.messages.extend(messages)
+        return [True] * len(messages)
+
+    def topic(self, topic: str) -> list:
+        return [p for t, p, _r in self.messages if t == topic]
+
+def make_session(publisher=None, **kw) -> TeleinfoSession:
+    args = dict(
+        port="test", baud=1200, bits=7, parity="E", stopbits=1, timeout=1, decode="latin-1",
+        relaxed_labels={"PTEC"}, tic_mode="historic", watchdog=0,
+        mqtt_enable=True, topic_line="teleinfo/line", topic_json="teleinfo/json", topic_fields="teleinfo/fields",
+        topic_invalid="teleinfo/invalid", topic_derived="teleinfo/derived",
+        ha_discovery=False, ha_discovery_prefix="homeassistant", ha_device_name="", include_wh=False,
+        dedup_groups=set(), dedup_heartbeat=0,
+        publisher=publisher if publisher is not None else RecordingPublisher(),
+    )
+    args.update(kw)
+    return TeleinfoSession(None, **args)
+
+def feed(session: TeleinfoSession, chunks: Iterable[bytes]) -> _TeleinfoProto:
+    # Inline parse mode only: the thread mode needs a running loop (see test_worker)
+    proto = _TeleinfoProto(session)
+    for chunk in chunks:
+        proto.data_received(chunk)
+    return proto
+
+def frames_of(session: TeleinfoSession) -> list:
+    # Subscribe before feeding; returns the list the frames are appended to (as dicts)
+    out = []
+    session.async_subscribe(lambda f: out.append(f.as_dict()))
+    return out
@@ -0,0 +1,27 @@
+from custom_components.teleinfo_gateway.analytics import MeterAnalytics
+
+from tests.common import feed, hist_frame, make_session
+
+def test_failed_ptec_books_under_the_last_good_period():
+    a = MeterAnalytics()
+    a.update({"HCHC": "1000", "HCHP": "5000"}, "HC", 0.0)
+    # PTEC failed its checksum: not in valid, no period for this frame
+    values = a.update({"HCHC": "1300", "HCHP": "5000"}, None, 1.0)
+    assert values["energy_day_hc"] == 300
+    assert not [k for k in values if k.startswith(("energy_day_hchc", "energy_day_hchp"))]
+
+def test_no_period_yet_keeps_the_baseline():
+    a = MeterAnalytics()
+    a.update({"HCHC": "1000"}, None, 0.0)
+    values = a.update({"HCHC": "1200"}, None, 1.0)
+    assert not [k for k in values if k.startswith("energy_day_")]
+    # The first good PTEC gets the energy since the first reading
+    values = a.update({"HCHC": "1500"}, "HC", 2.0)
+    assert values["energy_day_hc"] == 500
+
+def test_session_with_a_corrupted_ptec():
+    sess = make_session(analytics=True)
+    feed(sess, [hist_frame(hchc=1000, ptec="HC..") + hist_frame(hchc=1400, ptec="HC..", bad={"PTEC"})])
+    derived = {t.rsplit("/", 1)[1] for t, _p, _r in sess.publisher.messages if t.startswith("teleinfo/derived/")}
+    assert sess.publisher.topic("teleinfo/derived/energy_day_hc") == ["400"]
+    assert not [k for k in derived if k.startswith("energy_day_h") and k not in ("energy_day_hc", "energy_day_hp")]
@@ -0,0 +1,38 @@
+from custom_components.teleinfo_gateway.const import DEDUP_DERIVED, DEDUP_FIELDS
+
+from tests.common import feed, hist_frame, make_session
+
+def test_heartbeat():
+    sess = make_session(dedup_heartbeat=300)
+    topic = "teleinfo/fields/PAPP"
+    assert sess.changed(topic, "00750", 0.0)
+    # Unchanged: suppressed until the heartbeat expires, counted from the last publish
+    assert not sess.changed(topic, "00750", 1.0)
+    assert not sess.changed(topic, "00750", 299.9)
+    assert sess.changed(topic, "00750", 300.0)
+    assert not sess.changed(topic, "00750", 599.0)
+    # A new value always goes out, and restarts the heartbeat
+    assert sess.changed(topic, "00760", 400.0)
+    assert not sess.changed(topic, "00760", 699.0)
+    assert sess.changed(topic, "00750", 699.5)
+
+def test_topics_are_independent():
+    sess = make_session(dedup_heartbeat=300)
+    assert sess.changed("teleinfo/fields/PAPP", "1", 0.0)
+    assert sess.changed("teleinfo/fields/IINST", "1", 0.0)
+    assert not sess.changed("teleinfo/fields/PAPP", "1", 1.0)
+
+def test_session_publishes_changes_only():
+    sess = make_session(dedup_groups={DEDUP_FIELDS, DEDUP_DERIVED}, dedup_heartbeat=300)
+    feed(sess, [hist_frame(papp=100) + hist_frame(papp=100) + hist_frame(papp=200)])
+    pub = sess.publisher
+    assert pub.topic("teleinfo/fields/PAPP") == ["00100", "00200"]
+    assert pub.topic("teleinfo/fields/HCHC") == ["012345678"]
+    assert pub.topic("teleinfo/derived/ptec_friendly") == ["Heures Pleines"]
+    # The whole frame is never deduplicated
+    assert len(pub.topic("teleinfo/json")) == 3
+
+def test_without_dedup_every_frame_is_published():
+    sess = make_session()
+    feed(sess, [hist_frame(papp=100) * 3])
+    assert sess.publisher.topic("teleinfo/fields/PAPP") == ["00100"] * 3
@@ -0,0 +1,69 @@
+import asyncio
+
+from tests.common import RecordingPublisher, feed, hist_frame, make_session
+
+ADCO = "012345678901"
+
+class FailingPublisher(RecordingPublisher):
+    # The first `fail` discovery publishes are refused
+    def __init__(self, fail: int):
+        super().__init__()
+        self.fail = fail
+
+    async def async_publish_many(self, messages, limit):
+        messages = list(messages)
+        results = []
+        for m in messages:
+            ok = self.fail <= 0
+            self.fail -= 1
+            if ok:
+                self.messages.append(m)
+            results.append(ok)
+        return results
+
+def configs(publisher) -> list:
+    return [t for t, _p, r in publisher.messages if r and t.endswith("/config")]
+
+async def _announce(sess, *frames):
+    feed(sess, frames)
+    while sess._discovery_tasks:
+        await asyncio.gather(*list(sess._discovery_tasks))
+
+def test_unchanged_configs_are_not_sent_again():
+    hashes = {}
+    async def run(**kw):
+        sess = make_session(ha_discovery=True, discovery_hashes=hashes, **kw)
+        await _announce(sess, hist_frame())
+        return configs(sess.publisher)
+    first = asyncio.run(run())
+    assert len(first) > 5 and set(hashes) == set(first)
+    # Same configs (hashes of what the broker retains): nothing sent
+    assert asyncio.run(run()) == []
+    # Another device name changes every config
+    assert sorted(asyncio.run(run(ha_device_name="Maison"))) == sorted(first)
+
+def test_failed_configs_are_retried():
+    async def run():
+        sess = make_session(FailingPublisher(fail=2), ha_discovery=True)
+        await _announce(sess, hist_frame())
+        sent = configs(sess.publisher)
+        announced = set(sess._discovered[ADCO])
+        await _announce(sess, hist_frame())
+        return sess, sent, announced
+    sess, sent, announced = asyncio.run(run())
+    retried = configs(sess.publisher)[len(sent):]
+    # Only the labels of the two refused configs, once more
+    assert 1 <= len(retried) <= 2 and not set(retried) & set(sent)
+    assert sess._discovered[ADCO] > announced and not sess._discovery_pending[ADCO]
+    assert set(sess.discovery_hashes) == set(sent) | set(retried)
+
+def test_republish_ignores_the_hashes():
+    async def run():
+        sess = make_session(ha_discovery=True)
+        await _announce(sess, hist_frame())
+        n = len(configs(sess.publisher))
+        sess.republish_discovery()
+        await _announce(sess)
+        return n, configs(sess.publisher)
+    n, sent = asyncio.run(run())
+    assert len(sent) == 2 * n and sorted(sent[n:]) == sorted(sent[:n])
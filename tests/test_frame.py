@@ -0,0 +1,57 @@
+import pytest
+
+from custom_components.teleinfo_gateway.frame import Frame, frame_layout, intern_value
+
+from tests.common import ETX, STX, feed, hist_frame, hist_group, make_session
+
+def test_mapping():
+    layout = frame_layout(("ADCO", "PTEC", "PAPP"))
+    frame = Frame(layout, ["012345678901", "HP..", None])
+    assert dict(frame) == frame.as_dict() == {"ADCO": "012345678901", "PTEC": "HP.."}
+    assert len(frame) == 2 and list(frame) == ["ADCO", "PTEC"]
+    # A left-out value is absent, not None
+    assert "PAPP" not in frame and frame.get("PAPP", "-") == "-"
+    with pytest.raises(KeyError):
+        frame["PAPP"]
+    with pytest.raises(KeyError):
+        frame["_meta"]
+    frame.meta = {"invalid_lines": 1}
+    assert list(frame) == ["ADCO", "PTEC", "_meta"]
+    assert frame["_meta"] == {"invalid_lines": 1} and "_meta" not in dict(frame.fields())
+    assert frame == {"ADCO": "012345678901", "PTEC": "HP..", "_meta": {"invalid_lines": 1}}
+
+def test_layout_is_shared():
+    labels = ("ADCO", "HCHC", "PTEC", "PAPP")
+    layout = frame_layout(labels)
+    assert frame_layout(tuple(list(labels))) is layout
+    assert layout.present == set(labels)
+    assert layout.discovery <= layout.present and "PAPP" in layout.discovery
+    assert "XYZ" not in frame_layout(labels + ("XYZ",)).discovery
+
+def test_interned_values():
+    a, b = "".join(["HP", ".."]), "".join(["H", "P.."])
+    assert a is not b
+    assert intern_value("PTEC", a) is intern_value("PTEC", b)
+    # High-cardinality values are left alone
+    assert intern_value("PAPP", "".join(["007", "50"])) is not intern_value("PAPP", "".join(["00", "750"]))
+
+def test_frames_from_the_link():
+    sess = make_session()
+    frames = []
+    sess.async_subscribe(frames.append)
+    feed(sess, [hist_frame(papp=100) + hist_frame(papp=200)])
+    first, second = frames
+    assert first.layout is second.layout
+    assert first["PTEC"] is second["PTEC"]
+    assert (first["PAPP"], second["PAPP"]) == ("00100", "00200")
+    assert first.meta is None and "_meta" not in first
+
+def test_repeated_label():
+    # First position, last value, as a dict would keep them
+    data = STX + hist_group("ADCO", "012345678901") + hist_group("PAPP", "00100") + hist_group("PTEC", "HP..") + hist_group("PAPP", "00200") + ETX
+    sess = make_session()
+    frames = []
+    sess.async_subscribe(frames.append)
+    feed(sess, [data])
+    (frame,) = frames
+    assert list(frame) == ["ADCO", "PAPP", "PTEC"] and frame["PAPP"] == "00200"
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from custom_components.teleinfo_gateway import frame_json
+from custom_components.teleinfo_gateway.frame_json import _frame_stdlib, encode_invalid
+
+from tests.common import feed, hist_frame, make_session
+
+FRAMES = [
+    {},
+    {"ADCO": "012345678901", "PTEC": "HP..", "PAPP": "00750", "HCHC": "012345678"},
+    {"MSG1": "Coupure prévue \"demain\"\t\\", "PAPP": "0x750"},
+    {"_meta": {"invalid_lines": 2, "rejected": {"PAPP": "checksum"}}, "PAPP": "00750", "ADCO": "012345678901"},
+]
+
+def reference(frame, numeric=False):
+    # Former path: "_meta" always first, json.dumps(ensure_ascii=False)
+    obj = {"_meta": frame.get("_meta") or {"invalid_lines": 0}}
+    for k, v in frame.items():
+        if k != "_meta":
+            obj[k] = int(v) if numeric and k in ("PAPP", "HCHC") and v.isdigit() else v
+    return obj
+
+@pytest.mark.parametrize("frame", FRAMES)
+def test_stdlib_is_byte_identical(frame):
+    assert _frame_stdlib(frame) == json.dumps(reference(frame), ensure_ascii=False)
+
+@pytest.mark.parametrize("frame", FRAMES)
+def test_numeric(frame):
+    assert json.loads(_frame_stdlib(frame, True)) == reference(frame, True)
+
+@pytest.mark.skipif(frame_json.orjson is None, reason="orjson not installed")
+@pytest.mark.parametrize("frame", FRAMES)
+def test_orjson_same_document(frame):
+    for numeric in (False, True):
+        out = frame_json._frame_orjson(frame, numeric)
+        assert isinstance(out, bytes)
+        assert list(json.loads(out).items()) == list(json.loads(_frame_stdlib(frame, numeric)).items())
+
+def test_invalid_report():
+    raw = 'PAPP 00"7\\50 é'
+    hexdump = raw.encode("latin-1").hex(" ").upper()
+    assert encode_invalid("PAPP", raw, hexdump) == json.dumps({"label": "PAPP", "raw": raw, "hex": hexdump}, ensure_ascii=False)
+
+def test_published_frame():
+    sess = make_session(json_numeric=True)
+    feed(sess, [hist_frame(papp=750, bad={"IINST"})])
+    (payload,) = sess.publisher.topic("teleinfo/json")
+    doc = json.loads(payload)
+    assert next(iter(doc)) == "_meta"
+    assert doc["_meta"] == {"invalid_lines": 0, "rejected": {"IINST": "checksum"}}
+    assert doc["PAPP"] == 750 and doc["ADCO"] == "012345678901"
+    (report,) = sess.publisher.topic("teleinfo/invalid")
+    assert json.loads(report)["label"] == "IINST"
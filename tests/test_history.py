@@ -0,0 +1,110 @@
+import asyncio, json, logging
+
+from custom_components.teleinfo_gateway.history import _HEADER, _MAGIC, _RAW, HistoryStore, RingFile
+
+from tests.common import feed, hist_frame, make_session
+
+T0 = 1_700_000_040
+
+def test_record_layout(tmp_path):
+    ring = RingFile(str(tmp_path / "raw.ring"), _RAW, 4)
+    ring.open()
+    ring.append([(T0, 0, 750), (T0 + 2, 1, 12345678)])
+    ring.close()
+    data = (tmp_path / "raw.ring").read_bytes()
+    assert len(data) == _HEADER.size + 4 * _RAW.size
+    assert _HEADER.unpack_from(data) == (_MAGIC, 10, 4, 2, 2)
+    assert data[_HEADER.size:_HEADER.size + 2 * _RAW.size] == _RAW.pack(T0, 0, 750) + _RAW.pack(T0 + 2, 1, 12345678)
+
+def test_wrap_around(tmp_path):
+    ring = RingFile(str(tmp_path / "raw.ring"), _RAW, 4)
+    ring.open()
+    ring.append([(T0 + i, 0, i) for i in range(3)])
+    ring.append([(T0 + i, 0, i) for i in range(3, 6)])
+    assert (ring.head, ring.count) == (2, 4)
+    # Oldest first, across the end of the file
+    assert [v for _ts, _k, v in ring.read()] == [2, 3, 4, 5]
+    assert [v for _ts, _k, v in ring.read(last=3)] == [3, 4, 5]
+    # More records than the capacity: the newest ones are kept
+    ring.append([(T0 + i, 0, i) for i in range(6, 16)])
+    assert [v for _ts, _k, v in ring.read()] == [12, 13, 14, 15]
+    ring.close()
+
+def test_minute_aggregates(tmp_path):
+    async def run():
+        store = HistoryStore(str(tmp_path))
+        await store.async_load()
+        for i, papp in enumerate((700, 900, 800)):
+            store.add(T0 + 10 * i, {"PAPP": papp, "HCHC": 1000 + i})
+        # Next minute: the first one is closed
+        store.add(T0 + 60, {"PAPP": 500, "HCHC": 1003})
+        store.add(T0 + 61, {"PAPP": -1})
+        await store.async_flush(final=True)
+        minute = await store.async_query(0, T0 + 3600, True)
+        raw = await store.async_query(T0 + 60, T0 + 60, False)
+        await store.async_close()
+        return minute, raw
+    minute, raw = asyncio.run(run())
+    assert minute == [
+        {"ts": T0, "PAPP": {"min": 700, "max": 900, "mean": 800, "last": 800},
+         "HCHC": {"min": 1000, "max": 1002, "mean": 1001, "last": 1002}},
+        {"ts": T0 + 60, "PAPP": {"min": 500, "max": 500, "mean": 500, "last": 500},
+         "HCHC": {"min": 1003, "max": 1003, "mean": 1003, "last": 1003}},
+    ]
+    # Out of the u32 range: not recorded
+    assert raw == [{"ts": T0 + 60, "PAPP": 500, "HCHC": 1003}]
+
+def test_reload_after_restart(tmp_path):
+    async def run():
+        store = HistoryStore(str(tmp_path))
+        await store.async_load()
+        store.set_meta("adco", "012345678901")
+        store.add(T0, {"PAPP": 700, "HCHC": 1000})
+        store.add(T0 + 2, {"PAPP": 710})
+        await store.async_close()
+        store = HistoryStore(str(tmp_path))
+        await store.async_load()
+        store.add(T0 + 4, {"IINST": 3})
+        rows = await store.async_query(0, T0 + 60, False)
+        await store.async_close()
+        return store, rows
+    store, rows = asyncio.run(run())
+    assert store.meta == {"adco": "012345678901"}
+    assert store.last == {"PAPP": (T0 + 2, 710), "HCHC": (T0, 1000), "IINST": (T0 + 4, 3)}
+    assert rows == [{"ts": T0, "PAPP": 700, "HCHC": 1000}, {"ts": T0 + 2, "PAPP": 710}, {"ts": T0 + 4, "IINST": 3}]
+    assert json.loads((tmp_path / "keys.json").read_text())["keys"] == ["PAPP", "HCHC", "IINST"]
+
+def test_another_layout_starts_a_new_ring(tmp_path, caplog):
+    path = str(tmp_path / "raw.ring")
+    ring = RingFile(path, _RAW, 4)
+    ring.open()
+    ring.append([(T0, 0, 1)])
+    ring.close()
+    ring = RingFile(path, _RAW, 8)
+    with caplog.at_level(logging.WARNING):
+        ring.open()
+    assert "another layout" in caplog.text
+    assert (ring.head, ring.count, ring.read()) == (0, 0, [])
+    ring.close()
+    assert _HEADER.unpack_from((tmp_path / "raw.ring").read_bytes()) == (_MAGIC, 10, 8, 0, 0)
+
+def test_backfill(tmp_path):
+    async def run():
+        store = HistoryStore(str(tmp_path))
+        await store.async_load()
+        sess = make_session(history=store, multi_meter=True)
+        feed(sess, [hist_frame("111111111111", papp=700), hist_frame("222222222222", papp=900)])
+        n = await sess.async_backfill(0, 2 ** 32 - 1, False)
+        await store.async_close()
+        return sess, n
+    sess, n = asyncio.run(run())
+    # Integer entity fields only, keyed per meter
+    keys = json.loads((tmp_path / "keys.json").read_text())["keys"]
+    assert "111111111111/PAPP" in keys and "222222222222/HCHC" in keys
+    assert not [k for k in keys if k.endswith(("/ADCO", "/PTEC", "/OPTARIF"))]
+    # Rows of both meters (same second) split per meter
+    assert n == 2
+    for adco, papp in (("111111111111", 700), ("222222222222", 900)):
+        payload, = sess.publisher.topic(f"teleinfo/json/{adco}/backfill")
+        row = json.loads(payload)
+        assert row["PAPP"] == papp and row["HCHC"] == 12345678 and "ts" in row
@@ -0,0 +1,77 @@
+from custom_components.teleinfo_gateway.const import RAW_BLOCK
+from custom_components.teleinfo_gateway.integrity import (
+    POLICY_DROP, POLICY_KEEP_LAST, REBASE_AFTER, REBASE_MAX_STEP, REJECT_CURRENT_RANGE, REJECT_DROPPED,
+    REJECT_INDEX_ROLLBACK, AdcoGuard, MeterIntegrity,
+)
+from custom_components.teleinfo_gateway.metrics import SessionMetrics
+
+from tests.common import feed, frames_of, hist_frame, make_session
+
+def _rejected(state: MeterIntegrity, hchc: int) -> bool:
+    values = {"HCHC": str(hchc)}
+    bad = state.check(values)
+    state.accept({k: v for k, v in values.items() if k not in bad})
+    return bad.get("HCHC") == REJECT_INDEX_ROLLBACK
+
+def test_rollback_glitch_is_rejected():
+    state = MeterIntegrity()
+    assert [_rejected(state, v) for v in (1000, 1010, 12, 1020)] == [False, False, True, False]
+
+def test_rebase_after_consistent_readings():
+    # Meter replaced: a new, lower index that keeps going up
+    state = MeterIntegrity()
+    results = [_rejected(state, v) for v in [100000] + [500 + 10 * i for i in range(REBASE_AFTER + 1)]]
+    assert results == [False] + [True] * (REBASE_AFTER - 1) + [False, False]
+    assert state.index["HCHC"] == 500 + 10 * REBASE_AFTER
+
+def test_no_rebase_on_inconsistent_readings():
+    state = MeterIntegrity()
+    _rejected(state, 100000)
+    # Going down, or steps too large for the time between two frames
+    assert all(_rejected(state, v) for v in (900, 800, 700, 600))
+    assert all(_rejected(state, v) for v in (10, 10 + REBASE_MAX_STEP + 1, 20 + 2 * REBASE_MAX_STEP + 2))
+    assert state.index["HCHC"] == 100000
+
+def test_current_range():
+    state = MeterIntegrity()
+    assert state.check({"ISOUSC": "30", "IINST": "060"}) == {}
+    state.accept({"ISOUSC": "30", "IINST": "060"})
+    # ISOUSC is remembered from the last good frames
+    assert state.check({"IINST": "061"}) == {"IINST": REJECT_CURRENT_RANGE}
+
+def test_adco_guard():
+    guard = AdcoGuard()
+    assert guard.check("111111111111")
+    assert [guard.check("222222222222") for _ in range(REBASE_AFTER)] == [False] * (REBASE_AFTER - 1) + [True]
+    assert guard.adco == "222222222222"
+
+def test_state_survives_a_reconnect():
+    sess = make_session()
+    feed(sess, [hist_frame(hchc=5000)])
+    # New protocol, same session: the rollback is still caught
+    frames = frames_of(sess)
+    feed(sess, [hist_frame(hchc=4000)])
+    assert frames[0]["_meta"]["rejected"] == {"HCHC": REJECT_INDEX_ROLLBACK}
+
+def test_keep_last():
+    sess = make_session(integrity_policy=POLICY_KEEP_LAST)
+    frames = frames_of(sess)
+    feed(sess, [hist_frame(hchc=5000) + hist_frame(hchc=4000)])
+    assert frames[1]["HCHC"] == "000005000"
+
+def test_dropped_frame_still_mirrors_the_raw_block():
+    sess = make_session(integrity_policy=POLICY_DROP, raw_mode=RAW_BLOCK)
+    frames = frames_of(sess)
+    feed(sess, [hist_frame(papp=100) + hist_frame(papp=200, bad={"PAPP"})])
+    pub = sess.publisher
+    assert len(frames) == 1 and sess.rejections[REJECT_DROPPED] == 1
+    blocks = pub.topic("teleinfo/line")
+    assert len(blocks) == 2 and "PAPP 00200" in blocks[1]
+    assert len(pub.topic("teleinfo/json")) == 1 and len(pub.topic("teleinfo/invalid")) == 1
+
+def test_dropped_frames_are_counted_in_the_metrics():
+    sess = make_session(integrity_policy=POLICY_DROP, metrics=SessionMetrics())
+    feed(sess, [hist_frame(papp=100, bad={"PAPP"}) * 3])
+    m = sess.metrics
+    assert sess.rejections["checksum"] == 3
+    assert m.checksum_failures == {"PAPP": 3} and m.frames == 3 and m.lines == 33
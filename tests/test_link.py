@@ -0,0 +1,95 @@
+import asyncio, os, time
+
+import pytest
+
+import custom_components.teleinfo_gateway as teleinfo
+
+from tests.common import hist_frame, make_session
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+
+class FakePort:
+    # pty pair standing in for the serial port: frames are written on the master side
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.name = os.ttyname(self.slave)
+
+    async def send(self, n: int, period: float = 0.05):
+        for _ in range(n):
+            os.write(self.master, hist_frame())
+            await asyncio.sleep(period)
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+@pytest.fixture
+def port(monkeypatch):
+    monkeypatch.setattr(teleinfo, "RECONNECT_MIN", 0.05)
+    p = FakePort()
+    yield p
+    p.close()
+
+async def _until(cond, timeout=5.0):
+    async with asyncio.timeout(timeout):
+        while not cond():
+            await asyncio.sleep(0.01)
+
+def _session(port, **kw):
+    # A pty ignores the line settings; 8N1 avoids the parity bit on the slave side
+    return make_session(port=port.name, bits=8, parity="N", stopbits=1, ha_discovery=True, **kw)
+
+def test_watchdog_reconnects_after_silence(port):
+    async def run():
+        sess = _session(port, watchdog=0.3)
+        await sess.start()
+        await port.send(3)
+        await _until(lambda: sess.frames_valid >= 3)
+        # Silence: offline, then a reopen of the port
+        await _until(lambda: sess.reconnects >= 1)
+        assert sess.publisher.topic("teleinfo/derived/ha_avail")[-1] == "offline"
+        stats = sess.link_stats()
+        assert stats["last_frame_age"] >= 0.3 and stats["last_recovery_s"] is None
+        t = time.monotonic()
+        await port.send(3)
+        await _until(lambda: sess.last_recovery is not None)
+        assert sess.publisher.topic("teleinfo/derived/ha_avail")[-1] == "online"
+        # From the outage (watchdog expiry) to the first valid frame
+        assert sess.link_stats()["last_recovery_s"] >= 0
+        await sess.async_close()
+        return time.monotonic() - t
+    assert asyncio.run(run()) < 2
+
+def test_transport_loss_reopens_the_port(port):
+    async def run():
+        sess = _session(port)
+        await sess.start()
+        await port.send(2)
+        await _until(lambda: sess.frames_valid >= 2)
+        lost = sess.transport
+        lost.close()
+        await _until(lambda: sess.reconnects == 1 and sess.transport is not lost)
+        await port.send(2)
+        await _until(lambda: sess.frames_valid >= 4)
+        assert sess.link_stats()["connected"]
+        await sess.async_close()
+        return sess
+    sess = asyncio.run(run())
+    assert sess.publisher.topic("teleinfo/derived/ha_avail") == ["online", "offline", "online"]
+
+def test_late_callback_of_a_replaced_transport(port):
+    async def run():
+        sess = _session(port)
+        await sess.start()
+        old = sess.protocol
+        sess.transport.close()
+        await _until(lambda: sess.reconnects == 1)
+        # The old protocol reports its loss again: ignored
+        sess._connection_lost(old)
+        await asyncio.sleep(0.2)
+        reconnects = sess.reconnects
+        await sess.async_close()
+        return reconnects
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from custom_components.teleinfo_gateway import metrics as metrics_mod
+from custom_components.teleinfo_gateway.metrics import LatencyHistogram, SessionMetrics
+
+from tests.common import feed, hist_frame, make_session
+
+B = LatencyHistogram.BOUNDS
+
+@pytest.mark.parametrize("seconds, bucket", [
+    (0.0, 0), (50e-6, 0), (51e-6, 1), (100e-6, 1), (1e-3, 5), (B[-1], len(B) - 1), (B[-1] * 1.01, len(B)), (60.0, len(B)),
+])
+def test_bucket_placement(seconds, bucket):
+    h = LatencyHistogram()
+    h.observe(seconds)
+    assert h.counts.index(1) == bucket
+
+def test_quantiles():
+    h = LatencyHistogram()
+    assert h.quantile(0.5) is None
+    assert h.snapshot() == {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "max_ms": None}
+    # 90 fast ones, 10 slow ones: the upper bound of the bucket holding the quantile
+    for _ in range(90):
+        h.observe(80e-6)
+    for _ in range(10):
+        h.observe(30e-3)
+    assert h.quantile(0.5) == B[1] and h.quantile(0.9) == B[1]
+    assert h.quantile(0.95) == B[10] and h.quantile(1.0) == B[10]
+    snap = h.snapshot()
+    assert snap["count"] == 100 and snap["p50_ms"] == 0.1 and snap["p95_ms"] == 51.2 and snap["max_ms"] == 30.0
+    assert snap["mean_ms"] == pytest.approx(3.072)
+
+def test_overflow_quantile_is_the_max():
+    h = LatencyHistogram()
+    h.observe(10.0)
+    assert h.quantile(0.5) == 10.0
+
+def test_frames_per_minute(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metrics_mod.time, "monotonic", lambda: now[0])
+    m = SessionMetrics()
+    for i in range(90):
+        now[0] = 1000.0 + i
+        m.frame(11, 1e-3)
+    # Seconds 1030..1089 are within the last minute at 1089
+    assert m.frames_per_minute == 60
+    now[0] = 1119.5
+    assert m.frames_per_minute == 30
+    now[0] = 1200.0
+    assert m.frames_per_minute == 0
+    assert m.frames == 90 and m.lines == 990
+
+def test_several_frames_per_second(monkeypatch):
+    now = [500.0]
+    monkeypatch.setattr(metrics_mod.time, "monotonic", lambda: now[0])
+    m = SessionMetrics()
+    for _ in range(3):
+        m.frame(11, 1e-3)
+    now[0] = 500.9
+    m.frame(11, 1e-3)
+    # Same slot, a minute later: the old count is replaced
+    now[0] = 560.0
+    m.frame(11, 1e-3)
+    assert m.frames_per_minute == 1
+
+def test_session_metrics():
+    m = SessionMetrics()
+    sess = make_session(metrics=m)
+    data = hist_frame(papp=100) + hist_frame(papp=200, bad={"PAPP", "IINST"}) + hist_frame(bad={"PAPP"})
+    feed(sess, [data[:100], data[100:]])
+    snap = m.snapshot()
+    assert snap["bytes_in"] == len(data)
+    assert snap["frames"] == 3 and snap["lines"] == 33 and snap["frames_per_minute"] == 3
+    assert snap["checksum_failures"] == {"IINST": 1, "PAPP": 2}
+    assert snap["parse_time"]["count"] == 3 and snap["etx_to_mqtt"]["count"] == 3
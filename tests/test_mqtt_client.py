@@ -0,0 +1,170 @@
+import asyncio, logging, struct
+
+import pytest
+
+from custom_components.teleinfo_gateway import cli, mqtt_client
+from custom_components.teleinfo_gateway.mqtt_client import MqttClient, valid_topic
+
+class Broker:
+    # Just enough MQTT 3.1.1 for the client: CONNACK, SUBACK, PINGRESP, PUBACK
+    def __init__(self):
+        self.published = []
+        self.subscribers = {}
+        self.writers = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def restart(self):
+        # Connections dropped, retained messages lost
+        port = self.server.sockets[0].getsockname()[1]
+        await self.stop()
+        self.server = await asyncio.start_server(self._client, "127.0.0.1", port)
+
+    async def stop(self):
+        self.server.close()
+        for w in self.writers:
+            w.close()
+        self.writers.clear()
+        self.subscribers.clear()
+        await self.server.wait_closed()
+
+    def send(self, topic: str, payload: bytes):
+        body = struct.pack("!H", len(topic)) + topic.encode() + payload
+        for w in self.subscribers.get(topic, ()):
+            w.write(bytes((0x30, len(body))) + body)
+
+    @staticmethod
+    async def _read(reader):
+        header = (await reader.readexactly(1))[0]
+        n = shift = 0
+        while True:
+            b = (await reader.readexactly(1))[0]
+            n |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                break
+        return header, await reader.readexactly(n) if n else b""
+
+    async def _client(self, reader, writer):
+        self.writers.append(writer)
+        try:
+            await self._read(reader)
+            writer.write(b"\x20\x02\x00\x00")
+            while True:
+                header, body = await self._read(reader)
+                kind = header & 0xF0
+                if kind == 0x30:
+                    n = struct.unpack("!H", body[:2])[0]
+                    payload = body[2 + n:]
+                    if header & 0x06:
+                        writer.write(b"\x40\x02" + payload[:2])
+                        payload = payload[2:]
+                    self.published.append((body[2:2 + n].decode(), payload, bool(header & 1)))
+                elif kind == 0x80:
+                    i = 2
+                    while i < len(body):
+                        n = struct.unpack("!H", body[i:i + 2])[0]
+                        self.subscribers.setdefault(body[i + 2:i + 2 + n].decode(), []).append(writer)
+                        i += 3 + n
+                    writer.write(b"\x90\x03" + body[:2] + b"\x00")
+                elif kind == 0xC0:
+                    writer.write(b"\xd0\x00")
+                elif kind == 0xE0:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def _until(cond, timeout=5.0):
+    async with asyncio.timeout(timeout):
+        while not cond():
+            await asyncio.sleep(0.01)
+
+@pytest.mark.parametrize("topic, ok", [
+    ("teleinfo/fields/PAPP", True), ("teleinfo/fields/PA+P", False), ("teleinfo/#", False),
+    ("teleinfo/fields/A\x00B", False), ("", False), ("a" * 0x10000, False),
+])
+def test_valid_topic(topic, ok):
+    assert valid_topic(topic) is ok
+
+def test_offline_buffer(caplog):
+    async def run():
+        client = MqttClient("127.0.0.1", 1, client_id="test", buffer_size=3)
+        with caplog.at_level(logging.WARNING):
+            await client.publish("teleinfo/fields/PA#P", "1")
+        await client.publish("homeassistant/sensor/a/config", "v1", True)
+        for i in range(5):
+            await client.publish("teleinfo/fields/PAPP", str(i))
+        await client.publish("homeassistant/sensor/b/config", "v1", True)
+        await client.publish("homeassistant/sensor/a/config", "v2", True)
+        return client
+    client = asyncio.run(run())
+    assert client.invalid == 1 and "invalid topic" in caplog.text
+    # Retained messages are never evicted: latest payload per topic, in update order
+    assert list(client._retained.values()) == [
+        ("homeassistant/sensor/b/config", "v1", True), ("homeassistant/sensor/a/config", "v2", True),
+    ]
+    assert [p for _t, p, _r in client._buffer] == ["2", "3", "4"]
+    assert client.dropped == 2
+    assert client.stats()["buffered"] == 5
+
+def test_buffer_flushed_on_connect():
+    async def run():
+        broker = Broker()
+        port = await broker.start()
+        connected = []
+        client = MqttClient("127.0.0.1", port, client_id="test", on_connect=lambda: connected.append(1))
+        await client.publish("a/state", "1")
+        await client.publish("a/config", "c", True)
+        client.start()
+        await _until(lambda: connected)
+        await client.publish("a/state", "2")
+        await _until(lambda: len(broker.published) == 3)
+        await client.async_stop()
+        await broker.stop()
+        return broker.published
+    assert asyncio.run(run()) == [("a/config", b"c", True), ("a/state", b"1", False), ("a/state", b"2", False)]
+
+def test_gateway_republishes_discovery(monkeypatch):
+    monkeypatch.setattr(mqtt_client, "RECONNECT_MIN", 0.05)
+    async def run():
+        broker = Broker()
+        port = await broker.start()
+        args = cli.build_parser().parse_args([
+            "--source", "simulate", "--no-realtime", "--mqtt-port", str(port), "--log-level", "WARNING",
+        ])
+        configs = lambda: [t for t, _p, r in broker.published if r and t.endswith("/config")]
+        async def settled():
+            # Configs published so far, once no more come in
+            n = -1
+            while n != len(configs()):
+                n = len(configs())
+                await asyncio.sleep(0.2)
+            return configs()
+        task = asyncio.get_running_loop().create_task(cli.run(args))
+        try:
+            await _until(lambda: configs())
+            announced = await settled()
+            # Broker restarted without persistence: everything announced again on reconnect
+            await broker.restart()
+            await _until(lambda: len(configs()) > len(announced))
+            after_restart = (await settled())[len(announced):]
+            # HA restarted
+            await _until(lambda: broker.subscribers.get("homeassistant/status"))
+            n = len(configs())
+            broker.send("homeassistant/status", b"online")
+            await _until(lambda: len(configs()) > n)
+            after_online = (await settled())[n:]
+        finally:
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await broker.stop()
+        return announced, after_restart, after_online
+    announced, after_restart, after_online = asyncio.run(run())
+    assert len(announced) > 5
+    assert set(after_restart) == set(after_online) == set(announced)
@@ -0,0 +1,92 @@
+import asyncio, json
+
+from custom_components.teleinfo_gateway import cli
+from custom_components.teleinfo_gateway.integrity import REJECT_ADCO_MISMATCH, REJECT_UNKNOWN_METER
+
+from tests.common import RecordingPublisher, feed, frames_of, hist_frame, make_session
+
+HOUSE, HEAT_PUMP = "111111111111", "222222222222"
+
+def test_per_meter_topics():
+    sess = make_session(multi_meter=True)
+    feed(sess, [hist_frame(HOUSE, papp=100) + hist_frame(HEAT_PUMP, papp=2000) + hist_frame(HOUSE, papp=110)])
+    pub = sess.publisher
+    assert pub.topic(f"teleinfo/fields/{HOUSE}/PAPP") == ["00100", "00110"]
+    assert pub.topic(f"teleinfo/fields/{HEAT_PUMP}/PAPP") == ["02000"]
+    assert len(pub.topic(f"teleinfo/line/{HEAT_PUMP}")) == 11
+    assert not pub.topic("teleinfo/fields/PAPP")
+    assert sess.meters == {HOUSE, HEAT_PUMP}
+
+def test_frame_without_valid_adco_is_not_credited():
+    # The ADCO of the previous frame must not stick to the next one
+    sess = make_session(multi_meter=True)
+    frames = frames_of(sess)
+    feed(sess, [hist_frame(HOUSE, papp=100) + hist_frame(HEAT_PUMP, papp=2000, bad={"ADCO"})])
+    pub = sess.publisher
+    assert pub.topic(f"teleinfo/fields/{HOUSE}/PAPP") == ["00100"]
+    assert not [t for t, _p, _r in pub.messages if t.startswith("teleinfo/fields/") and HEAT_PUMP in t]
+    assert sess.rejections[REJECT_UNKNOWN_METER] == 1
+    assert len(frames) == 1
+    # Its line reports still go out, outside any meter namespace
+    assert len(pub.topic("teleinfo/invalid")) == 1
+
+def test_single_meter_link_keeps_its_meter():
+    sess = make_session()
+    feed(sess, [hist_frame(HOUSE) + hist_frame(HOUSE, papp=300, bad={"ADCO"})])
+    assert sess.publisher.topic("teleinfo/fields/PAPP") == ["00750", "00300"]
+    assert sess._last_valid[HOUSE][2]["PAPP"] == "00300"
+    assert sess.rejections[REJECT_UNKNOWN_METER] == 0
+
+def test_single_meter_link_ignores_a_stray_adco():
+    sess = make_session()
+    feed(sess, [hist_frame(HOUSE) + hist_frame(HEAT_PUMP, papp=300)])
+    assert sess.rejections[REJECT_ADCO_MISMATCH] == 1
+    assert list(sess._last_valid) == [HOUSE]
+
+def test_shared_publisher():
+    pub = RecordingPublisher()
+    a = make_session(pub, port="a", topic_fields="house/fields")
+    b = make_session(pub, port="b", topic_fields="garage/fields")
+    feed(a, [hist_frame(HOUSE, papp=100)])
+    feed(b, [hist_frame(HEAT_PUMP, papp=200)])
+    assert pub.topic("house/fields/PAPP") == ["00100"]
+    assert pub.topic("garage/fields/PAPP") == ["00200"]
+
+def test_discovery_per_meter():
+    async def run():
+        sess = make_session(multi_meter=True, ha_discovery=True)
+        feed(sess, [hist_frame(HOUSE) + hist_frame(HEAT_PUMP) + hist_frame(HOUSE)])
+        await asyncio.sleep(0)
+        return sess
+    sess = asyncio.run(run())
+    configs = {t: p for t, p, r in sess.publisher.messages if t.startswith("homeassistant/") and r}
+    for adco in (HOUSE, HEAT_PUMP):
+        papp = configs[f"homeassistant/sensor/teleinfo_{adco}_papp/config"]
+        assert f'"state_topic": "teleinfo/fields/{adco}/PAPP"' in papp
+        assert sess.publisher.topic(f"teleinfo/derived/{adco}/ha_avail") == ["online"]
+        # The port's availability (the CLI's last will) and the meter's own
+        cfg = json.loads(papp)
+        assert [a["topic"] for a in cfg["availability"]] == ["teleinfo/derived/ha_avail", f"teleinfo/derived/{adco}/ha_avail"]
+        assert cfg["availability_mode"] == "all" and "availability_topic" not in cfg
+        assert cfg["device"]["name"] == f"Téléinfo {adco}"
+    # Announced once per meter
+    assert len(configs) == len([t for t, _p, r in sess.publisher.messages if r and t.startswith("homeassistant/")])
+
+def test_cli_names_each_meter():
+    assert cli.build_parser().parse_args([]).device_name == ""
+
+def test_availability_restored_on_every_topic():
+    async def run():
+        sess = make_session(multi_meter=True, ha_discovery=True)
+        sess.publish_availability()
+        assert not sess.publisher.messages
+        feed(sess, [hist_frame(HOUSE) + hist_frame(HEAT_PUMP)])
+        await asyncio.sleep(0)
+        sess.publisher.messages.clear()
+        # MQTT client reconnected: its will marked the port offline
+        sess.publish_availability()
+        return sess
+    sess = asyncio.run(run())
+    assert sorted(sess.publisher.messages) == sorted(
+        (f"teleinfo/derived/{adco}ha_avail", "online", True) for adco in ("", f"{HOUSE}/", f"{HEAT_PUMP}/")
+    )
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from custom_components.teleinfo_gateway.tic import MODE_HISTORIC, MODE_STANDARD
+
+from tests.common import hist_group, make_session, std_group
+
+SEEDS = [
+    hist_group("PAPP", "00750"), hist_group("PTEC", "HP.."), hist_group("ADCO", "012345678901"),
+    hist_group("PAPP", "00750", "!"),
+    std_group("SINSTS", "00750"), std_group("SMAXSN", "05120", "E231017101530"), std_group("DATE", "", "E231017120000"),
+    # SP checksum, stray CR/LF, leading SP, mixed separators
+    b"PTEC HP..  ", b"\rA B C\r\n", b" X Y Z", b"A\tB C D",
+]
+ALPHABET = b" \t\r\n\x0b\x1c\x85\xa0\xffAZ09.\x00"
+
+def fuzzed(rng: random.Random):
+    line = bytearray(rng.choice(SEEDS).strip(b"\n") + rng.choice([b"", b"\r", b"\r\r"]))
+    for _ in range(rng.randint(0, 3)):
+        op, p = rng.random(), rng.randrange(len(line) + 1)
+        if op < .4 and line:
+            line[min(p, len(line) - 1)] = rng.choice(ALPHABET)
+        elif op < .7:
+            line.insert(p, rng.choice(ALPHABET))
+        elif line:
+            del line[min(p, len(line) - 1)]
+    return bytes(line)
+
+@pytest.mark.parametrize("mode", [None, MODE_HISTORIC, MODE_STANDARD])
+def test_bytes_parser_matches_reference(mode):
+    # parse_line (str, parse_tic_line for historic lines) is the reference
+    sess = make_session(relaxed_labels={"PTEC", "PAPP"})
+    sess.mode = mode
+    rng = random.Random(8)
+    for _ in range(30000):
+        line = fuzzed(rng)
+        assert sess.parse_line_bytes(line) == sess.parse_line(line.decode("latin-1")), line
+
+def test_other_codecs_use_the_reference():
+    sess = make_session(decode="utf-8")
+    assert not sess._fast
+    line = hist_group("PAPP", "00750").strip(b"\n")
+    assert sess.parse_line_bytes(line) == sess.parse_line(line.decode("utf-8")) == ("PAPP", "00750", None, chr(line[-2]), True)
@@ -0,0 +1,57 @@
+import asyncio
+
+from custom_components.teleinfo_gateway import publisher as publisher_mod
+from custom_components.teleinfo_gateway.const import POLICY_COALESCE, POLICY_DROP_OLDEST
+from custom_components.teleinfo_gateway.publisher import MqttPublisher
+
+from tests.common import feed, hist_frame, make_session
+
+async def _nothing(topic, payload, retain):
+    pass
+
+def test_coalesce_merges_state_topics_only():
+    pub = MqttPublisher(_nothing, max_batches=1, policy=POLICY_COALESCE)
+    pub.streams.add("line")
+    pub.publish_batch([("line", "a", False), ("fields/PAPP", "1", False), ("line", "b", False)])
+    pub.publish_batch([("line", "c", False), ("fields/PAPP", "2", False), ("fields/PTEC", "HP..", False)])
+    (batch, _acks), = [pub._queue.get_nowait()]
+    assert batch == [("line", "a", False), ("line", "b", False), ("line", "c", False),
+                     ("fields/PAPP", "2", False), ("fields/PTEC", "HP..", False)]
+    assert pub.dropped == 1
+
+def test_stream_backlog_is_bounded(monkeypatch):
+    monkeypatch.setattr(publisher_mod, "MAX_STREAM_BACKLOG", 3)
+    pub = MqttPublisher(_nothing, max_batches=1)
+    pub.streams.add("line")
+    pub.publish_batch([("line", str(i), False) for i in range(3)])
+    pub.publish_batch([("line", str(i), False) for i in range(3, 5)])
+    batch, _acks = pub._queue.get_nowait()
+    assert [p for _t, p, _r in batch] == ["2", "3", "4"]
+    assert pub.dropped == 2
+
+def test_drop_oldest():
+    pub = MqttPublisher(_nothing, max_batches=1, policy=POLICY_DROP_OLDEST)
+    pub.publish_batch([("a", "1", False), ("b", "1", False)])
+    pub.publish_batch([("a", "2", False)])
+    assert pub._queue.get_nowait()[0] == [("a", "2", False)]
+    assert pub.dropped == 2
+
+def test_session_registers_its_streams():
+    async def run():
+        sent = []
+        async def send(topic, payload, retain):
+            sent.append((topic, payload))
+        pub = MqttPublisher(send, max_batches=1)
+        sess = make_session(pub, multi_meter=True)
+        # Queue of one batch, never drained while frames arrive: everything is coalesced
+        feed(sess, [hist_frame("111111111111", papp=100), hist_frame("111111111111", papp=200)])
+        pub.acquire()
+        while pub.queue_depth:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await pub.async_release()
+        return sent
+    sent = asyncio.run(run())
+    lines = [p for t, p in sent if t == "teleinfo/line/111111111111"]
+    assert len(lines) == 22 and lines[8].startswith("PAPP 00100 ")
+    assert [p for t, p in sent if t == "teleinfo/fields/111111111111/PAPP"] == ["00200"]
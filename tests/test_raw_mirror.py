@@ -0,0 +1,51 @@
+import zlib
+
+from custom_components.teleinfo_gateway.const import RAW_BLOCK, RAW_FRAME
+
+from tests.common import feed, hist_frame, make_session
+
+LINES = [
+    "ADCO 012345678901 E", "OPTARIF HC.. <", "ISOUSC 45 ?", "HCHC 012345678 *", "HCHP 009876543 =", "PTEC HP..  ",
+    "IINST 003 Z", "IMAX 090 H", "PAPP 00750 -", "HHPHC A ,", "MOTDETAT 000000 B",
+]
+
+def _mirror(**kw) -> list:
+    sess = make_session(**kw)
+    feed(sess, [hist_frame()])
+    return sess.publisher.topic("teleinfo/line")
+
+def test_per_line():
+    sess = make_session()
+    feed(sess, [hist_frame()])
+    msgs = sess.publisher.messages
+    assert [p for t, p, _r in msgs if t == "teleinfo/line"] == LINES
+    # Received before the frame: sent before the frame's own messages
+    assert [t for t, _p, _r in msgs[:len(LINES)]] == ["teleinfo/line"] * len(LINES)
+    assert not any(r for _t, _p, r in msgs)
+
+def test_block():
+    assert _mirror(raw_mode=RAW_BLOCK) == ["\n".join(LINES)]
+
+def test_raw_frame():
+    # The frame bytes as received, STX to ETX
+    assert _mirror(raw_mode=RAW_FRAME) == [hist_frame()]
+
+def test_compress():
+    block, = _mirror(raw_mode=RAW_BLOCK, raw_compress=True)
+    assert zlib.decompress(block) == "\n".join(LINES).encode("utf-8")
+    raw, = _mirror(raw_mode=RAW_FRAME, raw_compress=True)
+    assert zlib.decompress(raw) == hist_frame()
+    # Per-line messages are never compressed
+    assert _mirror(raw_compress=True) == LINES
+
+def test_raw_every():
+    frames = [hist_frame(papp=p) for p in range(100, 700, 100)]
+    sess = make_session(raw_mode=RAW_FRAME, raw_every=3)
+    feed(sess, frames)
+    # Every 3rd frame, while every frame still goes out on topic_json
+    assert sess.publisher.topic("teleinfo/line") == [frames[2], frames[5]]
+    assert len(sess.publisher.topic("teleinfo/json")) == 6
+    sess = make_session(raw_every=2)
+    feed(sess, frames[:4])
+    lines = sess.publisher.topic("teleinfo/line")
+    assert len(lines) == 2 * len(LINES) and lines[8].startswith("PAPP 00200 ") and lines[19].startswith("PAPP 00400 ")
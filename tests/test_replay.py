@@ -0,0 +1,66 @@
+import asyncio, itertools
+
+import pytest
+
+from custom_components.teleinfo_gateway.replay import SOURCE_REPLAY, SOURCE_SIMULATE, synthetic_frames
+
+from tests.common import capture, feed, frames_of, make_session
+
+def test_synthetic_frames_are_valid():
+    sess = make_session()
+    frames = frames_of(sess)
+    feed(sess, itertools.islice(synthetic_frames("041876097467"), 1300))
+    assert len(frames) == 1300 and not any("_meta" in f for f in frames)
+    assert {f["ADCO"] for f in frames} == {"041876097467"}
+    # Both periods are simulated and the indexes never go back
+    assert {f["PTEC"] for f in frames} == {"HC..", "HP.."}
+    for label in ("HCHC", "HCHP"):
+        values = [int(f[label]) for f in frames]
+        assert values == sorted(values)
+
+async def _run(sess, until, timeout=5.0):
+    await sess.start()
+    try:
+        async with asyncio.timeout(timeout):
+            while not until():
+                await asyncio.sleep(0.01)
+    finally:
+        await sess.async_close()
+
+def test_simulate_full_speed():
+    sess = make_session(source=SOURCE_SIMULATE, replay_realtime=False)
+    frames = frames_of(sess)
+    asyncio.run(_run(sess, lambda: len(frames) >= 200))
+    assert sess.frames_valid >= 200
+    assert sess.publisher.users == 0
+    assert sess.publisher.topic("teleinfo/fields/PAPP")
+
+def test_replay_capture_loops(tmp_path):
+    path = tmp_path / "capture.bin"
+    path.write_bytes(capture(5))
+    sess = make_session(source=SOURCE_REPLAY, port=str(path), replay_realtime=False)
+    frames = frames_of(sess)
+    asyncio.run(_run(sess, lambda: len(frames) >= 12))
+    papp = [f["PAPP"] for f in frames[:12]]
+    assert papp[:5] == papp[5:10] == [f"{300 + i * 37:05d}" for i in range(5)]
+
+def test_replay_line_rate(tmp_path):
+    path = tmp_path / "capture.bin"
+    path.write_bytes(capture(5))
+    sess = make_session(source=SOURCE_REPLAY, port=str(path))
+
+    async def run():
+        await sess.start()
+        await asyncio.sleep(0.5)
+        fed = sess.transport.bytes_fed
+        await sess.async_close()
+        return fed
+    # 1200 baud 7E1: 120 B/s, in chunks of 12 bytes
+    assert 24 <= asyncio.run(run()) <= 84
+
+def test_empty_replay_file(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    sess = make_session(source=SOURCE_REPLAY, port=str(path))
+    with pytest.raises(ValueError):
+        asyncio.run(sess.start())
@@ -0,0 +1,78 @@
+import random
+
+from custom_components.teleinfo_gateway import _FrameAssembler
+from custom_components.teleinfo_gateway.integrity import REJECT_ETX_WITHOUT_STX, REJECT_TRUNCATED
+
+from tests.common import capture, hist_frame, make_session, mutate, split
+
+class PerByteScanner:
+    # Reference: the per-byte loop the chunk scanner replaced, with the same framing rules
+    def __init__(self):
+        self.buf = bytearray()
+        self.in_frame = False
+        self.frame = []
+        self.frames = []
+        self.lines = []
+        self.counters = {REJECT_TRUNCATED: 0, REJECT_ETX_WITHOUT_STX: 0}
+
+    def _line(self, b: bytes):
+        if b:
+            self.lines.append(b.decode("latin-1").strip("\r\n"))
+            if self.in_frame:
+                self.frame.append(b)
+
+    def feed(self, data: bytes):
+        for b in data:
+            if b == 0x02:
+                if self.in_frame:
+                    self.counters[REJECT_TRUNCATED] += 1
+                self.in_frame, self.frame = True, []
+                self.buf.clear()
+            elif b == 0x03:
+                if self.in_frame:
+                    self._line(bytes(self.buf))
+                    self.frames.append(self.frame)
+                else:
+                    self.counters[REJECT_ETX_WITHOUT_STX] += 1
+                self.in_frame, self.frame = False, []
+                self.buf.clear()
+            elif b == 0x0A:
+                self._line(bytes(self.buf))
+                self.buf.clear()
+            else:
+                self.buf.append(b)
+
+def scan_per_byte(data: bytes):
+    ref = PerByteScanner()
+    ref.feed(data)
+    return ref.frames, ref.lines, ref.counters, bytes(ref.buf)
+
+def scan_chunked(chunks):
+    sess = make_session()
+    asm = _FrameAssembler(sess)
+    frames, lines = [], []
+    for chunk in chunks:
+        for pf, mirror, _adco in asm.feed(chunk):
+            if pf is not None:
+                frames.append(pf.lines)
+            lines.extend(mirror)
+    lines.extend(asm.lines)
+    counters = {k: sess.rejections[k] for k in (REJECT_TRUNCATED, REJECT_ETX_WITHOUT_STX)}
+    return frames, lines, counters, bytes(asm.buf)
+
+def test_clean_capture():
+    data = capture(20)
+    frames, lines, counters, rest = scan_chunked([data])
+    assert len(frames) == 20 and all(len(f) == 11 for f in frames)
+    assert (frames, lines, counters, rest) == scan_per_byte(data)
+
+def test_random_chunks_and_corruption():
+    rng = random.Random(1)
+    base = b"garbage\n" + hist_frame() * 3 + b"\n\n\x03xx\n\x02A B C\r\n" + hist_frame(papp=1200) + b"\x02ADCO"
+    for _ in range(1000):
+        data = mutate(base, rng)
+        assert scan_chunked(split(data, rng)) == scan_per_byte(data)
+
+def test_one_byte_chunks():
+    data = hist_frame() + b"\x03" + hist_frame()[:40] + hist_frame()
+    assert scan_chunked([data[i:i + 1] for i in range(len(data))]) == scan_per_byte(data)
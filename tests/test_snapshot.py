@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from tests.common import feed, hist_frame, make_session
+
+def test_snapshot_versions():
+    sess = make_session(multi_meter=True, analytics=True)
+    assert sess.snapshot() == {"version": 0, "port": "test", "mode": "historic", "available": False, "meters": {}}
+    feed(sess, [hist_frame("111111111111", papp=100), hist_frame("222222222222", papp=200),
+                hist_frame("111111111111", papp=300)])
+    snap = sess.snapshot()
+    # One version per stored frame; each meter keeps the version of its last frame
+    assert snap["version"] == 3 and snap["available"]
+    m1, m2 = snap["meters"]["111111111111"], snap["meters"]["222222222222"]
+    assert (m1["version"], m2["version"]) == (3, 2)
+    assert m1["fields"]["PAPP"] == "00300" and m2["fields"]["PAPP"] == "00200"
+    assert m1["derived"]["ptec_short"] == "HP" and m1["derived"]["hc_active"] is False
+    # Copied: later frames do not change a snapshot already taken
+    feed(sess, [hist_frame("111111111111", papp=400)])
+    assert m1["fields"]["PAPP"] == "00300" and sess.snapshot()["meters"]["111111111111"]["version"] == 4
+
+def test_rejected_fields_are_left_out():
+    sess = make_session()
+    feed(sess, [hist_frame(papp=100) + hist_frame(papp=200, bad={"PAPP"})])
+    fields = sess.snapshot()["meters"]["012345678901"]["fields"]
+    assert "PAPP" not in fields and fields["HCHC"] == "012345678"
+
+@pytest.mark.parametrize("payload, topic", [
+    (b"", "teleinfo/json/snapshot"),
+    (b"not json", "teleinfo/json/snapshot"),
+    (b'{"id": "dashboard"}', "teleinfo/json/snapshot/dashboard"),
+    (b'{"id": 12}', "teleinfo/json/snapshot"),
+    (b'{"id": ""}', "teleinfo/json/snapshot"),
+    # Never a reply outside <topic_json>/snapshot, nor a wildcard topic
+    (b'{"id": "a/b"}', "teleinfo/json/snapshot"),
+    (b'{"id": "a+"}', "teleinfo/json/snapshot"),
+    (b'{"id": "#"}', "teleinfo/json/snapshot"),
+])
+def test_answer_snapshot(payload, topic):
+    sess = make_session()
+    feed(sess, [hist_frame()])
+    sess.answer_snapshot(payload)
+    (t, p, retain), = [m for m in sess.publisher.messages if "/snapshot" in m[0]]
+    assert t == topic and not retain
+    assert json.loads(p) == sess.snapshot()
+    assert sess.snapshot_request_topic == "teleinfo/json/get"
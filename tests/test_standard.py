@@ -0,0 +1,66 @@
+import asyncio, json
+
+from custom_components.teleinfo_gateway.tic import (
+    MODE_AUTO, MODE_HISTORIC, MODE_STANDARD, horodate_iso, parse_std_bytes, parse_std_line,
+)
+
+from tests.common import feed, frames_of, hist_frame, make_session, std_frame, std_group
+
+def test_standard_frame():
+    sess = make_session(tic_mode=MODE_STANDARD, baud=9600)
+    frames = frames_of(sess)
+    feed(sess, [std_frame(sinsts=1234)])
+    (frame,) = frames
+    assert frame["ADSC"] == "041876097467"
+    assert frame["SINSTS"] == "01234"
+    # Values keep their inner and trailing spaces
+    assert frame["NGTF"] == "H PLEINE/CREUSE "
+    assert frame["DATE"] == ""
+    assert frame["_meta"] == {
+        "invalid_lines": 0,
+        "timestamps": {"DATE": "2023-10-17T12:00:00+02:00", "SMAXSN": "2023-10-17T12:00:00+02:00"},
+    }
+    assert sess.frames_valid == 1
+
+def test_checksum_covers_trailing_separator():
+    line = std_group("SINSTS", "00750").decode("latin-1")
+    assert parse_std_line(line) == ("SINSTS", "00750", None, line[-2], True)
+    s = "SINSTS\t00750"
+    wrong = chr((sum(map(ord, s)) & 0x3F) + 0x20)
+    assert not parse_std_line(f"{s}\t{wrong}")[4]
+
+def test_bytes_and_str_parsers_agree():
+    for group in (std_group("EAST", "012345678"), std_group("SMAXSN", "05120", "H231224235959"), b"SINSTS\t00750\t!\r"):
+        assert parse_std_bytes(group) == parse_std_line(group.decode("latin-1"))
+
+def test_mode_detection():
+    sess = make_session(tic_mode="auto")
+    assert sess.mode is None
+    feed(sess, [std_frame()])
+    assert sess.mode == MODE_STANDARD
+    sess = make_session(tic_mode="auto")
+    feed(sess, [hist_frame()])
+    assert sess.mode == MODE_HISTORIC
+
+def test_bad_checksum_is_rejected():
+    sess = make_session(tic_mode=MODE_STANDARD)
+    frames = frames_of(sess)
+    data = std_frame()
+    i = data.index(b"SINSTS")
+    feed(sess, [data[:i] + b"X" + data[i + 1:]])
+    assert frames[0]["_meta"]["rejected"] == {"XINSTS": "checksum"}
+
+def test_horodate():
+    assert horodate_iso("H240101000000") == "2024-01-01T00:00:00+01:00"
+    # Degraded clock (lower case) keeps its offset; anything else is passed through
+    assert horodate_iso("e240701120000") == "2024-07-01T12:00:00+02:00"
+    assert horodate_iso("         ") == "         "
+
+def test_discovery_model_follows_the_mode():
+    async def run(frame):
+        sess = make_session(tic_mode=MODE_AUTO, ha_discovery=True)
+        feed(sess, [frame])
+        await asyncio.sleep(0)
+        return {json.loads(p)["device"]["model"] for t, p, r in sess.publisher.messages if r and t.endswith("/config")}
+    assert asyncio.run(run(std_frame())) == {"Linky (TIC standard)"}
+    assert asyncio.run(run(hist_frame())) == {"Linky (TIC historique)"}
@@ -0,0 +1,48 @@
+import asyncio, subprocess, sys, time
+from pathlib import Path
+
+import pytest
+
+from custom_components.teleinfo_gateway.replay import SOURCE_REPLAY
+
+from tests.common import capture, frames_of, make_session
+
+def test_serial_modules_are_not_imported_with_the_package():
+    code = "import sys, custom_components.teleinfo_gateway; print(sorted(m for m in ('serial', 'serial_asyncio', 'homeassistant') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).parents[1]).stdout
+    assert out.strip() == "[]"
+
+def test_background_start_does_not_wait_for_the_port():
+    async def run():
+        sess = make_session(port="/nonexistent/ttyTIC")
+        t = time.perf_counter()
+        await sess.start(background=True)
+        elapsed = time.perf_counter() - t
+        await asyncio.sleep(0.1)
+        assert sess.transport is None and sess.publisher.users == 1
+        await sess.async_close()
+        return elapsed
+    assert asyncio.run(run()) < 0.05
+
+def test_foreground_start_reports_the_port_error():
+    sess = make_session(port="/nonexistent/ttyTIC")
+    # serial.SerialException is an OSError
+    with pytest.raises(OSError):
+        asyncio.run(sess.start())
+
+def test_background_start_opens_the_link(tmp_path):
+    path = tmp_path / "capture.bin"
+    path.write_bytes(capture(3))
+    async def run():
+        sess = make_session(source=SOURCE_REPLAY, port=str(path), replay_realtime=False)
+        frames = frames_of(sess)
+        await sess.start(background=True)
+        assert sess.transport is None
+        async with asyncio.timeout(5):
+            while not frames:
+                await asyncio.sleep(0.01)
+        await sess.async_close()
+        return sess
+    sess = asyncio.run(run())
+    assert sess.reconnects == 0 and sess.frames_valid
@@ -0,0 +1,117 @@
+import asyncio, sys, types
+from datetime import datetime, timezone
+
+import pytest
+
+from custom_components.teleinfo_gateway.history import HistoryStore
+from custom_components.teleinfo_gateway.statistics import HOUR, EnergyStatistics, HourlyIndexes, statistic_id
+
+ADCO = "012345678901"
+HCHC = statistic_id(ADCO, "HCHC")
+HCHP = statistic_id(ADCO, "HCHP")
+H0 = 1_700_002_800
+
+class Recorder:
+    # Stands in for the recorder API used by EnergyStatistics
+    def __init__(self):
+        # statistic_id -> (start, state, sum) of the last row already in the recorder
+        self.last = {}
+        self.imports = []
+
+    def get_last_statistics(self, hass, n, sid, convert_units, types):
+        if sid not in self.last:
+            return {}
+        start, state, total = self.last[sid]
+        return {sid: [{"start": datetime.fromtimestamp(start, timezone.utc), "state": state, "sum": total}]}
+
+    def async_add_external_statistics(self, hass, metadata, stats):
+        self.imports.append((metadata, stats))
+
+    def rows(self, sid: str) -> list:
+        return [(s["start"].timestamp(), s["state"], s["sum"]) for m, stats in self.imports
+                if m["statistic_id"] == sid for s in stats]
+
+@pytest.fixture
+def recorder(monkeypatch):
+    rec = Recorder()
+    class Instance:
+        async def async_add_executor_job(self, fn, *args):
+            return fn(*args)
+    class StatisticMetaData:
+        __annotations__ = {"has_mean": bool, "has_sum": bool}
+    modules = {
+        "homeassistant": {},
+        "homeassistant.components": {},
+        "homeassistant.components.recorder": {"get_instance": lambda hass: Instance()},
+        "homeassistant.components.recorder.models": {"StatisticMetaData": StatisticMetaData},
+        "homeassistant.components.recorder.statistics": {
+            "get_last_statistics": rec.get_last_statistics,
+            "async_add_external_statistics": rec.async_add_external_statistics,
+        },
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        monkeypatch.setitem(sys.modules, name, module)
+    return rec
+
+def test_hour_rollover():
+    hours = HourlyIndexes()
+    hours.add(H0 + 10, ADCO, {"HCHC": "1000", "HCHP": "5000", "PAPP": "00750"})
+    hours.add(H0 + 3000, ADCO, {"HCHC": "1200", "HCHP": "5000"})
+    assert hours.take() == []
+    hours.add(H0 + HOUR + 5, ADCO, {"HCHC": "1300"})
+    # The last index seen in the hour; HCHP has no frame in the new hour yet
+    assert hours.take() == [(HCHC, H0, 1200)]
+    hours.close_before(H0 + 2 * HOUR + 1)
+    assert sorted(hours.take()) == [(HCHC, H0 + HOUR, 1300), (HCHP, H0, 5000)]
+    assert hours.names[HCHC].startswith(f"Téléinfo {ADCO} ")
+
+def test_sum_continues_across_hours(recorder):
+    stats = EnergyStatistics(None)
+    recorder.last[HCHC] = (H0 - HOUR, 1.0, 40.0)
+    async def run():
+        for i, wh in enumerate((1500, 2500, 2600)):
+            stats.add(H0 + i * HOUR, ADCO, {"HCHC": str(wh)})
+            # One flush per hour, as the session does
+            await stats.async_flush(H0 + i * HOUR + 60)
+        return await stats.async_flush(H0 + 3 * HOUR)
+    asyncio.run(run())
+    assert recorder.rows(HCHC) == [(H0, 1.5, 40.5), (H0 + HOUR, 2.5, 41.5), (H0 + 2 * HOUR, 2.6, pytest.approx(41.6))]
+    metadata = recorder.imports[0][0]
+    assert metadata["statistic_id"] == HCHC and metadata["has_sum"] and metadata["unit_of_measurement"] == "kWh"
+    assert stats.imported == 3
+
+def test_first_import_and_meter_reset(recorder):
+    stats = EnergyStatistics(None)
+    hours = [(HCHC, H0, 9000), (HCHC, H0 + HOUR, 9500), (HCHC, H0 + 2 * HOUR, 300), (HCHC, H0 + 3 * HOUR, 800)]
+    asyncio.run(stats.async_import(hours, {}))
+    # Never imported: starts at 0; lower index: new meter counted from zero
+    assert recorder.rows(HCHC) == [(H0, 9.0, 0.0), (H0 + HOUR, 9.5, 0.5), (H0 + 2 * HOUR, 0.3, 0.8),
+                                   (H0 + 3 * HOUR, 0.8, pytest.approx(1.3))]
+
+def test_hours_already_imported_are_skipped(recorder):
+    stats = EnergyStatistics(None)
+    recorder.last[HCHC] = (H0 + HOUR, 2.0, 10.0)
+    n = asyncio.run(stats.async_import([(HCHC, H0, 1000), (HCHC, H0 + HOUR, 2000), (HCHC, H0 + 2 * HOUR, 2250)], {}))
+    assert n == 1 and recorder.rows(HCHC) == [(H0 + 2 * HOUR, 2.25, 10.25)]
+
+def test_backfill_from_the_history(recorder, tmp_path):
+    recorder.last[HCHC] = (H0 - HOUR, 1.0, 7.0)
+    async def run():
+        store = HistoryStore(str(tmp_path))
+        await store.async_load()
+        # Two hours and a half of frames, one per 10 minutes
+        for i in range(16):
+            store.add(H0 - HOUR + 600 * i, {"HCHC": 1000 + 100 * i, "HCHP": 5000 + 10 * i, "PAPP": 750})
+        await store.async_flush(final=True)
+        stats = EnergyStatistics(None)
+        n = await stats.async_backfill(store, ADCO, H0 + 2 * HOUR + 1800)
+        await store.async_close()
+        return n
+    n = asyncio.run(run())
+    # HCHC resumes after its last row; HCHP was never imported, so everything is rebuilt
+    assert recorder.rows(HCHC) == [(H0, 2.1, pytest.approx(8.1)), (H0 + HOUR, 2.5, pytest.approx(8.5))]
+    assert recorder.rows(HCHP) == [(H0 - HOUR, 5.05, 0.0), (H0, 5.11, pytest.approx(0.06)),
+                                   (H0 + HOUR, 5.15, pytest.approx(0.1))]
+    assert n == 5
@@ -0,0 +1,104 @@
+import logging
+
+import pytest
+
+from custom_components.teleinfo_gateway import tariff
+from custom_components.teleinfo_gateway.analytics import COST_SCALE, MeterAnalytics
+from custom_components.teleinfo_gateway.tariff import (
+    CONTRACT_BASE, CONTRACT_EJP, CONTRACT_HCHP, CONTRACT_TEMPO, contract, parse_prices, price_mismatch, ptec_period,
+    tempo_colour,
+)
+
+from tests.common import feed, hist_frame, make_session
+
+def former_ptec_friendly(code):
+    # ptec_friendly before the tables, as the reference
+    c = (code or "").strip().upper()
+    tempo = {
+        "HCJB": ("Heures Creuses (Tempo Bleu)", "HC_BLEU", "mdi:weather-night"),
+        "HPJB": ("Heures Pleines (Tempo Bleu)", "HP_BLEU", "mdi:white-balance-sunny"),
+        "HCJW": ("Heures Creuses (Tempo Blanc)", "HC_BLANC", "mdi:weather-night"),
+        "HPJW": ("Heures Pleines (Tempo Blanc)", "HP_BLANC", "mdi:white-balance-sunny"),
+        "HCJR": ("Heures Creuses (Tempo Rouge)", "HC_ROUGE", "mdi:weather-night"),
+        "HPJR": ("Heures Pleines (Tempo Rouge)", "HP_ROUGE", "mdi:white-balance-sunny"),
+    }
+    if c in tempo: return tempo[c]
+    if c.startswith("HC"): return ("Heures Creuses", "HC", "mdi:weather-night")
+    if c.startswith("HP"): return ("Heures Pleines", "HP", "mdi:white-balance-sunny")
+    if c.startswith("TH"): return ("Toutes Heures", "TH", "mdi:clock-outline")
+    if c.startswith("HN"): return ("Heures Normales", "HN", "mdi:timer-outline")
+    if c.startswith("PM"): return ("Pointe Mobile", "PM", "mdi:flash-alert")
+    return ("Inconnu", "UNK", "mdi:clock-alert")
+
+@pytest.mark.parametrize("code", [
+    "TH..", "HC..", "HP..", "HN..", "PM..", "HCJB", "HPJB", "HCJW", "HPJW", "HCJR", "HPJR",
+    "", None, " hc.. ", "hpjr", "HC", "XX..", "H", "PMxx",
+])
+def test_periods_match_the_former_function(code):
+    assert tuple(ptec_period(code)) == former_ptec_friendly(code)
+
+def test_memo_is_bounded():
+    for i in range(500):
+        ptec_period(f"Z{i:03d}")
+    assert len(tariff._PTEC) <= tariff._MAX_MEMO
+
+def test_contracts_and_colours():
+    assert [contract(c) for c in ("BASE", "HC..", "EJP.", "BBR(", "bbr ", None)] == [
+        CONTRACT_BASE, CONTRACT_HCHP, CONTRACT_EJP, CONTRACT_TEMPO, CONTRACT_TEMPO, None,
+    ]
+    assert [tempo_colour(c) for c in ("BLEU", "BLAN", "ROUG", "----", None, "????")] == [
+        "Bleu", "Blanc", "Rouge", "Inconnu", "Inconnu", "Inconnu",
+    ]
+
+def test_price_grid():
+    assert dict(parse_prices("hc=0.2068, HP = 0,27; hc_bleu=0.1296")) == {"hc": 0.2068, "hp": 0.27, "hc_bleu": 0.1296}
+    # Standard-mode index keys carry digits
+    assert dict(parse_prices("easf01=0.2068 easf02=0.27")) == {"easf01": 0.2068, "easf02": 0.27}
+    assert dict(parse_prices(None)) == {}
+
+def test_unparsed_price_text_is_reported(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert dict(parse_prices("hc=0.2 hp:0.27 01=3")) == {"hc": 0.2}
+    assert "hp:0.27 01=3" in caplog.text
+
+def test_price_grid_against_the_contract():
+    assert price_mismatch(parse_prices("hc=0.2 hp=0.3"), CONTRACT_HCHP) == ([], [])
+    assert price_mismatch(parse_prices("hc=0.2 hp=0.3"), CONTRACT_BASE) == (["th"], ["hc", "hp"])
+    assert price_mismatch(parse_prices("hc_bleu=0.1 hp_bleu=0.2 hp=0.3"), CONTRACT_TEMPO) == (
+        ["hc_blanc", "hc_rouge", "hp_blanc", "hp_rouge"], ["hp"])
+    # No grid, unknown contract, or keys that are no historic period: nothing to report
+    assert price_mismatch(parse_prices(""), CONTRACT_BASE) == ([], [])
+    assert price_mismatch(parse_prices("hc=0.2"), None) == ([], [])
+    assert price_mismatch(parse_prices("th=0.25 easf01=0.2"), CONTRACT_BASE) == ([], [])
+
+def test_mismatched_grid_is_reported_once(caplog):
+    sess = make_session(analytics=True, prices=parse_prices("th=0.25"))
+    with caplog.at_level(logging.WARNING):
+        feed(sess, [hist_frame(), hist_frame()])
+    assert caplog.text.count("Price grid does not match the hchp contract (OPTARIF HC..): missing hc, hp") == 1
+    assert sess.analytics["012345678901"].contract == CONTRACT_HCHP
+
+def test_daily_cost_from_index_deltas():
+    a = MeterAnalytics(parse_prices("hc=0.20, hp=0.30"))
+    a.update({"HCHC": "1000", "HCHP": "5000", "PTEC": "HC.."}, "HC", 0.0)
+    a.update({"HCHC": "3000", "HCHP": "5000", "PTEC": "HC.."}, "HC", 1.0)
+    values = a.update({"HCHC": "3000", "HCHP": "6000", "PTEC": "HP.."}, "HP", 2.0)
+    assert values["energy_day_hc"] == 2000 and values["energy_day_hp"] == 1000
+    assert values["cost_day_hc"] == 0.4 * COST_SCALE and values["cost_day_hp"] == 0.3 * COST_SCALE
+    assert values["cost_day"] == 0.7 * COST_SCALE
+
+def test_standard_indexes_are_their_own_period():
+    a = MeterAnalytics(parse_prices("easf01=0.25"))
+    a.update({"EASF01": "1000", "EASF02": "7000"}, None, 0.0)
+    values = a.update({"EASF01": "1400", "EASF02": "7100"}, None, 1.0)
+    assert values["energy_day_easf01"] == 400 and values["energy_day_easf02"] == 100
+    assert values["cost_day"] == values["cost_day_easf01"] == 0.1 * COST_SCALE
+
+def test_published_costs():
+    sess = make_session(analytics=True, prices=parse_prices("hc=0.20, hp=0.30"))
+    feed(sess, [hist_frame(hchc=1000, hchp=5000, ptec="HP..") + hist_frame(hchc=1000, hchp=6000, ptec="HP..")])
+    pub = sess.publisher
+    assert pub.topic("teleinfo/derived/ptec_friendly") == ["Heures Pleines"] * 2
+    assert pub.topic("teleinfo/derived/energy_day_hp") == ["1000"]
+    assert pub.topic("teleinfo/derived/cost_day_hp") == ["0.3000"]
+    assert pub.topic("teleinfo/derived/cost_day") == ["0.3000"]
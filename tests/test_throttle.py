@@ -0,0 +1,41 @@
+from custom_components.teleinfo_gateway.throttle import WriteThrottle
+
+def _written(throttle: WriteThrottle, samples) -> list:
+    # Drives the throttle like TeleinfoSensor: (time, value) -> values written
+    last, last_ts, out = None, 0.0, []
+    for now, value in samples:
+        if throttle.allows(last, value, last_ts, now):
+            last, last_ts = value, now
+            out.append(value)
+    return out
+
+def test_unchanged_values_are_skipped():
+    assert _written(WriteThrottle(), [(0, 1), (1, 1), (2, 2), (3, 2), (4, 1)]) == [1, 2, 1]
+
+def test_min_interval():
+    samples = [(t, t) for t in range(0, 30)]
+    # First value always, then one write per 10 s window at most
+    assert _written(WriteThrottle(10), samples) == [0, 10, 20]
+
+def test_changes_pass_through_the_window_once_it_elapsed():
+    throttle = WriteThrottle(10)
+    assert not throttle.allows(100, 200, 0.0, 9.9)
+    assert throttle.allows(100, 200, 0.0, 10.0)
+    # A non-numeric value is not compared against the deadband
+    assert WriteThrottle(0, abs_db=50).allows("HP", "HC", 0.0, 1.0)
+
+def test_deadbands():
+    absolute = WriteThrottle(0, abs_db=50)
+    assert _written(absolute, [(0, 1000), (1, 1040), (2, 960), (3, 1050), (4, 1100)]) == [1000, 1050, 1100]
+    relative = WriteThrottle(0, rel_db=0.1)
+    assert _written(relative, [(0, 1000), (1, 1090), (2, 1100), (3, 1200), (4, 1321)]) == [1000, 1100, 1321]
+
+def test_forced_write_after_max_interval():
+    throttle = WriteThrottle(10, abs_db=50, max_interval=300)
+    samples = [(0, 1000)] + [(t, 1000 + t // 100) for t in range(10, 700, 10)]
+    # Slow drift inside the deadband: written once per max_interval, never more often
+    assert _written(throttle, samples) == [1000, 1003, 1006]
+    # Without max_interval the drift is held back forever
+    assert _written(WriteThrottle(10, abs_db=50), samples) == [1000]
+    # Unchanged values are never forced
+    assert not throttle.allows(1000, 1000, 0.0, 1000.0)
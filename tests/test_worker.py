@@ -0,0 +1,66 @@
+import asyncio, random
+
+from custom_components.teleinfo_gateway import _TeleinfoProto
+from custom_components.teleinfo_gateway.const import PARSE_INLINE, PARSE_THREAD
+from custom_components.teleinfo_gateway.worker import ParseWorker
+
+from tests.common import capture, frames_of, make_session, mutate, split
+
+async def _run(parse_mode: str, chunks: list, expected: int | None = None):
+    sess = make_session(parse_mode=parse_mode, analytics=True)
+    frames = frames_of(sess)
+    proto = _TeleinfoProto(sess)
+    for chunk in chunks:
+        proto.data_received(chunk)
+        await asyncio.sleep(0)
+    if proto.worker is not None:
+        async with asyncio.timeout(5):
+            while len(frames) < expected:
+                await asyncio.sleep(0.001)
+        # Pending mirror lines of the last batch
+        await asyncio.sleep(0.05)
+    proto.connection_lost(None)
+    return frames, sess.publisher.messages, dict(sess.rejections), proto
+
+def test_thread_mode_matches_inline():
+    rng = random.Random(18)
+    data = b"garbage\n" + mutate(capture(200), rng, 20) + b"\x02A B C\r\n\x03"
+    chunks = split(data, rng, 200)
+    inline = asyncio.run(_run(PARSE_INLINE, chunks))
+    thread = asyncio.run(_run(PARSE_THREAD, chunks, len(inline[0])))
+    assert len(inline[0]) > 150
+    assert thread[:3] == inline[:3]
+    assert 0 < thread[3].worker.batches <= len(chunks)
+
+def test_late_batch_after_close_is_dropped():
+    async def run():
+        sess = make_session(parse_mode=PARSE_THREAD)
+        frames = frames_of(sess)
+        proto = _TeleinfoProto(sess)
+        results = proto.assembler.feed(capture(1))
+        proto.connection_lost(None)
+        proto._deliver(results)
+        return frames, sess.publisher.messages
+    assert asyncio.run(run()) == ([], [])
+
+def test_worker_survives_parse_errors():
+    async def run():
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        def fn(data):
+            if data == b"bad":
+                raise ValueError(data)
+            return [data]
+        out = []
+        def deliver(results):
+            out.extend(results)
+            if b"last" in results:
+                done.set_result(None)
+        worker = ParseWorker(loop, fn, deliver, "test")
+        for chunk in (b"a", b"bad", b"b", b"last"):
+            worker.put(chunk)
+        async with asyncio.timeout(5):
+            await done
+        worker.stop()
+        return out
+    assert asyncio.run(run()) == [b"a", b"b", b"last"]